@@ -8,6 +8,8 @@ from .models import (
     Activity,
     ActivityTag,
     ActivityPhotos,
+    ActivitySummary,
+    UserMountainStats,
     ActivityArea,
     ActivityPrefecture,
     MountainPrefecture,
@@ -163,6 +165,20 @@ class ActivityPhotosAdmin(ModelAdmin):
     ordering = ("id",)
 
 
+@admin.register(ActivitySummary)
+class ActivitySummaryAdmin(ModelAdmin):
+    list_display = ("activity", "total_domo_points", "total_photos")
+    search_fields = ("activity__id",)
+    ordering = ("activity",)
+
+
+@admin.register(UserMountainStats)
+class UserMountainStatsAdmin(ModelAdmin):
+    list_display = ("user", "mountain_name", "climb_count", "last_climbed_at")
+    search_fields = ("user__email", "mountain_name")
+    ordering = ("user", "-climb_count", "-elevation")
+
+
 @admin.register(MountainPrefecture)
 class MountainPrefectureAdmin(ModelAdmin):
     list_display = ("id", "mountain", "prefecture")
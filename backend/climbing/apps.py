@@ -11,3 +11,11 @@ class ClimbingConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "climbing"
+
+    def ready(self):
+        """アプリケーションの起動時にシグナルハンドラとシステムチェックを登録する"""
+        from django.core import checks
+        from . import signals  # noqa: F401
+        from .hashing import check_shared_limit
+
+        checks.register(check_shared_limit)
@@ -1,5 +1,6 @@
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth import get_user_model
+from .hashing import check_user_password
 
 User = get_user_model()
 
@@ -14,7 +15,8 @@ class EmailBackend(BaseBackend):
         """ユーザーをメールアドレスとパスワードで認証する
 
         メールアドレスを基にユーザーを検索し、指定されたパスワードと
-        ユーザーのパスワードが一致するかを確認する
+        ユーザーのパスワードが一致するかを確認する。
+        パスワードのハッシュ計算は、同時実行数を制限したスレッドプールで行う
 
         Args:
             request (HttpRequest): 認証のためのリクエストオブジェクト
@@ -25,12 +27,15 @@ class EmailBackend(BaseBackend):
         Returns:
             User: 認証に成功した場合、認証済みのユーザーオブジェクトを返す
             None: 認証に失敗した場合、Noneを返す
+
+        Raises:
+            PasswordHashBusy: ハッシュ計算の実行枠が空いていない場合
         """
         try:
             # ユーザーインスタンスの取得
             user = User.objects.get(email=email)
             # パスワード認証
-            if user.check_password(password):
+            if check_user_password(user, password):
                 return user
         # 指定したメールアドレスに紐づくユーザーが存在しない場合
         except User.DoesNotExist:
@@ -1,12 +1,137 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
 
 
-class CookieJWTAuthentication(JWTAuthentication):
+# クレームに含まれない場合にDBから取得するユーザー情報のフィールド
+# (キャッシュにはパスワードのハッシュや個人情報を含めず、これらのフィールドのみを保存する)
+TOKEN_USER_FIELDS = ("is_active", "is_paid", "is_staff", "is_superuser")
+
+
+def get_user_cache_key(user_id):
+    """ユーザー情報のキャッシュのキーを作成する
+
+    Args:
+        user_id (int): ユーザーID
+
+    Returns:
+        str: キャッシュのキー
+    """
+    return f"token_user_fields:{user_id}"
+
+
+def load_user(user_id):
+    """ユーザー情報のTOKEN_USER_FIELDSのフィールドをDBから取得する
+
+    SIMPLE_JWT["TOKEN_USER_CACHE_TIMEOUT"]が0より大きい場合は、取得したフィールドの辞書を指定秒数キャッシュする
+
+    Args:
+        user_id (int): ユーザーID
+
+    Returns:
+        dict: フィールド名と値の辞書。ユーザーが存在しない場合はNone
+    """
+    timeout = settings.SIMPLE_JWT.get("TOKEN_USER_CACHE_TIMEOUT")
+    if not timeout:
+        return User.objects.filter(id=user_id).values(*TOKEN_USER_FIELDS).first()
+
+    key = get_user_cache_key(user_id)
+    fields = cache.get(key)
+    if fields is None:
+        fields = User.objects.filter(id=user_id).values(*TOKEN_USER_FIELDS).first()
+        if fields is not None:
+            cache.set(key, fields, timeout)
+    return fields
+
+
+def invalidate_user_load(user_id):
+    """キャッシュしたユーザー情報を削除する
+
+    Args:
+        user_id (int): ユーザーID
+    """
+    cache.delete(get_user_cache_key(user_id))
+
+
+class ClaimsTokenUser(TokenUser):
+    """アクセストークンのクレームから作成する、DBにアクセスしないユーザークラス
+
+    ユーザーID、メールアドレス、有効かどうか、有料会員かどうかはクレームから取得する。
+    管理者の権限等のクレームに含まれない情報は、参照時にユーザー情報のTOKEN_USER_FIELDSのフィールドをDBから取得する
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token["user_id"])
+
+    @cached_property
+    def email(self):
+        return self.token["email"]
+
+    @cached_property
+    def is_active(self):
+        return self.get_claim_or_user_field("is_active")
+
+    @cached_property
+    def is_paid(self):
+        return self.get_claim_or_user_field("is_paid")
+
+    @cached_property
+    def user_fields(self):
+        """DBから取得したユーザー情報のフィールドの辞書(存在しない場合はNone)"""
+        return load_user(self.id)
+
+    @cached_property
+    def is_staff(self):
+        return self.get_user_field("is_staff")
+
+    @cached_property
+    def is_superuser(self):
+        return self.get_user_field("is_superuser")
+
+    def get_username(self):
+        return self.email
+
+    def get_claim_or_user_field(self, name):
+        """クレームの値を取得する
+
+        クレームを追加する前に発行されたトークンの場合は、DBから取得したユーザー情報の値とする
+
+        Args:
+            name (str): クレーム名(ユーザー情報のフィールド名)
+
+        Returns:
+            bool: クレームの値。ユーザー情報が存在しない場合はFalse
+        """
+        if name in self.token:
+            return self.token[name]
+        return self.get_user_field(name)
+
+    def get_user_field(self, name):
+        """DBから取得したユーザー情報のフィールドの値を取得する
+
+        Args:
+            name (str): フィールド名(TOKEN_USER_FIELDSのいずれか)
+
+        Returns:
+            bool: フィールドの値。ユーザー情報が存在しない場合はFalse
+        """
+        return self.user_fields is not None and self.user_fields[name]
+
+
+class CookieJWTAuthentication(JWTStatelessUserAuthentication):
     """CookieからJWTアクセストークンを使用して認証を行うクラス
 
     デフォルトのJWT認証に加えて、リクエストヘッダーだけでなく、Cookieに保存されたアクセストークンから
-    認証を行う
+    認証を行う。ユーザーはDBから取得せず、アクセストークンのクレームから作成する。
+    クレームはリフレッシュトークンでの払い出し時にDBの値で更新し、無効化されたユーザーの払い出しは拒否するため、
+    ユーザーの無効化はアクセストークンの有効期限内に反映される
     """
 
     def authenticate(self, request):
@@ -41,9 +166,31 @@ class CookieJWTAuthentication(JWTAuthentication):
         # アクセストークンの検証
         validated_token = self.get_validated_token(raw_token)
 
-        # 検証済みトークンからユーザーを取得
+        # 検証済みトークンからユーザーを作成
         return self.get_user(validated_token), validated_token
 
+    def get_user(self, validated_token):
+        """検証済みトークンのクレームからユーザーを作成する
+
+        Args:
+            validated_token (Token): 検証済みのアクセストークン
+
+        Returns:
+            ClaimsTokenUser: トークンのクレームから作成したユーザー
+
+        Raises:
+            InvalidToken: ユーザーIDのクレームがない場合
+            AuthenticationFailed: ユーザーが無効な場合
+        """
+        if "user_id" not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = api_settings.TOKEN_USER_CLASS(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        return user
+
     def get_raw_token_from_cookie(self, request):
         """Cookieからアクセストークンを取得するメソッド
 
@@ -0,0 +1,326 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from .cache import response_cache
+from .signing import SignedAccessToken, token_backend
+
+
+class BloomFilter:
+    """文字列の集合を固定長のビット配列で保持するBloomフィルタ
+
+    集合に含まれない文字列を含まれると判定する(偽陽性)ことはあるが、
+    集合に含まれる文字列を含まれないと判定することはない
+
+    Attributes:
+        capacity (int): 偽陽性率を保つ要素数の上限
+        size (int): ビット配列のビット数
+        hash_count (int): 1つの要素で設定するビット数
+    """
+
+    __slots__ = ("capacity", "size", "hash_count", "bits")
+
+    def __init__(self, capacity, false_positive_rate):
+        """要素数の上限と偽陽性率から、ビット配列の長さとハッシュ数を決定する
+
+        Args:
+            capacity (int): 要素数の上限
+            false_positive_rate (float): 要素数が上限の場合の偽陽性率
+        """
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item):
+        """要素に対応するビットの位置を計算する(2つのハッシュ値の線形結合によるダブルハッシュ)
+
+        Args:
+            item (str): 要素
+
+        Yields:
+            int: ビットの位置
+        """
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, item):
+        """要素を追加する
+
+        Args:
+            item (str): 要素
+        """
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class JtiBlacklist:
+    """ブラックリストに登録されたリフレッシュトークンのJTIを、ワーカープロセス内で判定するクラス
+
+    有効期限内のブラックリストのJTIをBloomフィルタに保持し、フィルタに含まれないJTIは
+    DBを参照せずにブラックリスト外と判定する。直近に登録・確認したJTIはLRUで正確に保持し、
+    フィルタに含まれLRUに含まれないJTIのみDBで確認する(偽陽性の場合はDBへのフォールバックとなる)。
+
+    ブラックリストの登録・削除時はキャッシュのバージョン(added、removed)を更新し、
+    各プロセスは判定の前にバージョンを確認する。addedが変わった場合は前回以降に登録された行を追加し、
+    removedが変わった場合はDBから作成し直す。
+    バージョンは全てのワーカープロセスで共有するキャッシュに保持する必要がある(LocMemCacheでは
+    他のプロセスでの登録が通知されず、ブラックリストのトークンをブラックリスト外と判定する)
+
+    Attributes:
+        version_scope (str): ブラックリストのバージョンの管理単位
+        sync_overlap (int): 追加の読み込み時に、前回の最大IDから遡って読み込む件数
+            (IDの採番順とコミット順が異なる行の読み漏れを防ぐ)
+    """
+
+    version_scope = "token_blacklist"
+    sync_overlap = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._filter = None
+        self._recent = OrderedDict()
+        self._versions = None
+        self._last_id = 0
+        self._count = 0
+        self._counters = dict.fromkeys(
+            ["checks", "memory_negatives", "lru_hits", "db_fallbacks", "false_positives", "rebuilds", "syncs"], 0
+        )
+
+    @property
+    def options(self):
+        """Bloomフィルタの要素数の上限、偽陽性率、LRUの件数の設定"""
+        return settings.TOKEN_BLACKLIST_FILTER
+
+    def count(self, name):
+        """メトリクスのカウンタを加算する
+
+        Args:
+            name (str): カウンタ名
+        """
+        with self._lock:
+            self._counters[name] += 1
+
+    def remember(self, jti):
+        """JTIをBloomフィルタとLRUに追加する(ロックを取得して呼び出す)
+
+        Args:
+            jti (str): ブラックリストに登録されたJTI
+        """
+        self._filter.add(jti)
+        self._recent[jti] = True
+        self._recent.move_to_end(jti)
+        while len(self._recent) > self.options["LRU_SIZE"]:
+            self._recent.popitem(last=False)
+
+    def rebuild(self):
+        """有効期限内のブラックリストのJTIをDBから読み込み、Bloomフィルタを作成し直す(ロックを取得して呼び出す)"""
+        rows = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow()).values_list("token__jti", flat=True)
+        )
+        capacity = max(self.options["CAPACITY"], len(rows) * 2)
+
+        bloom_filter = BloomFilter(capacity, self.options["FALSE_POSITIVE_RATE"])
+        for jti in rows:
+            bloom_filter.add(jti)
+
+        # contains()はロックを取得せずにBloomフィルタを参照するため、作成途中のフィルタを参照させないよう
+        # 作成し終えたフィルタとLRUを1回の代入で置き換える
+        self._filter, self._recent = bloom_filter, OrderedDict()
+        self._count = len(rows)
+        self._last_id = BlacklistedToken.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        self._counters["rebuilds"] += 1
+
+    def load_added(self):
+        """前回以降にブラックリストに登録された行をDBから読み込み、Bloomフィルタに追加する(ロックを取得して呼び出す)"""
+        rows = list(
+            BlacklistedToken.objects.filter(id__gt=self._last_id - self.sync_overlap)
+            .order_by("id")
+            .values_list("id", "token__jti")
+        )
+        for blacklisted_id, jti in rows:
+            if blacklisted_id > self._last_id:
+                self._count += 1
+            self.remember(jti)
+        if rows:
+            self._last_id = max(self._last_id, rows[-1][0])
+        self._counters["syncs"] += 1
+
+        # 要素数が上限を超えた場合は、有効期限切れのJTIを除いて作成し直す
+        if self._count > self._filter.capacity:
+            self.rebuild()
+
+    def sync(self):
+        """キャッシュのバージョンを確認し、他のプロセスでの登録・削除をBloomフィルタに反映する"""
+        versions = response_cache.get_versions(self.version_scope, ["added", "removed"])
+        if versions == self._versions:
+            return
+
+        with self._lock:
+            if self._filter is None or self._versions is None or versions["removed"] != self._versions["removed"]:
+                self.rebuild()
+            elif versions["added"] != self._versions["added"]:
+                self.load_added()
+            self._versions = versions
+
+    def contains(self, jti):
+        """JTIがブラックリストに登録されているかどうかを判定する
+
+        Args:
+            jti (str): リフレッシュトークンのJTI
+
+        Returns:
+            bool: ブラックリストに登録されている場合はTrue
+        """
+        self.sync()
+        self.count("checks")
+
+        # Bloomフィルタに含まれない場合は登録されていない
+        if jti not in self._filter:
+            self.count("memory_negatives")
+            return False
+
+        # 直近に登録・確認したJTIはLRUで判定
+        with self._lock:
+            if jti in self._recent:
+                self._recent.move_to_end(jti)
+                self._counters["lru_hits"] += 1
+                return True
+
+        # DBで確認し、登録されている場合はLRUに追加
+        self.count("db_fallbacks")
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            with self._lock:
+                self.remember(jti)
+            return True
+
+        self.count("false_positives")
+        return False
+
+    def added(self, jti):
+        """ブラックリストへの登録を全てのプロセスに通知する
+
+        Args:
+            jti (str): ブラックリストに登録したJTI
+        """
+        response_cache.invalidate(self.version_scope, "added")
+
+        def remember():
+            with self._lock:
+                if self._filter is not None:
+                    self.remember(jti)
+
+        # ロールバックされた登録をブラックリストとして判定しないよう、コミット後にLRUに追加する
+        transaction.on_commit(remember)
+
+    def removed(self):
+        """ブラックリストからの削除を全てのプロセスに通知し、Bloomフィルタを作成し直す
+
+        有効期限切れのトークンの削除中は、フィルタに含まれていても判定に影響しないため通知しない
+        """
+        if not getattr(self._local, "deleting_expired", False):
+            response_cache.invalidate(self.version_scope, "removed")
+
+    @contextmanager
+    def deleting_expired(self):
+        """有効期限切れのトークンを削除する間、削除の通知を行わないコンテキストマネージャ"""
+        self._local.deleting_expired = True
+        try:
+            yield
+        finally:
+            self._local.deleting_expired = False
+
+    def stats(self):
+        """ワーカープロセス内の判定の統計情報を取得する
+
+        Returns:
+            dict: フィルタの要素数・上限・サイズ、LRUの件数と判定の結果毎の件数
+        """
+        with self._lock:
+            return {
+                "size": self._count,
+                "capacity": self._filter.capacity if self._filter is not None else 0,
+                "filter_bytes": len(self._filter.bits) if self._filter is not None else 0,
+                "lru_size": len(self._recent),
+                **self._counters,
+            }
+
+
+jti_blacklist = JtiBlacklist()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """ブラックリストの確認をワーカープロセス内のJtiBlacklistで行い、署名鍵のkidで署名・検証するリフレッシュトークン"""
+
+    access_token_class = SignedAccessToken
+    _token_backend = token_backend
+
+    def check_blacklist(self):
+        """トークンがブラックリストに登録されているかどうかを確認する
+
+        Raises:
+            TokenError: ブラックリストに登録されている場合
+        """
+        if jti_blacklist.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+def prune_expired_tokens(batch_size=1000, pause=0.0):
+    """有効期限切れのリフレッシュトークンを、batch_size件ずつ別のトランザクションで削除する
+
+    削除対象はOutstandingTokenのIDの昇順にキーセットで取得し、ブラックリストの行もカスケードで削除する。
+    1回のトランザクションで削除する行数を制限してロックの保持時間を短くし、
+    チャンクの間にpause秒待機することで、稼働中のトークンの発行・払い出しを妨げないようにする
+
+    Args:
+        batch_size (int): 1回のトランザクションで削除するOutstandingTokenの件数
+        pause (float): チャンクの間の待機時間(秒)
+
+    Yields:
+        dict: チャンク毎の削除したOutstandingToken・BlacklistedTokenの件数(outstanding, blacklisted)と
+            処理時間(seconds)
+    """
+    # 実行中に有効期限切れになったトークンは対象外とし、処理の終了を保証する
+    expired_before = aware_utcnow()
+    last_id = 0
+
+    while True:
+        started_at = time.perf_counter()
+        token_ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=expired_before, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not token_ids:
+            return
+
+        with transaction.atomic(), jti_blacklist.deleting_expired():
+            _, deleted = OutstandingToken.objects.filter(id__in=token_ids).delete()
+
+        last_id = token_ids[-1]
+        yield {
+            "outstanding": deleted.get(OutstandingToken._meta.label, 0),
+            "blacklisted": deleted.get(BlacklistedToken._meta.label, 0),
+            "seconds": time.perf_counter() - started_at,
+        }
+
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,409 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    """シリアライズ済みのレスポンスデータをユーザー毎・エンドポイント毎にキャッシュするクラス
+
+    キャッシュキーにはユーザー毎のバージョンを含め、ユーザーのデータが更新された際は
+    バージョンを更新することで、そのユーザーの全エンドポイントのキャッシュを無効化する。
+    レスポンスデータにはマスタデータの名称等が含まれるため、キャッシュキーには全体で1つの
+    マスタデータのバージョンも含め、マスタデータの更新時は1件のバージョンの更新で全てのキャッシュを無効化する。
+    バージョンは更新日時(UNIX時間)とランダムな値からなり、ETagとLast-Modifiedの作成にも使用する。
+    ヒット数とミス数はエンドポイント毎にワーカープロセス内で集計する
+
+    Attributes:
+        key_prefix (str): レスポンスデータのキャッシュキーの接頭辞
+        version_prefix (str): バージョンのキャッシュキーの接頭辞
+        master_scope (str): マスタデータのバージョンの管理単位
+        master_scope_id (str): マスタデータのバージョンのID
+    """
+
+    key_prefix = "climbing:response"
+    version_prefix = "climbing:version"
+    master_scope = "master"
+    master_scope_id = "all"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @property
+    def timeout(self):
+        """レスポンスデータのキャッシュの有効期間(秒)"""
+        return settings.RESPONSE_CACHE["TIMEOUT"]
+
+    @staticmethod
+    def new_version():
+        """新しいバージョンを作成する
+
+        Returns:
+            str: "更新日時(UNIX時間).ランダムな値"形式のバージョン
+        """
+        return f"{int(time.time())}.{uuid.uuid4().hex}"
+
+    def get_version(self, scope, scope_id):
+        """キャッシュのバージョンを取得する
+
+        バージョンが存在しない場合は新しいバージョンを登録する
+
+        Args:
+            scope (str): バージョンの管理単位(例: "user"、"activity")
+            scope_id (int): 管理単位のID
+
+        Returns:
+            str: キャッシュのバージョン
+        """
+        version_key = f"{self.version_prefix}:{scope}:{scope_id}"
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, self.new_version(), None)
+            version = cache.get(version_key)
+        return version
+
+    def get_versions(self, scope, scope_ids):
+        """複数のIDのキャッシュのバージョンをまとめて取得する
+
+        バージョンが存在しないIDは新しいバージョンを登録する
+
+        Args:
+            scope (str): バージョンの管理単位(例: "activity")
+            scope_ids (list[int]): 管理単位のIDのリスト
+
+        Returns:
+            dict: 管理単位のIDをキー、キャッシュのバージョンを値とする辞書
+        """
+        version_keys = {scope_id: f"{self.version_prefix}:{scope}:{scope_id}" for scope_id in scope_ids}
+        found = cache.get_many(version_keys.values())
+        return {
+            scope_id: found[version_key] if version_key in found else self.get_version(scope, scope_id)
+            for scope_id, version_key in version_keys.items()
+        }
+
+    @classmethod
+    def combine_versions(cls, *versions):
+        """複数のバージョンを1つのバージョンにまとめる
+
+        Args:
+            *versions (str): キャッシュのバージョン
+
+        Returns:
+            str: "最新の更新日時(UNIX時間).各バージョン"形式のバージョン
+        """
+        updated_at = max(cls.get_last_modified(version) for version in versions)
+        return ".".join([str(updated_at), *versions])
+
+    def get_response_versions(self, scope, scope_ids):
+        """複数のIDのレスポンスデータのバージョン(管理単位とマスタデータのバージョンをまとめたもの)を取得する
+
+        管理単位とマスタデータのバージョンは1回のキャッシュの参照でまとめて取得する
+
+        Args:
+            scope (str): バージョンの管理単位(例: "user"、"activity")
+            scope_ids (list[int]): 管理単位のIDのリスト
+
+        Returns:
+            dict: 管理単位のIDをキー、レスポンスデータのバージョンを値とする辞書
+        """
+        master_key = f"{self.version_prefix}:{self.master_scope}:{self.master_scope_id}"
+        version_keys = {scope_id: f"{self.version_prefix}:{scope}:{scope_id}" for scope_id in scope_ids}
+        found = cache.get_many([master_key, *version_keys.values()])
+        master_version = found.get(master_key) or self.get_version(self.master_scope, self.master_scope_id)
+        return {
+            scope_id: self.combine_versions(
+                found[version_key] if version_key in found else self.get_version(scope, scope_id), master_version
+            )
+            for scope_id, version_key in version_keys.items()
+        }
+
+    def get_response_version(self, scope, scope_id):
+        """レスポンスデータのバージョン(管理単位とマスタデータのバージョンをまとめたもの)を取得する
+
+        Args:
+            scope (str): バージョンの管理単位(例: "user"、"activity")
+            scope_id (int): 管理単位のID
+
+        Returns:
+            str: レスポンスデータのバージョン
+        """
+        return self.get_response_versions(scope, [scope_id])[scope_id]
+
+    def invalidate(self, scope, *scope_ids):
+        """バージョンを更新してキャッシュを無効化する
+
+        トランザクション内で呼ばれた場合は、コミット前に古いデータでキャッシュが再作成されないよう、
+        コミット後にもう一度バージョンを更新する
+
+        Args:
+            scope (str): バージョンの管理単位(例: "user"、"activity")
+            *scope_ids (int): 管理単位のID
+        """
+
+        def bump():
+            version = self.new_version()
+            cache.set_many({f"{self.version_prefix}:{scope}:{scope_id}": version for scope_id in scope_ids}, None)
+
+        if scope_ids:
+            bump()
+            transaction.on_commit(bump)
+
+    @staticmethod
+    def make_etag(endpoint, variant, version, media_type):
+        """レスポンスデータのETagを作成する
+
+        Args:
+            endpoint (str): エンドポイント名
+            variant (str): クエリパラメータ等によるレスポンスの区別
+            version (str): キャッシュのバージョン
+            media_type (str): レスポンスのメディアタイプ(JSON、MessagePack等の表現毎にETagを区別する)
+
+        Returns:
+            str: 強いETag
+        """
+        digest = hashlib.sha1(f"{endpoint}:{variant}:{version}:{media_type}".encode()).hexdigest()
+        return f'"{digest}"'
+
+    @staticmethod
+    def get_last_modified(version):
+        """バージョンから更新日時を取得する
+
+        Args:
+            version (str): キャッシュのバージョン
+
+        Returns:
+            int: 更新日時(UNIX時間)
+        """
+        return int(version.split(".", 1)[0])
+
+    def make_key(self, endpoint, scope, scope_id, version, variant=""):
+        """レスポンスデータのキャッシュキーを作成する
+
+        クエリパラメータの値には空白や制御文字が含まれ、長さにも上限がないため、
+        Memcached等のキーの制限(250文字以内、空白・制御文字なし)に収まるようレスポンスの区別はハッシュ化する
+
+        Args:
+            endpoint (str): エンドポイント名
+            scope (str): バージョンの管理単位(例: "user"、"activity")
+            scope_id (int): 管理単位のID
+            version (str): 管理単位のキャッシュのバージョン
+            variant (str, optional): クエリパラメータ等によるレスポンスの区別
+
+        Returns:
+            str: キャッシュキー
+        """
+        variant_digest = hashlib.sha1(variant.encode()).hexdigest() if variant else ""
+        return f"{self.key_prefix}:{endpoint}:{scope}:{scope_id}:{version}:{variant_digest}"
+
+    def get(self, endpoint, key):
+        """キャッシュからレスポンスデータを取得し、ヒット数またはミス数を加算する
+
+        Args:
+            endpoint (str): エンドポイント名
+            key (str): キャッシュキー
+
+        Returns:
+            object: キャッシュされたレスポンスデータ。存在しない場合はNone
+        """
+        data = cache.get(key)
+        with self._lock:
+            self._counters[endpoint]["hits" if data is not None else "misses"] += 1
+        return data
+
+    def get_many(self, endpoint, keys):
+        """キャッシュから複数のレスポンスデータをまとめて取得し、ヒット数とミス数を加算する
+
+        Args:
+            endpoint (str): エンドポイント名
+            keys (list[str]): キャッシュキーのリスト
+
+        Returns:
+            dict: キャッシュキーをキー、レスポンスデータを値とする辞書(存在しないキーは含まない)
+        """
+        found = cache.get_many(keys)
+        with self._lock:
+            self._counters[endpoint]["hits"] += len(found)
+            self._counters[endpoint]["misses"] += len(keys) - len(found)
+        return found
+
+    def set(self, key, data):
+        """レスポンスデータをキャッシュに保存する
+
+        Args:
+            key (str): キャッシュキー
+            data (object): レスポンスデータ
+        """
+        cache.set(key, data, self.timeout)
+
+    def set_many(self, items):
+        """複数のレスポンスデータをまとめてキャッシュに保存する
+
+        Args:
+            items (dict): キャッシュキーをキー、レスポンスデータを値とする辞書
+        """
+        cache.set_many(items, self.timeout)
+
+    def stats(self):
+        """ワーカープロセス内のエンドポイント毎のヒット数とミス数を取得する
+
+        Returns:
+            dict: プロセスIDとエンドポイント毎のヒット数、ミス数
+        """
+        with self._lock:
+            endpoints = {endpoint: dict(counter) for endpoint, counter in self._counters.items()}
+        return {"pid": os.getpid(), "endpoints": endpoints}
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_user_cache(user_id):
+    """ユーザーのレスポンスデータのキャッシュを無効化する
+
+    Args:
+        user_id (int): ユーザーID
+    """
+    if user_id is not None:
+        response_cache.invalidate("user", user_id)
+
+
+def invalidate_activity_cache(*activity_ids):
+    """活動のレスポンスデータのキャッシュを無効化する
+
+    Args:
+        *activity_ids (int): 活動ID
+    """
+    response_cache.invalidate("activity", *[activity_id for activity_id in activity_ids if activity_id is not None])
+
+
+def get_variant(request):
+    """クエリパラメータからレスポンスの区別を作成する
+
+    Args:
+        request (Request): リクエストオブジェクト
+
+    Returns:
+        str: パラメータ名順に並べたクエリパラメータ(同じパラメータの複数の値を含む)
+    """
+    return "&".join(f"{key}={value}" for key, values in sorted(request.query_params.lists()) for value in values)
+
+
+def is_not_modified(request, etag):
+    """リクエストのIf-None-Matchがレスポンスデータのetagと一致するかどうかを判定する
+
+    Args:
+        request (Request): リクエストオブジェクト
+        etag (str): レスポンスデータのETag
+
+    Returns:
+        bool: 一致する場合はTrue
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+
+    # If-None-Matchは弱い比較のため、W/を除いて比較
+    etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+    return "*" in etags or etag in etags
+
+
+def set_validators(response, etag, version):
+    """レスポンスにETagとLast-Modifiedを設定する
+
+    ETagはAcceptヘッダーで決定した表現毎に異なるため、Vary: Acceptも設定する
+
+    Args:
+        response (Response): レスポンスオブジェクト
+        etag (str): レスポンスデータのETag
+        version (str): キャッシュのバージョン
+
+    Returns:
+        Response: ETagとLast-Modifiedを設定したレスポンスオブジェクト
+    """
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(response_cache.get_last_modified(version))
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def cache_response(endpoint, scope, url_kwarg):
+    """GETメソッドのレスポンスデータを、URLのIDとマスタデータのバージョン毎にキャッシュするデコレータ
+
+    URLのIDとクエリパラメータ毎にキャッシュし、ステータスコード200のレスポンスのみ保存する。
+    レスポンスにはETagとLast-Modifiedを設定し、If-None-Matchが一致する場合は
+    キャッシュやデータベースを参照せずに304を返す
+
+    Args:
+        endpoint (str): エンドポイント名
+        scope (str): バージョンの管理単位(例: "user"、"activity")
+        url_kwarg (str): 管理単位のIDを示すURLのキーワード引数名
+
+    Returns:
+        callable: デコレータ
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            # データ取得前のバージョンでキーを作成し、取得中に更新されたデータを古いバージョンで保存しない
+            scope_id = kwargs[url_kwarg]
+            variant = get_variant(request)
+            version = response_cache.get_response_version(scope, scope_id)
+            etag = response_cache.make_etag(endpoint, variant, version, request.accepted_media_type)
+            if is_not_modified(request, etag):
+                return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, version)
+
+            key = response_cache.make_key(endpoint, scope, scope_id, version, variant)
+            data = response_cache.get(endpoint, key)
+            if data is not None:
+                return set_validators(Response(data), etag, version)
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                response_cache.set(key, response.data)
+                set_validators(response, etag, version)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cache_user_response(endpoint):
+    """ユーザー単位のGETメソッドのレスポンスデータをキャッシュするデコレータ
+
+    ユーザーのデータが更新された場合は、ユーザーのバージョンの更新により無効化される
+
+    Args:
+        endpoint (str): エンドポイント名
+
+    Returns:
+        callable: デコレータ
+    """
+    return cache_response(endpoint, "user", "user_id")
+
+
+def cache_activity_response(endpoint):
+    """活動単位のGETメソッドのレスポンスデータをキャッシュするデコレータ
+
+    活動、活動に紐づくデータ、活動したユーザーのデータが更新された場合は、活動のバージョンの更新により無効化される
+
+    Args:
+        endpoint (str): エンドポイント名
+
+    Returns:
+        callable: デコレータ
+    """
+    return cache_response(endpoint, "activity", "activity_id")
@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from .cache import invalidate_activity_cache, invalidate_user_cache, response_cache
+from .models import ActivityPhotos, ActivitySummary, Contract
+
+
+def _photo_domo_point_totals(field):
+    """活動写真のDOMOポイントの合計を、指定フィールド毎に1回のGROUP BYで取得する
+
+    Args:
+        field (str): 集計の単位とするActivityPhotosのフィールド名(user_id, activity_id)
+
+    Returns:
+        dict: フィールドの値をキー、DOMOポイントの合計を値とする辞書
+    """
+    # デフォルトの並び順(id)がGROUP BYに含まれないよう、order_by()で解除する
+    return dict(
+        ActivityPhotos.objects.order_by().values(field).annotate(total=Sum("domo_points")).values_list(field, "total")
+    )
+
+
+def adjust_contract_domo_points(user_id, delta):
+    """ユーザーの契約情報のDOMOポイントを増減する
+
+    Args:
+        user_id (int): ユーザーID
+        delta (int): 増減するDOMOポイント
+    """
+    if user_id is not None and delta:
+        Contract.objects.filter(user_id=user_id).update(domo_points=F("domo_points") + delta)
+        invalidate_user_cache(user_id)
+
+
+def add_domo_points(photo_id, points):
+    """活動写真にDOMOポイントを加算し、活動とユーザーのDOMOポイントの合計にも同じ値を加算する
+
+    写真、活動の集計データ、契約情報のDOMOポイントをそれぞれF()式で加算するため、
+    同時に加算された場合も合計を読み直さずに正しい値となる
+
+    Args:
+        photo_id (int): 活動写真ID
+        points (int): 加算するDOMOポイント(負の値の場合は減算)
+
+    Raises:
+        ActivityPhotos.DoesNotExist: 活動写真が存在しない場合
+    """
+    photo = ActivityPhotos.objects.values("activity_id", "user_id").get(id=photo_id)
+
+    with transaction.atomic():
+        ActivityPhotos.objects.filter(id=photo_id).update(domo_points=F("domo_points") + points)
+        ActivitySummary.objects.filter(activity_id=photo["activity_id"]).update(
+            total_domo_points=F("total_domo_points") + points
+        )
+        adjust_contract_domo_points(photo["user_id"], points)
+        invalidate_activity_cache(photo["activity_id"])
+
+
+def find_domo_point_drift():
+    """契約情報と活動の集計データのDOMOポイントを、活動写真の合計と照合して差異を検出する
+
+    活動写真の合計はユーザー毎、活動毎にそれぞれ1回のGROUP BYで取得し、
+    契約情報・活動の集計データと同じトランザクション(同じ時点のデータ)で照合する
+
+    Returns:
+        tuple[list[dict], list[dict]]: 差異のあった(契約情報, 活動の集計データ)のリスト。
+            契約情報はid、user_id、domo_points、活動の集計データはactivity_id、user_id、
+            total_domo_pointsと、活動写真の合計(expected)を持つ
+    """
+    with transaction.atomic():
+        user_totals = _photo_domo_point_totals("user_id")
+        activity_totals = _photo_domo_point_totals("activity_id")
+        contracts = Contract.objects.order_by("user_id").values("id", "user_id", "domo_points")
+        summaries = ActivitySummary.objects.order_by("activity_id").values(
+            "activity_id", "total_domo_points", user_id=F("activity__user_id")
+        )
+
+        drifted_contracts = [
+            {**row, "expected": user_totals.get(row["user_id"], 0)}
+            for row in contracts
+            if row["domo_points"] != user_totals.get(row["user_id"], 0)
+        ]
+        drifted_summaries = [
+            {**row, "expected": activity_totals.get(row["activity_id"], 0)}
+            for row in summaries
+            if row["total_domo_points"] != activity_totals.get(row["activity_id"], 0)
+        ]
+
+    return drifted_contracts, drifted_summaries
+
+
+def apply_domo_point_drift(drifted_contracts, drifted_summaries, batch_size=1000):
+    """検出した差異を、契約情報と活動の集計データにbatch_size件ずつbulk_updateで反映する
+
+    照合後にF()式で加算されたDOMOポイントを上書きしないよう、照合時の合計との差分をF()式で加算する
+
+    Args:
+        drifted_contracts (list[dict]): find_domo_point_driftで検出した契約情報の差異
+        drifted_summaries (list[dict]): find_domo_point_driftで検出した活動の集計データの差異
+        batch_size (int): 1回のUPDATEで更新する件数
+    """
+    contracts = [
+        Contract(id=row["id"], domo_points=F("domo_points") + (row["expected"] - row["domo_points"]))
+        for row in drifted_contracts
+    ]
+    summaries = [
+        ActivitySummary(
+            activity_id=row["activity_id"],
+            total_domo_points=F("total_domo_points") + (row["expected"] - row["total_domo_points"]),
+        )
+        for row in drifted_summaries
+    ]
+
+    with transaction.atomic():
+        Contract.objects.bulk_update(contracts, ["domo_points"], batch_size=batch_size)
+        ActivitySummary.objects.bulk_update(summaries, ["total_domo_points"], batch_size=batch_size)
+
+        # bulk_updateはシグナルを送信しないため、更新したユーザーと活動のキャッシュをまとめて無効化する
+        user_ids = {row["user_id"] for row in [*drifted_contracts, *drifted_summaries]}
+        response_cache.invalidate("user", *user_ids)
+        invalidate_activity_cache(*[row["activity_id"] for row in drifted_summaries])
@@ -0,0 +1,157 @@
+from datetime import date, datetime, time, timedelta
+from django.db.models import Exists, OuterRef, Q
+from .masters import master_registry
+from .models import (
+    ActivityArea,
+    ActivityMountain,
+    ActivityPrefecture,
+    ActivityTag,
+    AreaMaster,
+    MountainMaster,
+    PrefectureMaster,
+    TagMaster,
+)
+
+
+class InvalidFilterParameter(Exception):
+    """絞り込み条件のパラメータが不正な場合の例外"""
+
+
+class ActivityFilter:
+    """クエリパラメータから活動一覧の絞り込み条件を作成するクラス
+
+    名称による絞り込みは、同じパラメータを複数指定した場合はいずれかに一致する活動、
+    異なるパラメータを指定した場合は全てに一致する活動を対象とする。
+    名称はマスタデータのレジストリでIDに変換し、活動に紐づくテーブルへのEXISTSサブクエリ、
+    期間と数値の範囲は活動テーブルの条件としてSQLで評価する
+
+    Attributes:
+        name_filters (dict): クエリパラメータ名と(活動に紐づくモデル, マスタデータのモデル, IDのフィールド)の対応
+        range_filters (dict): 下限・上限のクエリパラメータ名の接頭辞と活動のフィールドの対応
+        start_date_from_param (str): 活動開始日(以降)のクエリパラメータ名
+        start_date_to_param (str): 活動開始日(以前)のクエリパラメータ名
+        course_constant_level_param (str): コース定数レベルパターンIDのクエリパラメータ名
+    """
+
+    name_filters = {
+        "tag": (ActivityTag, TagMaster, "tag_id"),
+        "prefecture": (ActivityPrefecture, PrefectureMaster, "prefecture_id"),
+        "area": (ActivityArea, AreaMaster, "area_id"),
+        "mountain": (ActivityMountain, MountainMaster, "mountain_id"),
+    }
+    range_filters = {
+        "route_distance": "route_distance",
+        "ascent_distance": "ascent_distance",
+    }
+    start_date_from_param = "start_date_from"
+    start_date_to_param = "start_date_to"
+    course_constant_level_param = "course_constant_level"
+
+    def __init__(self, query_params):
+        """クエリパラメータから絞り込み条件を作成する
+
+        Args:
+            query_params (QueryDict): リクエストのクエリパラメータ
+
+        Raises:
+            InvalidFilterParameter: 絞り込み条件のパラメータが不正な場合
+        """
+        self.conditions = []
+
+        # 名称による絞り込み条件を作成(同名の山等は全てのIDを対象とする)
+        for param, (model, master_model, id_field) in self.name_filters.items():
+            names = [name for name in query_params.getlist(param) if name]
+            if names:
+                master_ids = master_registry.get(master_model).find_ids("name", names)
+                self.conditions.append(
+                    Exists(model.objects.filter(activity=OuterRef("pk"), **{f"{id_field}__in": master_ids}))
+                )
+
+        # 活動開始日の期間による絞り込み条件を作成(終了日は当日を含む)
+        start_date_from = self.parse_date(query_params, self.start_date_from_param)
+        start_date_to = self.parse_date(query_params, self.start_date_to_param)
+        if start_date_from is not None:
+            self.conditions.append(Q(start_at__gte=datetime.combine(start_date_from, time.min)))
+        if start_date_to is not None:
+            self.conditions.append(Q(start_at__lt=datetime.combine(start_date_to + timedelta(days=1), time.min)))
+
+        # 距離の範囲による絞り込み条件を作成
+        for prefix, field in self.range_filters.items():
+            minimum = self.parse_integer(query_params, f"{prefix}_min")
+            maximum = self.parse_integer(query_params, f"{prefix}_max")
+            if minimum is not None:
+                self.conditions.append(Q(**{f"{field}__gte": minimum}))
+            if maximum is not None:
+                self.conditions.append(Q(**{f"{field}__lte": maximum}))
+
+        # コース定数レベルによる絞り込み条件を作成
+        levels = [
+            self.parse_integer_value(self.course_constant_level_param, value)
+            for value in query_params.getlist(self.course_constant_level_param)
+            if value
+        ]
+        if levels:
+            self.conditions.append(Q(course_constant_level_id__in=levels))
+
+    @staticmethod
+    def parse_integer_value(param, value):
+        """パラメータの値を整数に変換する
+
+        Args:
+            param (str): クエリパラメータ名
+            value (str): クエリパラメータの値
+
+        Returns:
+            int: 変換した整数
+
+        Raises:
+            InvalidFilterParameter: 0以上の整数でない場合
+        """
+        try:
+            number = int(value)
+        except ValueError:
+            raise InvalidFilterParameter(f"{param} must be an integer")
+
+        if number < 0:
+            raise InvalidFilterParameter(f"{param} must not be negative")
+
+        return number
+
+    def parse_integer(self, query_params, param):
+        """クエリパラメータを整数に変換する
+
+        Args:
+            query_params (QueryDict): リクエストのクエリパラメータ
+            param (str): クエリパラメータ名
+
+        Returns:
+            int: 変換した整数。指定されていない場合はNone
+
+        Raises:
+            InvalidFilterParameter: 0以上の整数でない場合
+        """
+        value = query_params.get(param)
+        return self.parse_integer_value(param, value) if value else None
+
+    @staticmethod
+    def parse_date(query_params, param):
+        """クエリパラメータを日付に変換する
+
+        Args:
+            query_params (QueryDict): リクエストのクエリパラメータ
+            param (str): クエリパラメータ名
+
+        Returns:
+            date: 変換した日付。指定されていない場合はNone
+
+        Raises:
+            InvalidFilterParameter: YYYY-MM-DD形式の日付でない場合
+        """
+        value = query_params.get(param)
+        if not value:
+            return None
+
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise InvalidFilterParameter(f"{param} must be a date in YYYY-MM-DD format")
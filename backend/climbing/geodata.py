@@ -0,0 +1,435 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime
+import numpy as np
+import orjson
+from django.conf import settings
+from .simplify import largest_triangle_three_buckets, meters_per_pixel, simplify_levels
+
+# 活動の地理データの種類とファイル名のパターン(フロントエンドのFILE_PATTERNSに対応)
+GEODATA_FILE_PATTERNS = {
+    "route": re.compile(r"^route_.*\.geojson$"),
+    "graph": re.compile(r"^graph_.*\.geojson$"),
+    "rest_points": re.compile(r"^rest_.*\.json$"),
+    "check_points": re.compile(r"^check_point_.*\.json$"),
+    "photos": re.compile(r"^photo_.*\.json$"),
+    "spots": re.compile(r"^spot_.*\.geojson$"),
+    "gpx": re.compile(r"^yamap_.*\.gpx$"),
+}
+
+# バンドルに内容を含めず、ファイルのURLのみを返す種類
+URL_ONLY_KINDS = {"gpx"}
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+# グラフの系列として返すプロパティ
+CHART_PROPERTIES = ["total_distance", "active_time", "elevation", "average_pace"]
+
+
+def find_geodata_files(activity_dir):
+    """活動のディレクトリから地理データの種類毎のファイル名を取得する
+
+    Args:
+        activity_dir (str): 活動のディレクトリのパス
+
+    Returns:
+        dict: 地理データの種類をキー、ファイル名を値とする辞書(該当するファイルがない種類は含まない)
+    """
+    file_names = sorted(entry.name for entry in os.scandir(activity_dir) if entry.is_file())
+
+    files = {}
+    for kind, pattern in GEODATA_FILE_PATTERNS.items():
+        file_name = next((name for name in file_names if pattern.match(name)), None)
+        if file_name is not None:
+            files[kind] = file_name
+
+    return files
+
+
+def get_source_stats(activity_dir, files):
+    """地理データのファイルのサイズと更新日時を取得する
+
+    Args:
+        activity_dir (str): 活動のディレクトリのパス
+        files (dict): 地理データの種類をキー、ファイル名を値とする辞書
+
+    Returns:
+        dict: 地理データの種類をキー、ファイル名、サイズ、更新日時(ナノ秒)を値とする辞書
+    """
+    sources = {}
+    for kind, file_name in files.items():
+        stat = os.stat(os.path.join(activity_dir, file_name))
+        sources[kind] = {"name": file_name, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+    return sources
+
+
+def load_geodata(activity_dir, files):
+    """活動の地理データのファイルを読み込む
+
+    Args:
+        activity_dir (str): 活動のディレクトリのパス
+        files (dict): 地理データの種類をキー、ファイル名を値とする辞書
+
+    Returns:
+        dict: 地理データの種類をキー、ファイルの内容を値とする辞書(ファイルが存在しない種類はNone)
+    """
+    geodata = {}
+    for kind in GEODATA_FILE_PATTERNS:
+        if kind in URL_ONLY_KINDS:
+            continue
+        if kind not in files:
+            geodata[kind] = None
+            continue
+        with open(os.path.join(activity_dir, files[kind]), "rb") as file:
+            geodata[kind] = orjson.loads(file.read())
+
+    return geodata
+
+
+def compress(data):
+    """データをJSONに変換し、gzipで圧縮する
+
+    Args:
+        data (object): JSONに変換するデータ
+
+    Returns:
+        tuple[bytes, int]: gzipで圧縮したJSONのバイト列、圧縮前のサイズ
+    """
+    content = orjson.dumps(data)
+
+    # 同じ内容から同じバイト列を作成するため、gzipヘッダーの更新日時は0に固定
+    return gzip.compress(content, compresslevel=9, mtime=0), len(content)
+
+
+def build_geodata_bundle(activity_id, activity_dir, files, geodata):
+    """活動の地理データを1つのJSONにまとめ、gzipで圧縮する
+
+    Args:
+        activity_id (int): 活動ID
+        activity_dir (str): 活動のディレクトリのパス
+        files (dict): 地理データの種類をキー、ファイル名を値とする辞書
+        geodata (dict): 地理データの種類をキー、ファイルの内容を値とする辞書
+
+    Returns:
+        tuple[bytes, int]: gzipで圧縮したJSONのバイト列、圧縮前のサイズ
+    """
+    dir_name = os.path.basename(os.path.normpath(activity_dir))
+    public_url = settings.GEODATA["PUBLIC_URL"].rstrip("/")
+
+    bundle = {
+        "activity_id": f"{activity_id:04d}",
+        "files": {kind: f"{public_url}/{dir_name}/{file_name}" for kind, file_name in files.items()},
+        **geodata,
+    }
+
+    return compress(bundle)
+
+
+def build_route_levels(route, tolerances):
+    """ルートを許容誤差毎に簡略化した詳細度のGeoJSONを作成する
+
+    詳細度0は簡略化しないルートとし、許容誤差の昇順に詳細度1以降を作成する。
+    各詳細度は元のルートと同じFeatureCollection形式で、残した点のFeatureをそのまま含む
+
+    Args:
+        route (dict): ルートのGeoJSON
+        tolerances (list[float]): 許容誤差(m)のリスト
+
+    Returns:
+        tuple[float, list[tuple[float, dict]]]: ルートの中心の緯度、(許容誤差, 簡略化したGeoJSON)のリスト
+    """
+    features = route["features"]
+    longitudes = [feature["geometry"]["coordinates"][0] for feature in features]
+    latitudes = [feature["geometry"]["coordinates"][1] for feature in features]
+    center_latitude = (min(latitudes) + max(latitudes)) / 2 if latitudes else 0.0
+
+    tolerances = sorted(tolerances)
+    indices = simplify_levels(longitudes, latitudes, tolerances)
+
+    levels = []
+    for tolerance, kept in zip([0, *tolerances], [range(len(features)), *indices]):
+        simplified = {**route, "features": [features[index] for index in kept]}
+        simplified["properties"] = {
+            **route.get("properties", {}),
+            "simplification": {
+                "tolerance": tolerance,
+                "point_count": len(simplified["features"]),
+                "original_point_count": len(features),
+            },
+        }
+        levels.append((tolerance, simplified))
+
+    return center_latitude, levels
+
+
+def select_route_level(route, zoom=None, max_points=None):
+    """表示するズームレベル、点の数の上限から、マニフェストのルートの詳細度を選択する
+
+    ズームレベルを指定した場合は、許容誤差が1ピクセルあたりの距離以下の最も粗い詳細度、
+    点の数の上限を指定した場合は、点の数が上限以下の最も細かい詳細度を選択し、
+    両方を指定した場合は粗い方を選択する。いずれも指定しない場合は簡略化しないルートを選択する
+
+    Args:
+        route (dict): マニフェストのルートのエントリ
+        zoom (float, optional): 地図のズームレベル
+        max_points (int, optional): 点の数の上限
+
+    Returns:
+        dict: マニフェストのルートの詳細度のエントリ
+    """
+    levels = route["levels"]
+    selected = 0
+
+    if zoom is not None:
+        resolution = meters_per_pixel(zoom, route["center_latitude"])
+        selected = max(
+            (entry["level"] for entry in levels if entry["tolerance"] <= resolution),
+            default=0,
+        )
+
+    if max_points is not None:
+        # 上限以下の詳細度がない場合は最も粗い詳細度とする
+        fitting = min(
+            (entry["level"] for entry in levels if entry["point_count"] <= max_points),
+            default=levels[-1]["level"],
+        )
+        selected = max(selected, fitting)
+
+    return levels[selected]
+
+
+def build_chart_series(graph, points):
+    """グラフのGeoJSONから、点の数を間引いた列指向のグラフの系列を作成する
+
+    距離をx軸、標高をy軸としてLTTB法で間引き、全ての系列で同じ点を選択する。
+    日時はフロントエンドのグラフと同じUNIX時間(ミリ秒)で返す
+
+    Args:
+        graph (dict): グラフのGeoJSON
+        points (int): 間引いた後の点の数の上限
+
+    Returns:
+        dict: 点の数、元の点の数、系列名をキーとする値のリスト
+    """
+    features = graph["features"]
+    properties = [feature["properties"] for feature in features]
+    columns = {name: np.array([item[name] for item in properties], dtype=float) for name in CHART_PROPERTIES}
+    coordinates = np.array([feature["geometry"]["coordinates"] for feature in features], dtype=float).reshape(-1, 2)
+    columns["latitude"] = coordinates[:, 1]
+    columns["longitude"] = coordinates[:, 0]
+
+    selected = largest_triangle_three_buckets(columns["total_distance"], columns["elevation"], points)
+
+    series = {name: values[selected].tolist() for name, values in columns.items()}
+    series["timestamp"] = [
+        int(datetime.fromisoformat(properties[index]["timestamp"]).timestamp() * 1000) for index in selected
+    ]
+
+    return {"point_count": len(selected), "original_point_count": len(features), "series": series}
+
+
+def make_etag(content):
+    """バンドルのETagを作成する
+
+    Args:
+        content (bytes): gzipで圧縮したバンドルのバイト列
+
+    Returns:
+        str: 強いETag
+    """
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+def write_atomic(path, content):
+    """一時ファイルに書き込んでから置き換えることで、読み込み中のファイルを壊さずに書き込む
+
+    Args:
+        path (str): 書き込み先のパス
+        content (bytes): 書き込む内容
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def build_geodata_manifest(source_dir, bundle_dir, force=False):
+    """活動の地理データのディレクトリを走査し、圧縮済みのバンドルとマニフェストを作成する
+
+    ソースファイルのサイズと更新日時が前回のマニフェストと同じ活動は、バンドルを再作成しない
+
+    Args:
+        source_dir (str): 活動IDのディレクトリを含む地理データのディレクトリのパス
+        bundle_dir (str): マニフェストとバンドルの出力先のディレクトリのパス
+        force (bool, optional): Trueの場合は全ての活動のバンドルを再作成する
+
+    Returns:
+        tuple[dict, int]: マニフェスト、再作成したバンドルの件数
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    tolerances = sorted(settings.GEODATA["ROUTE_TOLERANCES"])
+
+    # 許容誤差が変更された場合は、全ての活動のバンドルを再作成する
+    previous_manifest = {} if force else load_manifest_file(bundle_dir)
+    previous = (
+        previous_manifest.get("activities", {}) if previous_manifest.get("route_tolerances") == tolerances else {}
+    )
+
+    activities = {}
+    rebuilt = 0
+    for entry in sorted(os.scandir(source_dir), key=lambda entry: entry.name):
+        # 活動IDのディレクトリのみを対象とする
+        if not entry.is_dir() or not entry.name.isdigit():
+            continue
+
+        activity_id = int(entry.name)
+        files = find_geodata_files(entry.path)
+        sources = get_source_stats(entry.path, files)
+        bundle_name = f"{activity_id:04d}.json.gz"
+
+        # ソースファイルが変更されていない場合は前回のバンドルを使用
+        cached = previous.get(str(activity_id))
+        if (
+            cached is not None
+            and cached["sources"] == sources
+            and os.path.exists(os.path.join(bundle_dir, cached["bundle"]))
+        ):
+            activities[str(activity_id)] = cached
+            continue
+
+        geodata = load_geodata(entry.path, files)
+        content, size = build_geodata_bundle(activity_id, entry.path, files, geodata)
+        write_atomic(os.path.join(bundle_dir, bundle_name), content)
+        rebuilt += 1
+
+        activities[str(activity_id)] = {
+            "bundle": bundle_name,
+            "etag": make_etag(content),
+            "size": size,
+            "compressed_size": len(content),
+            "sources": sources,
+            "route": None,
+        }
+
+        # ルートの詳細度毎の簡略化したGeoJSONを作成
+        if geodata["route"] is not None:
+            center_latitude, levels = build_route_levels(geodata["route"], tolerances)
+            route_levels = []
+            for level, (tolerance, simplified) in enumerate(levels):
+                level_content, level_size = compress(simplified)
+                level_name = f"{activity_id:04d}.route.{level}.json.gz"
+                write_atomic(os.path.join(bundle_dir, level_name), level_content)
+                route_levels.append(
+                    {
+                        "level": level,
+                        "tolerance": tolerance,
+                        "point_count": simplified["properties"]["simplification"]["point_count"],
+                        "bundle": level_name,
+                        "etag": make_etag(level_content),
+                        "size": level_size,
+                        "compressed_size": len(level_content),
+                    }
+                )
+            activities[str(activity_id)]["route"] = {"center_latitude": center_latitude, "levels": route_levels}
+
+    manifest = {"route_tolerances": tolerances, "activities": activities}
+    write_atomic(os.path.join(bundle_dir, MANIFEST_FILE_NAME), orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+
+    return manifest, rebuilt
+
+
+def load_manifest_file(bundle_dir):
+    """マニフェストのファイルを読み込む
+
+    Args:
+        bundle_dir (str): マニフェストとバンドルのディレクトリのパス
+
+    Returns:
+        dict: マニフェスト。ファイルが存在しない場合は空の辞書
+    """
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILE_NAME), "rb") as file:
+            return orjson.loads(file.read())
+    except FileNotFoundError:
+        return {}
+
+
+class GeodataManifest:
+    """活動の地理データのマニフェストをワーカープロセス内に保持するクラス
+
+    リクエスト毎にはマニフェストのファイルの更新日時のみを確認し、
+    build_geodata_manifestコマンドで更新された場合に読み込み直す
+
+    Attributes:
+        _lock (Lock): マニフェストの読み込みの排他制御
+        _cache_key (tuple): 読み込んだマニフェストのパスと更新日時
+        _activities (dict): 活動ID(文字列)をキーとするマニフェストのエントリ
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._activities = {}
+
+    @property
+    def bundle_dir(self):
+        """マニフェストとバンドルのディレクトリのパス"""
+        return settings.GEODATA["BUNDLE_DIR"]
+
+    def get_activities(self):
+        """マニフェストの活動毎のエントリを取得する
+
+        Returns:
+            dict: 活動ID(文字列)をキーとするマニフェストのエントリ
+        """
+        path = os.path.join(self.bundle_dir, MANIFEST_FILE_NAME)
+        try:
+            cache_key = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            return {}
+
+        with self._lock:
+            if self._cache_key != cache_key:
+                self._activities = load_manifest_file(self.bundle_dir).get("activities", {})
+                self._cache_key = cache_key
+            return self._activities
+
+    def get(self, activity_id):
+        """活動のマニフェストのエントリを取得する
+
+        Args:
+            activity_id (int): 活動ID
+
+        Returns:
+            dict: マニフェストのエントリ。地理データが存在しない場合はNone
+        """
+        return self.get_activities().get(str(activity_id))
+
+    def load_bundle(self, entry):
+        """gzipで圧縮済みのバンドルを読み込み、展開したデータを取得する
+
+        Args:
+            entry (dict): マニフェストのエントリ
+
+        Returns:
+            dict: バンドルのデータ
+        """
+        return orjson.loads(gzip.decompress(self.read_bundle(entry)))
+
+    def read_bundle(self, entry):
+        """gzipで圧縮済みのバンドルを読み込む
+
+        Args:
+            entry (dict): マニフェストのエントリ
+
+        Returns:
+            bytes: gzipで圧縮したJSONのバイト列
+        """
+        with open(os.path.join(self.bundle_dir, entry["bundle"]), "rb") as file:
+            return file.read()
+
+
+geodata_manifest = GeodataManifest()
@@ -0,0 +1,261 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyLibMCCache, PyMemcacheCache
+from django.core.cache.backends.redis import RedisCache
+
+# 実行枠のキーの追加(add)をアトミックに行えるキャッシュのバックエンド
+# (LocMemCacheはワーカープロセス内のみの制限となるため、テスト・開発用)
+SHARED_SLOT_BACKENDS = (RedisCache, PyMemcacheCache, PyLibMCCache, LocMemCache)
+
+
+def supports_shared_slots():
+    """キャッシュのバックエンドが、全てのワーカープロセスの実行枠の取得に対応しているかどうかを判定する
+
+    FileBasedCache等のaddは存在の確認と書き込みが別の操作となり、同じ実行枠を複数のプロセスが取得できるため対応しない
+
+    Returns:
+        bool: 対応している場合はTrue
+    """
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], SHARED_SLOT_BACKENDS)
+
+
+def check_shared_limit(app_configs, **kwargs):
+    """SHARED_LIMITが設定されている場合に、キャッシュのバックエンドが対応しているかを確認するシステムチェック
+
+    Returns:
+        list[Error]: 対応していない場合のエラー
+    """
+    if settings.PASSWORD_HASH_EXECUTOR.get("SHARED_LIMIT") is None or supports_shared_slots():
+        return []
+    return [
+        checks.Error(
+            "PASSWORD_HASH_EXECUTOR['SHARED_LIMIT'] requires a cache backend with atomic add.",
+            hint="Use Redis or Memcached (CACHE_BACKEND), or set SHARED_LIMIT to None.",
+            id="climbing.E001",
+        )
+    ]
+
+
+class PasswordHashBusy(Exception):
+    """パスワードのハッシュ計算の実行枠が空いていない場合の例外
+
+    Attributes:
+        retry_after (int): 再試行までの推奨待機時間(秒)
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("Too many login attempts are being processed. Please retry later.")
+        self.retry_after = retry_after
+
+
+class PasswordHashExecutor:
+    """パスワードのハッシュ計算(PBKDF2)を、同時実行数と待機数を制限したスレッドプールで実行するクラス
+
+    ログインが集中した場合もハッシュ計算に使用するCPUをワーカープロセス毎にMAX_WORKERSスレッドに制限し、
+    同じプロセスの他のリクエスト(活動の参照等)の処理を妨げないようにする。
+    実行中・待機中の件数がMAX_WORKERS + QUEUE_SIZEに達している場合、またはQUEUE_TIMEOUT秒以内に
+    実行を開始できない場合は、ハッシュ計算を行わずにPasswordHashBusyを送出する。
+
+    プロセス内の制限は、1つのプロセスで複数のリクエストを並行して処理する場合(gunicornのgthreadワーカー等)のみ
+    有効となる。1プロセス1リクエストの同期ワーカー(sync)ではプロセス内の件数は1件を超えないため、
+    全てのワーカープロセスの実行中・待機中の件数を、共有キャッシュのSHARED_LIMIT個の実行枠のキーで制限し、
+    空いていない場合も待機せずにPasswordHashBusyを送出する。実行枠はaddで取得してdeleteで解放するため、
+    件数のカウンタのように取得・解放の競合で件数がずれることはない。
+    addがアトミックでないキャッシュのバックエンド(FileBasedCache等)では、全てのワーカープロセスの制限は行わない
+
+    スレッドプールではDBを参照せず、ハッシュ計算のみを行う
+
+    Attributes:
+        shared_key (str): 全てのワーカープロセスの実行枠のキャッシュキーの接頭辞
+    """
+
+    shared_key = "climbing:password_hash:slot"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._options = None
+        self._pool = None
+        self._slots = None
+        self._counters = dict.fromkeys(
+            ["submitted", "completed", "rejected_full", "rejected_shared", "rejected_timeout"], 0
+        )
+
+    def count(self, name):
+        """メトリクスのカウンタを加算する
+
+        Args:
+            name (str): カウンタ名
+        """
+        with self._lock:
+            self._counters[name] += 1
+
+    def pool(self):
+        """現在の設定のスレッドプールと実行枠のセマフォを取得する(設定の変更後は作成し直す)
+
+        Returns:
+            tuple[ThreadPoolExecutor, BoundedSemaphore, dict]: スレッドプール、実行枠のセマフォ、設定
+        """
+        options = settings.PASSWORD_HASH_EXECUTOR
+        with self._lock:
+            if self._options is not options:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = ThreadPoolExecutor(max_workers=options["MAX_WORKERS"], thread_name_prefix="password-hash")
+                self._slots = threading.BoundedSemaphore(options["MAX_WORKERS"] + options["QUEUE_SIZE"])
+                self._options = options
+            return self._pool, self._slots, self._options
+
+    @staticmethod
+    def shared_limit(options):
+        """全てのワーカープロセスの実行枠の数を取得する
+
+        Args:
+            options (dict): PASSWORD_HASH_EXECUTORの設定
+
+        Returns:
+            int: 実行枠の数。SHARED_LIMITが設定されていない場合、またはキャッシュのバックエンドが対応していない場合はNone
+        """
+        limit = options.get("SHARED_LIMIT")
+        if limit is None or not supports_shared_slots():
+            return None
+        return limit
+
+    def shared_slot_keys(self, limit):
+        """全てのワーカープロセスの実行枠のキャッシュキーを取得する
+
+        Args:
+            limit (int): 実行枠の数
+
+        Returns:
+            list[str]: 実行枠のキャッシュキーのリスト
+        """
+        return [f"{self.shared_key}:{index}" for index in range(limit)]
+
+    def acquire_shared(self, limit, timeout):
+        """全てのワーカープロセスの実行枠を、空いている実行枠のキーのaddで取得する
+
+        実行枠のキーはtimeout秒で期限切れとなり、解放せずに終了したプロセスの実行枠を空ける
+        (期限は取得時に設定し、他のプロセスの取得・解放では延長しない)
+
+        Args:
+            limit (int): 実行枠の数
+            timeout (int): 実行枠のキーの有効期間(秒)
+
+        Returns:
+            str: 取得した実行枠のキャッシュキー。空いていない場合はNone
+        """
+        keys = self.shared_slot_keys(limit)
+        taken = cache.get_many(keys)
+        for key in keys:
+            if key not in taken and cache.add(key, 1, timeout):
+                return key
+        return None
+
+    def run(self, function, *args):
+        """関数をスレッドプールで実行し、結果を返す
+
+        Args:
+            function (callable): ハッシュ計算を行う関数(DBを参照しないこと)
+            *args: 関数の引数
+
+        Returns:
+            object: 関数の戻り値
+
+        Raises:
+            PasswordHashBusy: 実行中・待機中の件数が上限に達している場合、または待機時間内に実行を開始できない場合
+        """
+        pool, slots, options = self.pool()
+
+        # 実行枠が空いていない場合は待機せずに拒否
+        if not slots.acquire(blocking=False):
+            self.count("rejected_full")
+            raise PasswordHashBusy(options["RETRY_AFTER"])
+
+        # 全てのワーカープロセスの実行枠が空いていない場合も待機せずに拒否
+        shared_limit = self.shared_limit(options)
+        shared_slot = None
+        if shared_limit is not None:
+            shared_slot = self.acquire_shared(shared_limit, options["SHARED_TIMEOUT"])
+            if shared_slot is None:
+                slots.release()
+                self.count("rejected_shared")
+                raise PasswordHashBusy(options["RETRY_AFTER"])
+
+        started = threading.Event()
+
+        def task():
+            started.set()
+            return function(*args)
+
+        def release(_):
+            slots.release()
+            if shared_slot is not None:
+                cache.delete(shared_slot)
+
+        self.count("submitted")
+        future = pool.submit(task)
+        future.add_done_callback(release)
+
+        # 待機時間内に実行を開始できず、取り消せた場合は拒否(取り消す前に開始した場合は結果を待つ)
+        if not started.wait(options["QUEUE_TIMEOUT"]) and future.cancel():
+            self.count("rejected_timeout")
+            raise PasswordHashBusy(options["RETRY_AFTER"])
+
+        result = future.result()
+        self.count("completed")
+        return result
+
+    def stats(self):
+        """ワーカープロセス内の実行件数と拒否件数、全てのワーカープロセスの実行中・待機中の件数を取得する
+
+        Returns:
+            dict: 同時実行数・待機数の上限、全てのワーカープロセスの件数の上限と現在の件数、実行・拒否の件数
+        """
+        with self._lock:
+            options = self._options or settings.PASSWORD_HASH_EXECUTOR
+            counters = dict(self._counters)
+        shared_limit = self.shared_limit(options)
+        return {
+            "max_workers": options["MAX_WORKERS"],
+            "queue_size": options["QUEUE_SIZE"],
+            "shared_limit": shared_limit,
+            "shared_running": len(cache.get_many(self.shared_slot_keys(shared_limit))) if shared_limit else 0,
+            **counters,
+        }
+
+
+password_hash_executor = PasswordHashExecutor()
+
+
+def check_user_password(user, raw_password):
+    """ユーザーのパスワードを、ハッシュ計算の実行枠で照合する
+
+    AbstractBaseUser.check_passwordと同様に、ハッシュのアルゴリズムや反復回数が古い場合は
+    照合に成功したパスワードでハッシュを更新する(ハッシュ計算のみ実行枠で行い、保存はリクエストのスレッドで行う)。
+    更新時に実行枠が空いていない場合は、次回のログインで更新する
+
+    Args:
+        user (User): ユーザー
+        raw_password (str): 照合するパスワード
+
+    Returns:
+        bool: パスワードが一致する場合はTrue
+
+    Raises:
+        PasswordHashBusy: ハッシュ計算の実行枠が空いていない場合
+    """
+    is_correct, must_update = password_hash_executor.run(verify_password, raw_password, user.password)
+
+    if is_correct and must_update:
+        try:
+            user.password = password_hash_executor.run(make_password, raw_password)
+        except PasswordHashBusy:
+            return is_correct
+        user.save(update_fields=["password"])
+
+    return is_correct
@@ -0,0 +1,151 @@
+from bisect import bisect_right
+from django.db import transaction
+from .cache import invalidate_activity_cache, response_cache
+from .masters import master_registry
+from .models import Activity, AvgPaceLevelMaster, CourseConstantLevelMaster
+
+
+class IntervalIndex:
+    """下限・上限を持つマスタデータを下限の昇順に並べ、値が属する区間を二分探索する読み取り専用のクラス
+
+    区間は下限の昇順に隣接しているため、値以下の下限を持つ最後の区間を値の区間とする。
+    境界値は上側の区間、区間の隙間の値は下側の区間、全ての区間の範囲外の値は最も近い端の区間に分類する
+
+    Attributes:
+        lower_bounds (tuple[int]): 区間の下限の昇順のタプル
+        ids (tuple[int]): lower_boundsと同じ順序のマスタデータのIDのタプル
+    """
+
+    __slots__ = ("lower_bounds", "ids")
+
+    def __init__(self, table):
+        """マスタデータのテーブルから区間の索引を作成する
+
+        Args:
+            table (MasterTable): min・maxのフィールドを持つマスタデータのテーブル
+        """
+        intervals = sorted((table.get(master_id, "min"), master_id) for master_id in table.ids)
+        self.lower_bounds = tuple(lower_bound for lower_bound, _ in intervals)
+        self.ids = tuple(master_id for _, master_id in intervals)
+
+    def classify(self, value):
+        """値が属する区間のマスタデータのIDを取得する
+
+        Args:
+            value (float): 分類する値
+
+        Returns:
+            int: マスタデータのID。値がNoneまたは区間が存在しない場合はNone
+        """
+        if value is None or not self.ids:
+            return None
+        return self.ids[max(bisect_right(self.lower_bounds, value) - 1, 0)]
+
+
+class LevelClassifier:
+    """値をマスタデータのレジストリの区間に分類する関数
+
+    区間の索引はレジストリのテーブル毎に1回だけ作成し、マスタデータの読み込み直し後に作成し直す
+
+    Attributes:
+        model (type): min・maxのフィールドを持つマスタデータのモデルクラス
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._cached = (None, None)
+
+    def index(self):
+        """現在のマスタデータのテーブルの区間の索引を取得する
+
+        Returns:
+            IntervalIndex: 区間の索引
+        """
+        table = master_registry.get(self.model)
+        cached_table, index = self._cached
+        if cached_table is not table:
+            index = IntervalIndex(table)
+            self._cached = (table, index)
+        return index
+
+    def __call__(self, value):
+        return self.index().classify(value)
+
+
+# 活動のレベルのフィールドと、(分類する値のフィールド, 分類する関数)の対応
+ACTIVITY_LEVEL_FIELDS = {
+    "avg_pace_level_id": ("avg_pace", LevelClassifier(AvgPaceLevelMaster)),
+    "course_constant_level_id": ("course_constant", LevelClassifier(CourseConstantLevelMaster)),
+}
+
+
+def classify_activity_levels(activity, previous_values=None):
+    """活動の平均ペースとコース定数から、未設定のレベルと、分類する値が変更されたレベルを設定する
+
+    Args:
+        activity (Activity): 活動
+        previous_values (dict, optional): 分類する値のフィールド名と変更前の値の辞書(新規登録の場合はNone)
+    """
+    for level_field, (value_field, classify) in ACTIVITY_LEVEL_FIELDS.items():
+        value = getattr(activity, value_field)
+        is_changed = previous_values is not None and previous_values.get(value_field, value) != value
+        if getattr(activity, level_field) is None or is_changed:
+            setattr(activity, level_field, classify(value) or getattr(activity, level_field))
+
+
+def update_reclassified_activities(activities, level_fields):
+    """レベルを分類し直した活動をbulk_updateで更新し、活動とそのユーザーのキャッシュを無効化する
+
+    Args:
+        activities (list[Activity]): レベルを分類し直した活動のリスト
+        level_fields (list[str]): 更新するレベルのフィールド名のリスト
+    """
+    with transaction.atomic():
+        Activity.objects.bulk_update(activities, level_fields)
+        invalidate_activity_cache(*[activity.id for activity in activities])
+        response_cache.invalidate("user", *{activity.user_id for activity in activities})
+
+
+def reclassify_activity_levels(batch_size=1000, dry_run=False):
+    """全ての活動のレベルを、現在のマスタデータの区間で分類し直す
+
+    活動はIDの順にbatch_size件ずつ読み込み、レベルが変わる活動のみをbatch_size件毎にbulk_updateで更新する。
+    bulk_updateはシグナルを送信しないため、更新した活動とそのユーザーのキャッシュを更新毎に無効化する
+
+    Args:
+        batch_size (int): 1回に読み込み・更新する活動の件数
+        dry_run (bool): Trueの場合は更新せずに、レベルが変わる活動の件数のみを数える
+
+    Returns:
+        tuple[int, int]: (確認した活動の件数, レベルが変わる活動の件数)
+    """
+    level_fields = list(ACTIVITY_LEVEL_FIELDS)
+    value_fields = [value_field for value_field, _ in ACTIVITY_LEVEL_FIELDS.values()]
+
+    checked = 0
+    changed_count = 0
+    changed = []
+    activities = Activity.objects.order_by("id").only("id", "user_id", *level_fields, *value_fields)
+    for activity in activities.iterator(chunk_size=batch_size):
+        checked += 1
+        is_changed = False
+        for level_field, (value_field, classify) in ACTIVITY_LEVEL_FIELDS.items():
+            level_id = classify(getattr(activity, value_field))
+            if level_id is not None and level_id != getattr(activity, level_field):
+                setattr(activity, level_field, level_id)
+                is_changed = True
+        if is_changed:
+            changed.append(activity)
+
+        # batch_size件毎に更新し、分類し直した活動を保持し続けない
+        if len(changed) >= batch_size:
+            changed_count += len(changed)
+            if not dry_run:
+                update_reclassified_activities(changed, level_fields)
+            changed = []
+
+    changed_count += len(changed)
+    if changed and not dry_run:
+        update_reclassified_activities(changed, level_fields)
+
+    return checked, changed_count
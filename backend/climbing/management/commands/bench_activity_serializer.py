@@ -0,0 +1,96 @@
+import itertools
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from climbing.models import Activity
+from climbing.serializers import ActivitySerializer, ActivitySummarySerializer
+from climbing.summaries import get_summary
+from climbing.views import get_activity_list_serializer
+
+
+class Command(BaseCommand):
+    """活動一覧のシリアライズ処理のベンチマークを行うコマンドクラス
+
+    登録済みの活動を繰り返して指定件数の活動を用意し、DRFのシリアライザ(ActivitySerializer、
+    ActivitySummarySerializer)と高速化したシリアライザ(CompiledActivitySerializer)の処理時間を比較する。
+    データベースへの書き込みは行わない
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Benchmark the activity list serialization with the DRF serializers and the compiled serializer"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="Numbers of activities to serialize",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of measurements per size (the fastest one is reported)",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        件数毎に両方のシリアライザの出力が同一であることを確認してから処理時間を計測する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: 活動が登録されていない場合、または出力が一致しない場合
+        """
+        compiled = get_activity_list_serializer()
+        summary_fields = list(ActivitySummarySerializer(fields=compiled.fields).fields)
+        activity_fields = [field for field in compiled.fields if field not in summary_fields]
+
+        # ベンチマークに使用する活動を取得
+        instances = list(Activity.objects.select_related("user", "avg_pace_level", "course_constant_level", "summary"))
+        rows = list(Activity.objects.values(*compiled.columns))
+        if not instances:
+            raise CommandError("No activities found. Load the fixtures first.")
+
+        def serialize_drf(targets):
+            activities = ActivitySerializer(targets, many=True, fields=activity_fields).data
+            summaries = ActivitySummarySerializer(
+                [get_summary(instance) for instance in targets], many=True, fields=summary_fields
+            ).data
+            return [{**activity, **summary} for activity, summary in zip(activities, summaries)]
+
+        for size in options["sizes"]:
+            # 登録済みの活動を繰り返して指定件数の活動を用意
+            sized_instances = list(itertools.islice(itertools.cycle(instances), size))
+            sized_rows = list(itertools.islice(itertools.cycle(rows), size))
+
+            # 両方のシリアライザの出力が同一であることを確認
+            renderer = JSONRenderer()
+            if renderer.render(serialize_drf(sized_instances)) != renderer.render(compiled.serialize(sized_rows)):
+                raise CommandError(f"Serialized output differs for {size} activities")
+
+            # 処理時間を計測(最速値)
+            drf_time = min(timeit.repeat(lambda: serialize_drf(sized_instances), number=1, repeat=options["repeat"]))
+            compiled_time = min(
+                timeit.repeat(lambda: compiled.serialize(sized_rows), number=1, repeat=options["repeat"])
+            )
+
+            self.stdout.write(
+                f"{size:>7} activities: "
+                f"drf {drf_time * 1000:9.2f} ms, "
+                f"compiled {compiled_time * 1000:9.2f} ms, "
+                f"speedup x{drf_time / compiled_time:.1f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Serialized output is byte-identical"))
@@ -0,0 +1,170 @@
+import statistics
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from climbing.cache import invalidate_user_cache
+from climbing.hashing import PasswordHashBusy
+from climbing.serializers import AuthTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    """ログインの集中時の、活動一覧の参照の応答時間の負荷試験を行うコマンドクラス
+
+    1つのワーカープロセス内で、複数のスレッドからログイン(パスワードの照合)を繰り返しながら
+    活動一覧を参照し、応答時間を比較する。比較するケースは以下の3つ
+
+    - idle: ログインなし
+    - bounded: PASSWORD_HASH_EXECUTORの設定でログインを処理
+    - unbounded: ログインのスレッド数と同じ同時実行数でログインを処理(制限なしの場合と同等)
+
+    ログインはauthenticateで照合のみを行い、トークンの発行(DBへの書き込み)は行わない。
+    活動一覧はレスポンスデータのキャッシュから応答しないよう、参照毎に計測の前にユーザーのキャッシュを無効化する
+    (--cachedを指定した場合はキャッシュから応答した場合の応答時間を計測する)
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Load test: activity list latency while other threads of the same worker run a login storm"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--email",
+            default="test@example.com",
+            help="Email of the user who logs in and reads the activity list",
+        )
+        parser.add_argument(
+            "--password",
+            default="test1234",
+            help="Password of the user",
+        )
+        parser.add_argument(
+            "--logins",
+            type=int,
+            default=16,
+            help="Number of threads repeating logins during the storm",
+        )
+        parser.add_argument(
+            "--reads",
+            type=int,
+            default=100,
+            help="Number of activity list requests measured per case",
+        )
+        parser.add_argument(
+            "--cached",
+            action="store_true",
+            help="Measure reads served from the response cache instead of invalidating it before each read",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        ケース毎に活動一覧の応答時間(中央値、95パーセンタイル、最大)と、ログインの成功・拒否の件数を出力する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: ユーザーの認証に失敗した場合
+        """
+        credentials = {"email": options["email"], "password": options["password"]}
+        user = authenticate(**credentials)
+        if user is None:
+            raise CommandError("Authentication failed. Load the fixtures or pass --email and --password.")
+
+        # 活動一覧の参照用のクライアント(アクセストークンをcookieに設定)
+        client = Client()
+        client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = str(
+            AuthTokenObtainPairSerializer.get_token(user).access_token
+        )
+        url = reverse("activity-list", kwargs={"user_id": user.id})
+        client.get(url)
+
+        bounded = settings.PASSWORD_HASH_EXECUTOR
+        unbounded = {**bounded, "MAX_WORKERS": options["logins"], "QUEUE_SIZE": 0, "SHARED_LIMIT": None}
+        cases = {
+            "idle": (bounded, 0),
+            "bounded": (bounded, options["logins"]),
+            "unbounded": (unbounded, options["logins"]),
+        }
+
+        reads = "cached" if options["cached"] else "uncached (response cache invalidated before each read)"
+        self.stdout.write(
+            f"{options['logins']} login threads, {options['reads']} reads {reads}, "
+            f"bounded: MAX_WORKERS={bounded['MAX_WORKERS']} QUEUE_SIZE={bounded['QUEUE_SIZE']} "
+            f"SHARED_LIMIT={bounded.get('SHARED_LIMIT')}"
+        )
+        for name, (executor_options, logins) in cases.items():
+            with override_settings(PASSWORD_HASH_EXECUTOR=executor_options):
+                latencies, results = self.run_case(
+                    client, url, credentials, logins, options["reads"], None if options["cached"] else user.id
+                )
+
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            self.stdout.write(
+                f"{name:<10} read p50 {statistics.median(latencies):8.2f} ms, p95 {p95:8.2f} ms, "
+                f"max {latencies[-1]:8.2f} ms | logins ok {results['ok']}, rejected {results['rejected']}"
+            )
+
+    def run_case(self, client, url, credentials, logins, reads, uncached_user_id=None):
+        """ログインのスレッドを起動し、活動一覧の応答時間を計測する
+
+        Args:
+            client (Client): 活動一覧の参照用のクライアント
+            url (str): 活動一覧のURL
+            credentials (dict): ログインのメールアドレスとパスワード
+            logins (int): ログインを繰り返すスレッド数
+            reads (int): 計測する活動一覧の参照の回数
+            uncached_user_id (int, optional): 参照毎に計測の前にキャッシュを無効化するユーザーID
+
+        Returns:
+            tuple[list[float], dict]: 参照毎の応答時間(ms)のリストと、ログインの成功(ok)・拒否(rejected)の件数
+        """
+        stop = threading.Event()
+        results = {"ok": 0, "rejected": 0}
+        lock = threading.Lock()
+
+        def login():
+            while not stop.is_set():
+                try:
+                    authenticate(**credentials)
+                    result = "ok"
+                except PasswordHashBusy as e:
+                    # 拒否された場合はクライアントと同様にRetry-Afterの秒数だけ待機して再試行
+                    result = "rejected"
+                    stop.wait(e.retry_after)
+                with lock:
+                    results[result] += 1
+            connection.close()
+
+        threads = [threading.Thread(target=login) for _ in range(logins)]
+        for thread in threads:
+            thread.start()
+
+        # ログインの処理が始まってから計測
+        time.sleep(0.5 if logins else 0)
+        latencies = []
+        for _ in range(reads):
+            if uncached_user_id is not None:
+                invalidate_user_cache(uncached_user_id)
+            started_at = time.perf_counter()
+            client.get(url)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return latencies, results
@@ -0,0 +1,156 @@
+import timeit
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef, Prefetch
+from climbing.masters import MASTER_MODELS, MasterValue, master_registry
+from climbing.models import (
+    Activity,
+    ActivityTag,
+    AvgPaceLevelMaster,
+    CourseConstantLevelMaster,
+    GenderMaster,
+    PrefectureMaster,
+    TagMaster,
+    User,
+    UserActivityPrefecture,
+)
+
+
+class Command(BaseCommand):
+    """マスタデータのレジストリのメモリ使用量と、名称の取得時間のベンチマークを行うコマンドクラス
+
+    登録済みのデータに対して、マスタデータのテーブルを結合して名称を取得する場合と、
+    レジストリから名称を取得する場合の処理時間を比較する。データベースへの書き込みは行わない
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Benchmark memory usage of the master-data registry and name lookups against SQL joins"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=100,
+            help="Number of executions per measurement",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of measurements per case (the fastest one is reported)",
+        )
+
+    def measure(self, function, options):
+        """処理1回あたりの時間(ms)を計測する(最速値)
+
+        Args:
+            function (callable): 計測する処理
+            options (dict): コマンドの引数
+
+        Returns:
+            float: 処理1回あたりの時間(ms)
+        """
+        number = options["number"]
+        return min(timeit.repeat(function, number=number, repeat=options["repeat"])) / number * 1000
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        レジストリの読み込み時間とメモリ使用量、ケース毎の結合とレジストリの処理時間を出力する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: 活動が登録されていない場合、または結合とレジストリの結果が一致しない場合
+        """
+        activity = Activity.objects.order_by("id").first()
+        if activity is None:
+            raise CommandError("No activities found. Load the fixtures first.")
+        user_id = activity.user_id
+        tag_names = list(ActivityTag.objects.filter(activity=activity).values_list("tag__name", flat=True))
+
+        # レジストリの読み込み時間とメモリ使用量
+        load_time = self.measure(master_registry.load, {**options, "number": 1})
+        tracemalloc.start()
+        tables = master_registry.load()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = sum(len(table.ids) for table in tables.values())
+        self.stdout.write(
+            f"registry: {len(MASTER_MODELS)} tables, {rows} rows, load {load_time:.2f} ms, "
+            f"{memory / 1024:.1f} KiB (tracemalloc)"
+        )
+
+        course_constant_level = MasterValue(CourseConstantLevelMaster, "level")
+        avg_pace_level = MasterValue(AvgPaceLevelMaster, "level")
+        gender_name = MasterValue(GenderMaster, "name")
+        prefecture_name = MasterValue(PrefectureMaster, "name")
+
+        def activity_levels_join():
+            activities = Activity.objects.select_related("course_constant_level", "avg_pace_level").filter(
+                user_id=user_id
+            )
+            return [(activity.course_constant_level.level, activity.avg_pace_level.level) for activity in activities]
+
+        def activity_levels_registry():
+            activities = Activity.objects.filter(user_id=user_id)
+            return [
+                (course_constant_level(activity.course_constant_level_id), avg_pace_level(activity.avg_pace_level_id))
+                for activity in activities
+            ]
+
+        def profile_join():
+            user = (
+                User.objects.select_related("gender")
+                .prefetch_related(
+                    Prefetch(
+                        "user_activity_prefecture",
+                        queryset=UserActivityPrefecture.objects.select_related("prefecture"),
+                    )
+                )
+                .get(id=user_id)
+            )
+            return user.gender.name, [item.prefecture.name for item in user.user_activity_prefecture.all()]
+
+        def profile_registry():
+            user = User.objects.prefetch_related("user_activity_prefecture").get(id=user_id)
+            return gender_name(user.gender_id), [
+                prefecture_name(item.prefecture_id) for item in user.user_activity_prefecture.all()
+            ]
+
+        def tag_filter_join():
+            tags = ActivityTag.objects.filter(activity=OuterRef("pk"), tag__name__in=tag_names)
+            return list(Activity.objects.filter(Exists(tags), user_id=user_id).values_list("id", flat=True))
+
+        def tag_filter_registry():
+            tag_ids = master_registry.get(TagMaster).find_ids("name", tag_names)
+            tags = ActivityTag.objects.filter(activity=OuterRef("pk"), tag_id__in=tag_ids)
+            return list(Activity.objects.filter(Exists(tags), user_id=user_id).values_list("id", flat=True))
+
+        cases = {
+            "activity levels": (activity_levels_join, activity_levels_registry),
+            "profile names": (profile_join, profile_registry),
+            "tag filter": (tag_filter_join, tag_filter_registry),
+        }
+
+        master_registry.tables()
+        for name, (join, registry) in cases.items():
+            # 結合とレジストリの結果が一致することを確認
+            if join() != registry():
+                raise CommandError(f"Results differ for {name}")
+
+            join_time = self.measure(join, options)
+            registry_time = self.measure(registry, options)
+            self.stdout.write(
+                f"{name:<16} join {join_time:8.3f} ms, registry {registry_time:8.3f} ms "
+                f"({join_time / registry_time:.2f}x)"
+            )
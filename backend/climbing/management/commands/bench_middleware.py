@@ -0,0 +1,123 @@
+import logging
+import timeit
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from climbing.middleware import LeanLaneMixin
+
+
+def get_stock_middleware():
+    """MIDDLEWAREのLeanLaneMixinのミドルウェアを、元のDjangoのミドルウェアに置き換えたリストを取得する
+
+    Returns:
+        list[str]: ミドルウェアのパスのリスト
+    """
+    middleware = []
+    for path in settings.MIDDLEWARE:
+        middleware_class = import_string(path)
+        if issubclass(middleware_class, LeanLaneMixin):
+            base = middleware_class.__bases__[-1]
+            path = f"{base.__module__}.{base.__qualname__}"
+        middleware.append(path)
+    return middleware
+
+
+def build_middleware_chain(middleware):
+    """ミドルウェアのリストから、空のレスポンスを返すビューまでのリクエストの処理を作成する
+
+    Args:
+        middleware (list[str]): ミドルウェアのパスのリスト
+
+    Returns:
+        callable: リクエストを受け取り、レスポンスを返す関数
+    """
+
+    def handler(request):
+        return HttpResponse()
+
+    for path in reversed(middleware):
+        handler = import_string(path)(handler)
+    return handler
+
+
+class Command(BaseCommand):
+    """ミドルウェアのリクエスト1回あたりの処理時間のベンチマークを行うコマンドクラス
+
+    JWT認証のみのAPIの参照(GET /api/)と管理画面(GET /admin/)のリクエストを、以下のミドルウェアの構成で
+    空のレスポンスを返すビューまで処理し、ミドルウェアなしとの差をリクエスト1回あたりの処理時間として出力する。
+    リクエストにはセッションのcookieを設定し、DBへの書き込みは行わない
+
+    - stock: Djangoのセッション・認証・メッセージのミドルウェア(変更前の構成)
+    - lean: MIDDLEWAREの設定(JWT認証のみのAPIの参照ではセッション・認証・メッセージの処理を省略)
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Benchmark per-request middleware overhead of the stock and lean middleware configurations"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--number",
+            type=int,
+            default=10000,
+            help="Number of requests per measurement",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of measurements per case (the fastest one is reported)",
+        )
+
+    def measure(self, middleware, path, options):
+        """ミドルウェアの構成で、リクエスト1回あたりの処理時間(µs)を計測する(最速値)
+
+        Args:
+            middleware (list[str]): ミドルウェアのパスのリスト
+            path (str): リクエストのパス
+            options (dict): コマンドの引数
+
+        Returns:
+            float: リクエスト1回あたりの処理時間(µs)
+        """
+        handler = build_middleware_chain(middleware)
+        factory = RequestFactory(HTTP_COOKIE=f"{settings.SESSION_COOKIE_NAME}={'0' * 32}")
+
+        def request():
+            return handler(factory.get(path))
+
+        number = options["number"]
+        return min(timeit.repeat(request, number=number, repeat=options["repeat"])) / number * 1e6
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        パス毎に、構成毎のミドルウェアの処理時間とその差を出力する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+        """
+        cases = {"none": [], "stock": get_stock_middleware(), "lean": settings.MIDDLEWARE}
+        paths = {"api GET": reverse("activity-list", kwargs={"user_id": 1}), "admin GET": reverse("admin:index")}
+
+        # アクセスログの出力を計測に含めない
+        logging.disable(logging.INFO)
+        try:
+            for name, path in paths.items():
+                none, stock, lean = (self.measure(middleware, path, options) for middleware in cases.values())
+                self.stdout.write(
+                    f"{name:<10} stock +{stock - none:6.2f} us, lean +{lean - none:6.2f} us "
+                    f"({(lean - stock) / (stock - none):+.0%}) / no middleware {none:6.2f} us"
+                )
+        finally:
+            logging.disable(logging.NOTSET)
@@ -0,0 +1,85 @@
+import gzip
+import itertools
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from climbing.models import Activity
+from climbing.renderers import FastJSONRenderer, MessagePackRenderer
+from climbing.views import get_activity_list_serializer
+
+
+class Command(BaseCommand):
+    """活動一覧のレンダリング処理のベンチマークを行うコマンドクラス
+
+    登録済みの活動を繰り返して指定件数の活動一覧のデータを作成し、DRFのJSONRenderer、
+    FastJSONRenderer、MessagePackRendererのエンコード時間とペイロードサイズを比較する。
+    データベースへの書き込みは行わない
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Benchmark encode time and payload size of the JSON and MessagePack renderers on the activity list"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="Numbers of activities in the rendered list",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of measurements per renderer (the fastest one is reported)",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        件数とレンダラー毎に、エンコード時間、ペイロードサイズ、gzip圧縮後のサイズを出力する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: 活動が登録されていない場合、またはJSONのバイト列が一致しない場合
+        """
+        serializer = get_activity_list_serializer()
+        rows = list(Activity.objects.values(*serializer.columns))
+        if not rows:
+            raise CommandError("No activities found. Load the fixtures first.")
+
+        renderers = {
+            "drf json": JSONRenderer(),
+            "fast json": FastJSONRenderer(),
+            "msgpack": MessagePackRenderer(),
+        }
+
+        for size in options["sizes"]:
+            # 登録済みの活動を繰り返して指定件数の活動一覧のデータを作成
+            data = serializer.serialize(list(itertools.islice(itertools.cycle(rows), size)))
+
+            # FastJSONRendererがDRFのJSONRendererと同一のバイト列を作成することを確認
+            if renderers["drf json"].render(data) != renderers["fast json"].render(data):
+                raise CommandError(f"JSON output differs for {size} activities")
+
+            self.stdout.write(f"{size} activities:")
+            for name, renderer in renderers.items():
+                # エンコード時間を計測(最速値)
+                elapsed = min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=options["repeat"]))
+                content = renderer.render(data)
+
+                self.stdout.write(
+                    f"  {name:<10} {elapsed * 1000:9.2f} ms, "
+                    f"{len(content) / 1024:10.1f} KiB, "
+                    f"gzip {len(gzip.compress(content)) / 1024:9.1f} KiB"
+                )
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from climbing.geodata import build_geodata_manifest
+
+
+class Command(BaseCommand):
+    """活動の地理データのマニフェストと圧縮済みのバンドルを作成するコマンドクラス
+
+    活動IDのディレクトリを1回だけ走査し、ルート、グラフ、休憩地点、チェックポイント、写真、
+    スポットの情報を活動毎に1つのJSONにまとめてgzipで圧縮する。
+    ルートは設定の許容誤差毎に簡略化した詳細度のGeoJSONも作成する。
+    APIはリクエスト毎にディレクトリを走査せず、マニフェストからバンドルを返す
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Build the geodata manifest and precompressed bundles of the activities"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--source-dir",
+            default=None,
+            help="Directory containing the activity directories (default: GEODATA['SOURCE_DIR'])",
+        )
+        parser.add_argument(
+            "--bundle-dir",
+            default=None,
+            help="Output directory of the manifest and bundles (default: GEODATA['BUNDLE_DIR'])",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild all bundles even if the source files are unchanged",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+        """
+        source_dir = options["source_dir"] or settings.GEODATA["SOURCE_DIR"]
+        bundle_dir = options["bundle_dir"] or settings.GEODATA["BUNDLE_DIR"]
+
+        manifest, rebuilt = build_geodata_manifest(source_dir, bundle_dir, force=options["force"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully built the geodata manifest for {len(manifest['activities'])} activities "
+                f"({rebuilt} bundles rebuilt)"
+            )
+        )
@@ -0,0 +1,39 @@
+import uuid
+from django.core.management.base import BaseCommand
+from climbing.signing import ASYMMETRIC_ALGORITHMS, generate_private_key
+
+
+class Command(BaseCommand):
+    """トークンの署名鍵(秘密鍵)とkidを作成するコマンドクラス
+
+    出力した秘密鍵をVaultのJWT_SIGNING_KEYSに追加し、全てのサーバーに反映(JWKSで公開)されてから
+    JWT_ACTIVE_KIDを切り替える
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Generate a private key and kid for signing JWTs"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--algorithm",
+            choices=ASYMMETRIC_ALGORITHMS,
+            default="RS256",
+            help="Signing algorithm of the key",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+        """
+        self.stdout.write(f"kid: {uuid.uuid4().hex}")
+        self.stdout.write(generate_private_key(options["algorithm"]), ending="")
@@ -1,14 +1,14 @@
 import os
 from django.core.management.base import BaseCommand
 from django.core.management import call_command
-import subprocess
 
 
 class Command(BaseCommand):
     """Djangoのカスタム管理コマンドクラス。
 
     指定された順序でfixtureファイルをロードし、
-    登山の活動データに基づいてユーザーのDomoポイントの総和を更新するスクリプトを実行する
+    登山の活動データに基づいてユーザーのDomoポイントの総和を照合するコマンドと、
+    活動の集計データを再作成するコマンドを実行する
 
     Attributes:
         help (str): コマンドの説明。
@@ -20,14 +20,15 @@ class Command(BaseCommand):
         """コマンド実行時に呼び出されるメソッド
 
         ・指定されたfixtureファイルを順に読み込み、データベースに反映する
-        ・fixtureファイルのロード後、Domoポイントの更新スクリプトを実行する
+        ・fixtureファイルのロード後、Domoポイントの照合コマンドを実行する
+        ・fixtureファイルのロード後、活動の集計データを再作成する
 
         Args:
             *args: 任意の引数リスト
             **options: 任意のキーワード引数辞書
 
         Raises:
-            Exception: Fixtureファイルの読み込みやスクリプト実行中にエラーが発生した場合の例外を出力
+            Exception: Fixtureファイルの読み込みやコマンド実行中にエラーが発生した場合の例外を出力
         """
 
         FIXTURES_FILE_DIR = "climbing/fixtures"
@@ -64,21 +65,20 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stderr.write(self.style.ERROR(f"Error loading {file_path}: {e}"))
 
-        env = os.environ.copy()
-        env["PYTHONPATH"] = r"C:\Python\venv\backend\Lib\site-packages"
+        # DBに反映した登山の活動データをもとに全てのユーザのDomoポイントの総和を照合し、DBの内容を更新
+        try:
+            call_command("update_domo_point")
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error reconciling DOMO points: {e}"))
 
-        # DBに反映した登山の活動データをもとにユーザのDomoポイントの総和を算出し、DBの内容を更新
+        # DBに反映した登山の活動データをもとに活動の集計データを再作成
         try:
-            result = subprocess.run(
-                ["python", "manage.py", "update_domo_point"],
-                check=True,
-                capture_output=True,
-                text=True,
-                env=env,
-            )
+            call_command("rebuild_activity_summaries")
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error rebuilding activity summaries: {e}"))
 
-            # スクリプトの標準出力を表示
-            self.stdout.write(self.style.SUCCESS(f"Successfully ran the script: {result.stdout}"))
-        except subprocess.CalledProcessError as e:
-            # エラー発生時の標準エラー出力を表示
-            self.stderr.write(self.style.ERROR(f"Error running the script: {e.stderr}"))
+        # DBに反映した登山の活動データをもとにユーザーの登頂した山毎の集計データを再作成
+        try:
+            call_command("rebuild_user_mountain_stats")
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error rebuilding user mountain statistics: {e}"))
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from climbing.blacklist import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    """有効期限切れのリフレッシュトークンを、発行済みトークンとブラックリストのテーブルから削除するコマンドクラス
+
+    ログインとトークンの払い出しの度に行が追加されるため、定期的(cron等)に実行する。
+    削除は件数を制限したチャンク毎のトランザクションで行い、稼働中でも実行できる
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Delete expired refresh tokens from the outstanding and blacklisted token tables in bounded chunks"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of outstanding tokens deleted in one transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.1,
+            help="Seconds to wait between chunks",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the expired tokens without deleting",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: バッチサイズが1未満、または待機時間が負の場合
+        """
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options["pause"] < 0:
+            raise CommandError("--pause must not be negative")
+
+        if options["dry_run"]:
+            expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+            blacklisted = BlacklistedToken.objects.filter(token__in=expired)
+            self.stdout.write(
+                f"Dry run: {expired.count()} outstanding and {blacklisted.count()} blacklisted tokens would be deleted"
+            )
+            return
+
+        totals = {"outstanding": 0, "blacklisted": 0, "seconds": 0.0}
+        chunks = 0
+        for chunk in prune_expired_tokens(batch_size=options["batch_size"], pause=options["pause"]):
+            chunks += 1
+            for name in totals:
+                totals[name] += chunk[name]
+            self.stdout.write(
+                f"chunk {chunks}: {chunk['outstanding']} outstanding, {chunk['blacklisted']} blacklisted "
+                f"in {chunk['seconds'] * 1000:.1f} ms"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully deleted {totals['outstanding']} outstanding and {totals['blacklisted']} blacklisted "
+                f"tokens in {chunks} chunks ({totals['seconds'] * 1000:.1f} ms)"
+            )
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from climbing.cache import invalidate_activity_cache, response_cache
+from climbing.models import Activity
+from climbing.summaries import refresh_activity_summaries
+
+
+class Command(BaseCommand):
+    """全ての活動の集計データを再作成するコマンドクラス
+
+    活動写真、タグ、エリア、都道府県、登頂した山の情報から活動の集計データを再集計し、
+    ActivitySummaryテーブルに反映する。bulk_createはシグナルを送信しないため、
+    再集計した活動とそのユーザーのレスポンスデータのキャッシュをチャンク毎に無効化する
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Rebuild the activity summaries from photos, tags, areas, prefectures and mountains"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of activities rebuilt per transaction",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        活動IDの昇順にchunk-size件ずつ集計データを再作成し、キャッシュを無効化する
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+        """
+        chunk_size = options["chunk_size"]
+        activities = list(Activity.objects.order_by("id").values_list("id", "user_id"))
+
+        total = 0
+        for index in range(0, len(activities), chunk_size):
+            chunk = activities[index : index + chunk_size]
+            total += refresh_activity_summaries([activity_id for activity_id, _ in chunk])
+            invalidate_activity_cache(*[activity_id for activity_id, _ in chunk])
+            response_cache.invalidate("user", *{user_id for _, user_id in chunk})
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {total} activity summaries"))
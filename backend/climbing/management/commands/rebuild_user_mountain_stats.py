@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from climbing.cache import response_cache
+from climbing.models import User
+from climbing.summaries import refresh_user_mountain_stats
+
+
+class Command(BaseCommand):
+    """全てのユーザーの登頂した山毎の集計データを再作成するコマンドクラス
+
+    公開対象の活動で登頂した山の情報から登頂回数等を再集計し、
+    UserMountainStatsテーブルに反映する。bulk_createはシグナルを送信しないため、
+    再集計後に全てのユーザーのレスポンスデータのキャッシュをまとめて無効化する
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Rebuild the per-user mountain statistics from the public activities"
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+        """
+        user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+
+        total = 0
+        for user_id in user_ids:
+            total += refresh_user_mountain_stats(user_id)
+        response_cache.invalidate("user", *user_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {total} user mountain statistics"))
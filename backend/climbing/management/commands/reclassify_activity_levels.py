@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from climbing.levels import reclassify_activity_levels
+
+
+class Command(BaseCommand):
+    """全ての活動の平均ペースレベルとコース定数レベルを分類し直すコマンドクラス
+
+    平均ペースレベル・コース定数レベルのマスタデータの区間を変更した後に実行し、
+    活動の平均ペースとコース定数から、現在の区間でレベルを設定し直す
+
+    Attributes:
+        help (str): コマンドの説明
+    """
+
+    help = "Reclassify the pace and course-constant levels of all activities against the current master ranges"
+
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of activities read and updated at a time",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the activities whose levels would change",
+        )
+
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
+
+        Args:
+            *args: 任意の引数リスト
+            **options: 任意のキーワード引数辞書
+
+        Raises:
+            CommandError: バッチサイズが1未満の場合
+        """
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        checked, changed = reclassify_activity_levels(batch_size=options["batch_size"], dry_run=options["dry_run"])
+
+        if options["dry_run"]:
+            self.stdout.write(f"{changed} of {checked} activities would be reclassified")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Successfully reclassified {changed} of {checked} activities"))
@@ -1,48 +1,88 @@
-from django.core.management.base import BaseCommand
-from django.db.models import Sum
-from climbing.models import Contract, ActivityPhotos
+import time
+from django.core.management.base import BaseCommand, CommandError
+from climbing.domo import apply_domo_point_drift, find_domo_point_drift
 
 
 class Command(BaseCommand):
-    """ユーザーの登山活動データに基づいてDomoポイントの総和を計算し、契約情報を更新するコマンドクラス
+    """全てのユーザーと活動のDOMOポイントの合計を、活動写真のDOMOポイントと照合して修正するコマンドクラス
 
-    特定のユーザーに関連するActivityPhotosテーブルからDomoポイントの合計を算出し、
-    その結果をContractテーブルの対象フィールドに反映する
+    DOMOポイントの合計は写真の登録・更新時やadd_domo_pointsでF()式により加算しているが、
+    SQLでの直接更新等による差異を定期的に検出して修正する。
+    活動写真の合計をユーザー毎・活動毎に1回のGROUP BYで取得し、
+    契約情報と活動の集計データのうち差異のある行のみをbulk_updateで更新する
 
     Attributes:
         help (str): コマンドの説明
     """
 
-    help = "Update a specific record with the sum of existing data"
+    help = "Reconcile the DOMO point totals of all users and activities with their photos"
 
-    def handle(self, *args, **kwargs):
-        """コマンド実行時に呼び出されるメソッド
+    def add_arguments(self, parser):
+        """コマンドの引数を定義する
+
+        Args:
+            parser (ArgumentParser): 引数のパーサー
+        """
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows updated by one UPDATE statement",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the differences without updating",
+        )
 
-        ユーザーIDが2のユーザーに対して、ActivityPhotosテーブルからDomoポイントの合計を取得し、
-        Contractテーブルのdomo_pointsフィールドを更新する
+    def handle(self, *args, **options):
+        """コマンド実行時に呼び出されるメソッド
 
         Args:
             *args: 任意の引数リスト
-            **kwargs: 任意のキーワード引数辞書
+            **options: 任意のキーワード引数辞書
 
         Raises:
-            Contract.DoesNotExist: 指定したユーザーIDに対応するレコードが存在しない場合
+            CommandError: バッチサイズが1未満の場合
         """
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        # 差異を検出
+        started_at = time.perf_counter()
+        drifted_contracts, drifted_summaries = find_domo_point_drift()
+        find_time = (time.perf_counter() - started_at) * 1000
 
-        # ユーザーIDが0002のユーザの登山活動データからDomoポイントを抽出し、ポイントの総和を計算
-        total_sum = ActivityPhotos.objects.filter(user=2).aggregate(total_sum=Sum("domo_points"))["total_sum"]
+        # 差異を表示
+        for row in drifted_contracts:
+            self.write_diff("user", row["user_id"], row["domo_points"], row["expected"])
+        for row in drifted_summaries:
+            self.write_diff("activity", row["activity_id"], row["total_domo_points"], row["expected"])
 
-        # 更新する契約情報テーブルのフィールドを取得
-        try:
-            update_target = Contract.objects.get(user=2)
-        except ActivityPhotos.DoesNotExist:
-            self.stdout.write(self.style.ERROR("Record does not exist"))
+        counts = f"{len(drifted_contracts)} users, {len(drifted_summaries)} activities"
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run: {counts} would be fixed (found in {find_time:.1f} ms)")
             return
 
-        # 算出したDomoポイントの総和で更新
-        update_target.domo_points = total_sum
-        update_target.save()
+        # 差異を反映
+        started_at = time.perf_counter()
+        apply_domo_point_drift(drifted_contracts, drifted_summaries, batch_size=options["batch_size"])
+        apply_time = (time.perf_counter() - started_at) * 1000
 
         self.stdout.write(
-            self.style.SUCCESS(f"Successfully updated record with total sum: {update_target.domo_points}")
+            self.style.SUCCESS(
+                f"Successfully reconciled DOMO points ({counts} fixed, "
+                f"found in {find_time:.1f} ms, applied in {apply_time:.1f} ms)"
+            )
         )
+
+    def write_diff(self, kind, target_id, current, expected):
+        """DOMOポイントの差異を1行で表示する
+
+        Args:
+            kind (str): 対象の種類(user, activity)
+            target_id (int): ユーザーIDまたは活動ID
+            current (int): 現在のDOMOポイントの合計
+            expected (int): 活動写真のDOMOポイントの合計
+        """
+        self.stdout.write(f"{kind} {target_id}: {current} -> {expected} ({expected - current:+d})")
@@ -0,0 +1,179 @@
+import threading
+import time
+from django.conf import settings
+from .cache import response_cache
+from .models import (
+    GenderMaster,
+    PrefectureMaster,
+    TagMaster,
+    AreaMaster,
+    MountainMaster,
+    AvgPaceLevelMaster,
+    CourseConstantLevelMaster,
+    CheckPointTypeMaster,
+)
+
+# レジストリで保持するマスタデータのモデル
+MASTER_MODELS = [
+    GenderMaster,
+    PrefectureMaster,
+    TagMaster,
+    AreaMaster,
+    MountainMaster,
+    AvgPaceLevelMaster,
+    CourseConstantLevelMaster,
+    CheckPointTypeMaster,
+]
+
+
+class MasterTable:
+    """1つのマスタデータを、IDをインデックスとするフィールド毎の配列で保持する読み取り専用のクラス
+
+    マスタデータのIDは小さな連番のため、IDをそのまま配列のインデックスとし、
+    辞書を経由せずにIDから値を取得する。存在しないIDの要素はNoneとする
+
+    Attributes:
+        model (type): マスタデータのモデルクラス
+        ids (tuple[int]): IDの昇順のタプル
+        columns (dict): フィールド名をキー、IDをインデックスとする値のタプルを値とする辞書
+    """
+
+    __slots__ = ("model", "ids", "columns")
+
+    def __init__(self, model, rows):
+        """values()の行からフィールド毎の配列を作成する
+
+        Args:
+            model (type): マスタデータのモデルクラス
+            rows (list[dict]): 全てのフィールドを含むvalues()の行のリスト
+        """
+        pk = model._meta.pk.attname
+        self.model = model
+        self.ids = tuple(sorted(row[pk] for row in rows))
+
+        size = self.ids[-1] + 1 if self.ids else 0
+        columns = {field.attname: [None] * size for field in model._meta.concrete_fields}
+        for row in rows:
+            for name, values in columns.items():
+                values[row[pk]] = row[name]
+        self.columns = {name: tuple(values) for name, values in columns.items()}
+
+    def get(self, master_id, field):
+        """IDに対応するフィールドの値を取得する
+
+        Args:
+            master_id (int): マスタデータのID
+            field (str): フィールド名
+
+        Returns:
+            object: フィールドの値。IDがNoneまたは存在しない場合はNone
+        """
+        values = self.columns[field]
+        if master_id is None or not 0 <= master_id < len(values):
+            return None
+        return values[master_id]
+
+    def find_ids(self, field, values):
+        """フィールドの値がいずれかに一致するIDを取得する
+
+        Args:
+            field (str): フィールド名
+            values (list): 検索する値のリスト
+
+        Returns:
+            list[int]: 一致したIDの昇順のリスト
+        """
+        targets = set(values)
+        column = self.columns[field]
+        return [master_id for master_id in self.ids if column[master_id] in targets]
+
+
+class MasterRegistry:
+    """全てのマスタデータをワーカープロセス内に保持するクラス
+
+    マスタデータは初回の参照時に一括で読み込み、更新されるまで使い回す。
+    マスタデータの更新時はキャッシュのマスタデータのバージョンを更新し、各プロセスは
+    CHECK_INTERVAL秒毎にバージョンを確認して、変更されていた場合に読み込み直す。
+    読み込み直す際は新しいテーブルの辞書に置き換えるため、参照中のテーブルは変更されない
+
+    Attributes:
+        version_scope (str): マスタデータのバージョンの管理単位
+        version_id (str): マスタデータのバージョンのID
+    """
+
+    version_scope = response_cache.master_scope
+    version_id = response_cache.master_scope_id
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def check_interval(self):
+        """マスタデータのバージョンを確認する間隔(秒)"""
+        return settings.MASTER_REGISTRY["CHECK_INTERVAL"]
+
+    def load(self):
+        """全てのマスタデータを読み込む
+
+        Returns:
+            dict: モデルクラスをキー、MasterTableを値とする辞書
+        """
+        return {model: MasterTable(model, list(model.objects.order_by().values())) for model in MASTER_MODELS}
+
+    def tables(self):
+        """バージョンを確認し、全てのマスタデータのテーブルを取得する
+
+        Returns:
+            dict: モデルクラスをキー、MasterTableを値とする辞書
+        """
+        now = time.monotonic()
+        if self._tables is not None and now - self._checked_at < self.check_interval:
+            return self._tables
+
+        with self._lock:
+            version = response_cache.get_version(self.version_scope, self.version_id)
+            if self._tables is None or version != self._version:
+                self._tables = self.load()
+                self._version = version
+            self._checked_at = now
+            return self._tables
+
+    def get(self, model):
+        """マスタデータのテーブルを取得する
+
+        Args:
+            model (type): マスタデータのモデルクラス
+
+        Returns:
+            MasterTable: マスタデータのテーブル
+        """
+        return self.tables()[model]
+
+    def invalidate(self):
+        """マスタデータのバージョンを更新し、全てのプロセスで読み込み直す"""
+        response_cache.invalidate(self.version_scope, self.version_id)
+
+        # 更新したプロセスでは確認間隔を待たずに読み込み直す
+        self._checked_at = 0.0
+
+
+master_registry = MasterRegistry()
+
+
+class MasterValue:
+    """マスタデータのIDを、レジストリのフィールドの値に変換する関数
+
+    Attributes:
+        model (type): マスタデータのモデルクラス
+        field (str): 取得するフィールド名
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+
+    def __call__(self, master_id):
+        return master_registry.get(self.model).get(master_id, self.field)
@@ -1,44 +1,14 @@
 import logging
 import time
 from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
 from django.utils.timezone import now
 
 logger = logging.getLogger(settings.LOGGER["ACCESS"])
 
 
-class EnsureCharsetForJsonMiddleware:
-    """JSONレスポンスにcharset=utf-8を設定するミドルウェア
-
-    JSONレスポンスのContent-Typeにcharset=utf-8が含まれていない場合、
-    charset=utf-8を設定する
-    """
-
-    def __init__(self, get_response):
-        """ミドルウェアの初期化メソッド
-
-        Args:
-            get_response (callable): リクエストを処理してレスポンスを返す関数
-        """
-        self.get_response = get_response
-
-    def __call__(self, request):
-        """JSONレスポンスにcharsetを設定するメソッド
-
-        Args:
-            request (HttpRequest): リクエストオブジェクト
-
-        Returns:
-            HttpResponse: charset=utf-8が適用されたレスポンスオブジェクト
-        """
-        response = self.get_response(request)
-        if (
-            response.get("Content-Type", "").startswith("application/json")
-            and "charset" not in response["Content-Type"]
-        ):
-            response["Content-Type"] = "application/json; charset=utf-8"
-        return response
-
-
 class AccessLogMiddleware:
     """アクセスログを記録するミドルウェア
 
@@ -98,3 +68,52 @@ class AccessLogMiddleware:
         )
 
         return response
+
+
+def is_lean_request(request):
+    """セッション・Django認証・メッセージの処理を省略するリクエスト(JWT認証のみのAPIの参照)かどうかを判定する
+
+    Args:
+        request (HttpRequest): リクエストオブジェクト
+
+    Returns:
+        bool: LEAN_MIDDLEWAREのパスとHTTPメソッドに一致する場合はTrue
+    """
+    options = settings.LEAN_MIDDLEWARE
+    return request.method in options["METHODS"] and request.path_info.startswith(options["PATH_PREFIXES"])
+
+
+class LeanLaneMixin:
+    """JWT認証のみのAPIの参照では処理を行わず、次のミドルウェアを呼び出すミドルウェアのMixin
+
+    セッション等を使用しないリクエストで、セッションの読み込みやユーザー・メッセージの遅延オブジェクトの作成を省略する。
+    管理画面(/admin/)や更新系のリクエストは、元のミドルウェアで処理する
+    """
+
+    # WSGIのリクエスト毎の分岐を同期処理のみで行う
+    async_capable = False
+
+    def __call__(self, request):
+        """リクエストに応じて、元のミドルウェアの処理を行うかどうかを切り替える
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+
+        Returns:
+            HttpResponse: レスポンスオブジェクト
+        """
+        if is_lean_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(LeanLaneMixin, SessionMiddleware):
+    """JWT認証のみのAPIの参照ではセッションを読み込まないSessionMiddleware"""
+
+
+class LeanAuthenticationMiddleware(LeanLaneMixin, AuthenticationMiddleware):
+    """JWT認証のみのAPIの参照ではセッションのユーザーを設定しないAuthenticationMiddleware"""
+
+
+class LeanMessageMiddleware(LeanLaneMixin, MessageMiddleware):
+    """JWT認証のみのAPIの参照ではメッセージのストレージを作成しないMessageMiddleware"""
@@ -546,6 +546,10 @@ class Activity(models.Model):
         verbose_name = "活動データ"
         verbose_name_plural = "活動データ"
         ordering = ["id"]
+        indexes = [
+            # ユーザー毎の公開対象の活動を活動開始日時順に取得するためのインデックス
+            models.Index(fields=["user", "is_public", "start_at"], name="activity_user_public_start_idx"),
+        ]
 
     def __str__(self):
         return f"{self.id}(user:{self.user.id}), title:{self.title}"
@@ -691,6 +695,105 @@ class ActivityPhotos(models.Model):
         return f"{self.id}({self.taken_at})"
 
 
+class ActivitySummary(models.Model):
+    """
+    活動の集計データモデル
+
+    活動一覧・詳細の表示用に、活動写真と活動に紐づく名称を集計したデータを保持する。
+    活動写真、タグ、エリア、都道府県、登頂した山の更新時にシグナルハンドラで再集計する
+
+    Attributes:
+        activity (OneToOneField): 活動ID (プライマリキー)
+        total_domo_points (IntegerField): DOMOポイントの合計
+        total_photos (IntegerField): 活動写真の枚数
+        cover_photo_seq_no (IntegerField): カバー写真のシーケンス番号
+        cover_photo_timestamp (IntegerField): カバー写真のタイムスタンプ
+        cover_photo_aspect_ratio (DecimalField): カバー写真のアスペクト比
+        prefecture_names (JSONField): 活動した都道府県名のリスト
+        area_names (JSONField): 活動したエリア名のリスト
+        tag_names (JSONField): 活動タグ名のリスト
+        mountain_names (JSONField): 登頂した山の名称のリスト
+    """
+
+    activity = models.OneToOneField(
+        Activity, on_delete=models.CASCADE, primary_key=True, related_name="summary", verbose_name="活動"
+    )
+    total_domo_points = models.IntegerField(default=0, verbose_name="DOMOポイントの合計")
+    total_photos = models.IntegerField(default=0, verbose_name="活動写真の枚数")
+    cover_photo_seq_no = models.IntegerField(blank=True, null=True, verbose_name="カバー写真のシーケンス番号")
+    cover_photo_timestamp = models.IntegerField(blank=True, null=True, verbose_name="カバー写真のタイムスタンプ")
+    cover_photo_aspect_ratio = models.DecimalField(
+        max_digits=6, decimal_places=3, blank=True, null=True, verbose_name="カバー写真のアスペクト比"
+    )
+    prefecture_names = models.JSONField(default=list, verbose_name="活動した都道府県名")
+    area_names = models.JSONField(default=list, verbose_name="活動したエリア名")
+    tag_names = models.JSONField(default=list, verbose_name="活動タグ名")
+    mountain_names = models.JSONField(default=list, verbose_name="登頂した山の名称")
+
+    class Meta:
+        db_table = "climbing_activity_summary"
+        verbose_name = "活動の集計データ"
+        verbose_name_plural = "活動の集計データ"
+        ordering = ["activity"]
+
+    def __str__(self):
+        return f"{self.activity_id}(domo:{self.total_domo_points}, photos:{self.total_photos})"
+
+
+class UserMountainStats(models.Model):
+    """
+    ユーザーの登頂した山毎の集計データモデル
+
+    登山の活動実績の表示用に、公開対象の活動で登頂した山毎の登頂回数等と山の情報を保持する。
+    活動、活動で登頂した山、山情報、山の都道府県、都道府県の更新時にシグナルハンドラで再集計する
+
+    Attributes:
+        id (AutoField): ID (プライマリキー)
+        user (ForeignKey): ユーザーID
+        mountain (ForeignKey): 山情報ID
+        climb_count (IntegerField): 登頂回数
+        first_climbed_at (DateTimeField): 初回の登頂日時(活動開始日時)
+        last_climbed_at (DateTimeField): 最新の登頂日時(活動開始日時)
+        total_ascent (IntegerField): 登頂した活動の登った距離の合計(m)
+        mountain_name (CharField): 山の名称
+        mountain_name_ruby (CharField): 山の名称のふりがな
+        elevation (IntegerField): 山の標高(m)
+        prefecture_names (JSONField): 山の都道府県名のリスト
+        prefecture_names_ruby (JSONField): 山の都道府県名のふりがなのリスト
+    """
+
+    id = models.AutoField(primary_key=True, verbose_name="ID")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="mountain_stats", verbose_name="ユーザー")
+    mountain = models.ForeignKey(MountainMaster, on_delete=models.CASCADE, verbose_name="山情報")
+    climb_count = models.IntegerField(default=0, verbose_name="登頂回数")
+    first_climbed_at = models.DateTimeField(verbose_name="初回の登頂日時")
+    last_climbed_at = models.DateTimeField(verbose_name="最新の登頂日時")
+    total_ascent = models.IntegerField(default=0, verbose_name="登った距離の合計(m)")
+    mountain_name = models.CharField(max_length=20, verbose_name="山の名称")
+    mountain_name_ruby = models.CharField(max_length=20, verbose_name="山の名称のふりがな")
+    elevation = models.IntegerField(verbose_name="山の標高(m)")
+    prefecture_names = models.JSONField(default=list, verbose_name="山の都道府県名")
+    prefecture_names_ruby = models.JSONField(default=list, verbose_name="山の都道府県名のふりがな")
+
+    class Meta:
+        db_table = "climbing_user_mountain_stats"
+        verbose_name = "ユーザーの登頂した山の集計データ"
+        verbose_name_plural = "ユーザーの登頂した山の集計データ"
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "mountain"], name="unique_user_mountain_stats"),
+        ]
+        indexes = [
+            # 登山の活動実績を登頂回数、標高の降順に取得するためのインデックス
+            models.Index(
+                fields=["user", "-climb_count", "-elevation", "mountain"], name="user_mountain_stats_rank_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}({self.mountain_name}:{self.climb_count})"
+
+
 class MountainPrefecture(models.Model):
     """
     山の都道府県モデル
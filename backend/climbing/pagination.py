@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from rest_framework.response import Response
+
+
+class InvalidPageParameter(Exception):
+    """ページネーションのパラメータが不正な場合の例外"""
+
+
+class KeysetPagination:
+    """活動開始日時と活動IDの降順によるキーセットページネーション
+
+    カーソルには直前のページの最後の活動の(活動開始日時, 活動ID)を格納し、
+    次のページはその位置より後ろの活動のみをインデックスで範囲検索する。
+    limitもcursorも指定されていない場合はページネーションを行わない
+
+    Attributes:
+        limit_query_param (str): 取得件数のクエリパラメータ名
+        cursor_query_param (str): カーソルのクエリパラメータ名
+        default_limit (int): cursorのみ指定された場合の取得件数
+        max_limit (int): 取得件数の上限
+    """
+
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    default_limit = 20
+    max_limit = 100
+
+    def __init__(self, query_params):
+        """クエリパラメータからページネーションの条件を取得する
+
+        Args:
+            query_params (QueryDict): リクエストのクエリパラメータ
+
+        Raises:
+            InvalidPageParameter: limitまたはcursorが不正な場合
+        """
+        raw_limit = query_params.get(self.limit_query_param)
+        raw_cursor = query_params.get(self.cursor_query_param)
+
+        self.is_paginated = raw_limit is not None or raw_cursor is not None
+        self.limit = self.parse_limit(raw_limit) if raw_limit is not None else self.default_limit
+        self.position = self.decode_cursor(raw_cursor) if raw_cursor else None
+        self.next_cursor = None
+
+    def parse_limit(self, raw_limit):
+        """取得件数を検証する
+
+        Args:
+            raw_limit (str): クエリパラメータの取得件数
+
+        Returns:
+            int: 取得件数
+
+        Raises:
+            InvalidPageParameter: 取得件数が1以上max_limit以下の整数でない場合
+        """
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise InvalidPageParameter("limit must be an integer")
+
+        if not 1 <= limit <= self.max_limit:
+            raise InvalidPageParameter(f"limit must be between 1 and {self.max_limit}")
+
+        return limit
+
+    @staticmethod
+    def encode_cursor(activity):
+        """活動の位置をカーソル文字列に変換する
+
+        Args:
+            activity (dict): ページの最後の活動の行(start_at、idを含む)
+
+        Returns:
+            str: URLセーフなBase64でエンコードしたカーソル
+        """
+        position = json.dumps([activity["start_at"].isoformat(), activity["id"]])
+        return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """カーソル文字列を活動の位置に変換する
+
+        Args:
+            cursor (str): カーソル
+
+        Returns:
+            tuple: (活動開始日時, 活動ID)
+
+        Raises:
+            InvalidPageParameter: カーソルが不正な場合
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            start_at, activity_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(start_at), int(activity_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidPageParameter("Invalid cursor")
+
+    def paginate(self, instances):
+        """1件多く取得した活動のリストからページを切り出し、次のカーソルを設定する
+
+        Args:
+            instances (list[dict]): limit + 1件を上限に取得した活動の行のリスト
+
+        Returns:
+            list[dict]: ページの活動の行のリスト
+        """
+        page = instances[: self.limit]
+        if len(instances) > self.limit:
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        """ページのデータと次のカーソルを含むレスポンスを作成する
+
+        Args:
+            data (list): ページのデータ
+
+        Returns:
+            Response: ページのデータと次のカーソル
+        """
+        return Response({"results": data, "next_cursor": self.next_cursor})
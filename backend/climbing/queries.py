@@ -0,0 +1,79 @@
+from django.db.models import Q
+from .models import Activity, User
+
+
+def get_public_activities(user_id, columns, position=None, limit=None, conditions=()):
+    """ユーザーの公開対象の活動情報を、指定したカラムの行として1クエリで取得する
+
+    ユーザー、活動の集計データのカラムは結合して取得する(マスタデータはレジストリから取得するため結合しない)。
+    positionを指定した場合は、(活動開始日時, 活動ID)がその位置より後ろの活動のみを
+    (user_id, is_public, start_at)の複合インデックスで範囲検索する。
+    conditionsを指定した場合は、全ての条件に一致する活動のみを取得する
+
+    Args:
+        user_id (int): ユーザーID
+        columns (list): 取得するカラム名のリスト(例: "title"、"summary__tag_names")
+        position (tuple, optional): 直前のページの最後の活動の(活動開始日時, 活動ID)
+        limit (int, optional): 取得件数の上限
+        conditions (list, optional): 絞り込み条件(Q、Exists等)のリスト
+
+    Returns:
+        list[dict]: 活動開始日時、活動IDの降順に並んだ活動情報の行のリスト
+    """
+    activities = Activity.objects.filter(*conditions, user_id=user_id, is_public=True)
+
+    # 直前のページの最後の活動より後ろの活動に絞り込む
+    if position is not None:
+        start_at, activity_id = position
+        activities = activities.filter(Q(start_at__lt=start_at) | Q(start_at=start_at, id__lt=activity_id))
+
+    activities = activities.order_by("-start_at", "-id").values(*columns)
+
+    if limit is not None:
+        activities = activities[:limit]
+
+    return list(activities)
+
+
+def get_public_activity(activity_id):
+    """公開対象の活動情報を1クエリで取得する
+
+    ユーザー、活動の集計データを結合して取得する(マスタデータはレジストリから取得するため結合しない)
+
+    Args:
+        activity_id (int): 活動ID
+
+    Returns:
+        Activity: 活動情報。存在しない場合はNone
+    """
+    return Activity.objects.filter(id=activity_id, is_public=True).select_related("user", "summary").first()
+
+
+def get_public_activities_by_ids(activity_ids):
+    """活動IDのリストに対応する公開対象の活動情報を1クエリで取得する
+
+    ユーザー、活動の集計データを結合して取得する(マスタデータはレジストリから取得するため結合しない)
+
+    Args:
+        activity_ids (list[int]): 活動IDのリスト
+
+    Returns:
+        list[Activity]: 活動情報のリスト(存在しないまたは非公開の活動は含まない)
+    """
+    return list(Activity.objects.filter(id__in=activity_ids, is_public=True).select_related("user", "summary"))
+
+
+def get_user_with_profile(user_id):
+    """ユーザー情報を、契約情報、活動する都道府県を含めて2クエリで取得する
+
+    性別名、都道府県名はマスタデータのレジストリから取得するため結合しない
+
+    Args:
+        user_id (int): ユーザーID
+
+    Returns:
+        User: ユーザー情報。存在しない場合はNone
+    """
+    return (
+        User.objects.filter(id=user_id).select_related("contract").prefetch_related("user_activity_prefecture").first()
+    )
@@ -0,0 +1,97 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson、msgpackで変換できないオブジェクトの変換に使用するDRFのJSONエンコーダ
+drf_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """orjson、msgpackで変換できないオブジェクトを、DRFのJSONRendererと同じ値に変換する
+
+    Args:
+        obj (object): 変換するオブジェクト(Decimal、datetime、遅延評価の文字列等)
+
+    Returns:
+        object: JSONで表現できる値
+
+    Raises:
+        TypeError: 変換できないオブジェクトの場合
+    """
+    return drf_encoder.default(obj)
+
+
+class FastJSONRenderer(BaseRenderer):
+    """orjsonでJSONのバイト列を作成するレンダラークラス
+
+    DRFのJSONRenderer(UNICODE_JSON、COMPACT_JSONが既定値の場合)と同一のバイト列を作成し、
+    Content-Typeにはcharset=utf-8を含める
+
+    Attributes:
+        media_type (str): メディアタイプ
+        format (str): フォーマット名
+        charset (str): 文字コード
+        options (int): orjsonのオプション
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = "utf-8"
+
+    # 日時はDRFと同じ書式にするためencode_defaultで変換し、文字列以外の辞書のキーは文字列に変換する
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """データをJSONのバイト列に変換する
+
+        Args:
+            data (object): レスポンスデータ
+            accepted_media_type (str, optional): コンテントネゴシエーションで決定したメディアタイプ
+            renderer_context (dict, optional): ビュー、リクエスト等のコンテキスト
+
+        Returns:
+            bytes: JSONのバイト列
+        """
+        if data is None:
+            return b""
+
+        content = orjson.dumps(data, default=encode_default, option=self.options)
+
+        # DRFのJSONRendererと同様に、JavaScriptで改行として扱われるU+2028、U+2029をエスケープ
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePackのバイト列を作成するレンダラークラス
+
+    Acceptヘッダーにapplication/msgpackを指定したリクエストに対して使用する。
+    値の変換はFastJSONRendererと同じで、JSONと同じ構造のデータを返す
+
+    Attributes:
+        media_type (str): メディアタイプ
+        format (str): フォーマット名
+        charset (None): 文字コード(バイナリのため指定しない)
+        render_style (str): 描画形式
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """データをMessagePackのバイト列に変換する
+
+        Args:
+            data (object): レスポンスデータ
+            accepted_media_type (str, optional): コンテントネゴシエーションで決定したメディアタイプ
+            renderer_context (dict, optional): ビュー、リクエスト等のコンテキスト
+
+        Returns:
+            bytes: MessagePackのバイト列
+        """
+        if data is None:
+            return b""
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
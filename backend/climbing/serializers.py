@@ -1,9 +1,21 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
-from .models import Activity, User, PrefectureMaster, AreaMaster, Contract
+from .models import (
+    Activity,
+    ActivitySummary,
+    User,
+    PrefectureMaster,
+    AreaMaster,
+    Contract,
+    GenderMaster,
+    AvgPaceLevelMaster,
+    CourseConstantLevelMaster,
+)
+from .masters import MasterValue
+from .blacklist import FilteredRefreshToken
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 
 
 class AuthTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -14,10 +26,12 @@ class AuthTokenObtainPairSerializer(TokenObtainPairSerializer):
     Attributes:
         email (EmailField): ユーザーのメールアドレス
         password (CharField): 認証用のパスワード
+        token_class (type): リフレッシュトークンのクラス
     """
 
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
+    token_class = FilteredRefreshToken
 
     def validate(self, attrs):
         """ユーザー認証を行い、トークンを生成するメソッド
@@ -59,17 +73,29 @@ class AuthTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token["email"] = user.email
         token["user_id"] = str(user.id).zfill(4)
+
+        # リクエスト毎にユーザー情報をDBから取得せず、クレームからユーザーを作成するための情報
+        token["is_active"] = user.is_active
+        token["is_paid"] = user.is_paid
         return token
 
 
 class AuthTokenRefreshSerializer(TokenRefreshSerializer):
     """リフレッシュトークンを使用してアクセストークンを払い出すAPIのシリアライザ
 
-    リフレッシュトークンを使用して新しいアクセストークンを発行する
+    リフレッシュトークンを使用して新しいアクセストークンを発行する。
+    リフレッシュトークンのブラックリストはワーカープロセス内のフィルタで確認する。
+    アクセストークンのクレームでリクエスト毎の認証を行うため、払い出し時にユーザーをDBから取得し、
+    無効化・削除されたユーザーは拒否して、払い出すトークンのクレーム(is_active、is_paid)を最新の値にする
+
+    Attributes:
+        token_class (type): リフレッシュトークンのクラス
     """
 
+    token_class = FilteredRefreshToken
+
     def validate(self, attrs):
-        """トークンの検証とユーザーIDの取得
+        """トークンの検証とユーザーの確認、新しいトークンの払い出し
 
         Args:
             attrs (dict): リフレッシュトークンを含む辞書データ
@@ -78,15 +104,33 @@ class AuthTokenRefreshSerializer(TokenRefreshSerializer):
             dict: 新しいアクセス/リフレッシュトークン、ユーザーID
 
         Raises:
-            InvalidToken: トークンが無効な場合
+            InvalidToken: トークンが無効な場合、またはユーザーが無効化・削除されている場合
         """
         try:
-            data = super().validate(attrs)  # ここでリフレッシュトークンのバリデーションが行われる
+            refresh = self.token_class(attrs["refresh"])  # ここでリフレッシュトークンのバリデーションが行われる
         except TokenError as e:
             raise InvalidToken({"detail": "Token is blacklisted", "code": "token_not_valid"})
 
-        refresh_token = RefreshToken(data["refresh"])  # dataからリフレッシュトークンを取り出す
-        data["user_id"] = refresh_token["user_id"]
+        # トークンのユーザーIDでユーザーを取得(プライマリキーの1クエリ)
+        user = User.objects.filter(id=int(refresh["user_id"])).only("id", "is_active", "is_paid").first()
+        if user is None or not user.is_active:
+            raise InvalidToken({"detail": "User is inactive or does not exist", "code": "no_active_account"})
+
+        # 新しいトークンのクレームを最新のユーザー情報で書き換える(アクセストークンはリフレッシュトークンから複製される)
+        refresh["is_active"] = user.is_active
+        refresh["is_paid"] = user.is_paid
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        data["user_id"] = refresh["user_id"]
         return data
 
 
@@ -112,6 +156,44 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
                 self.fields.pop(field_name)
 
 
+def format_id(value):
+    """IDを4桁のゼロ埋め文字列に変換する"""
+    return str(value).zfill(4)
+
+
+def format_minutes(value):
+    """分を"HH:MM"形式の文字列に変換する"""
+    return f"{str(value // 60).zfill(2)}:{str(value % 60).zfill(2)}"
+
+
+def format_date(value):
+    """日時を"YYYY-MM-DD"形式の文字列に変換する"""
+    # strftimeより高速なため、書式指定で変換する
+    return f"{value.year:04d}-{value.month:02d}-{value.day:02d}"
+
+
+# 日本語の曜日
+WEEKDAYS_JP = ["月", "火", "水", "木", "金", "土", "日"]
+
+
+def format_date_display(value):
+    """日時を"YYYY.MM.DD(曜日)"形式の表示用の文字列に変換する"""
+    return f"{value.year:04d}.{value.month:02d}.{value.day:02d}({WEEKDAYS_JP[value.weekday()]})"
+
+
+def format_distance_km(value):
+    """距離(m)を小数点以下1桁のkmに変換する"""
+    return round(value / 1000, 1)
+
+
+def format_cover_photo_name(activity_id, seq_no, timestamp):
+    """カバー写真のファイル名を作成する。カバー写真が設定されていない場合はNoneを返す"""
+    if seq_no is None:
+        return None
+
+    return f"photo_{str(activity_id).zfill(4)}_{str(seq_no).zfill(2)}_{str(timestamp)}.webp"
+
+
 class ActivitySerializer(DynamicFieldsModelSerializer):
     """
     登山の活動データのシリアライザ
@@ -124,53 +206,59 @@ class ActivitySerializer(DynamicFieldsModelSerializer):
     start_at = serializers.SerializerMethodField()
     end_at = serializers.SerializerMethodField()
     start_at_display = serializers.SerializerMethodField()
-    course_constant_level = serializers.CharField(max_length=10, source="course_constant_level.level")
+    course_constant_level = serializers.SerializerMethodField()
     active_time = serializers.SerializerMethodField()
     route_distance = serializers.SerializerMethodField()
     standard_time = serializers.SerializerMethodField()
-    avg_pace_min = serializers.IntegerField(source="avg_pace_level.min")
-    avg_pace_max = serializers.IntegerField(source="avg_pace_level.max")
-    avg_pace_level = serializers.CharField(max_length=10, source="avg_pace_level.level")
+    avg_pace_min = serializers.SerializerMethodField()
+    avg_pace_max = serializers.SerializerMethodField()
+    avg_pace_level = serializers.SerializerMethodField()
+
+    # 平均ペースレベル、コース定数レベルはマスタデータのレジストリから取得する
+    course_constant_level_value = MasterValue(CourseConstantLevelMaster, "level")
+    avg_pace_min_value = MasterValue(AvgPaceLevelMaster, "min")
+    avg_pace_max_value = MasterValue(AvgPaceLevelMaster, "max")
+    avg_pace_level_value = MasterValue(AvgPaceLevelMaster, "level")
 
     class Meta:
         model = Activity
         fields = "__all__"
 
     def get_activity_id(self, obj):
-        return str(obj.id).zfill(4)
+        return format_id(obj.id)
 
     def get_user_id(self, obj):
-        return str(obj.user_id).zfill(4)
+        return format_id(obj.user_id)
 
     def get_standard_time(self, obj):
-        hr = str(obj.standard_time // 60).zfill(2)
-        min = str(obj.standard_time % 60).zfill(2)
-        formatted_standard_time = f"{hr}:{min}"
-        return formatted_standard_time
+        return format_minutes(obj.standard_time)
 
     def get_start_at_display(self, obj):
-        # 日本語の曜日を取得
-        weekdays = ["月", "火", "水", "木", "金", "土", "日"]
-        weekday_jp = weekdays[obj.start_at.weekday()]
-
-        # 日付フォーマット変換した活動開始日を取得
-        formatted_start_at = obj.start_at.strftime(f"%Y.%m.%d({weekday_jp})")
-        return formatted_start_at
+        return format_date_display(obj.start_at)
 
     def get_start_at(self, obj):
-        return obj.start_at.strftime(f"%Y-%m-%d")
+        return format_date(obj.start_at)
 
     def get_end_at(self, obj):
-        return obj.end_at.strftime(f"%Y-%m-%d")
+        return format_date(obj.end_at)
 
     def get_route_distance(self, obj):
-        return round(obj.route_distance / 1000, 1)
+        return format_distance_km(obj.route_distance)
 
     def get_active_time(self, obj):
-        hh = obj.active_time // 60
-        mm = obj.active_time % 60
+        return format_minutes(obj.active_time)
+
+    def get_course_constant_level(self, obj):
+        return self.course_constant_level_value(obj.course_constant_level_id)
+
+    def get_avg_pace_min(self, obj):
+        return self.avg_pace_min_value(obj.avg_pace_level_id)
 
-        return f"{str(hh).zfill(2)}:{str(mm).zfill(2)}"
+    def get_avg_pace_max(self, obj):
+        return self.avg_pace_max_value(obj.avg_pace_level_id)
+
+    def get_avg_pace_level(self, obj):
+        return self.avg_pace_level_value(obj.avg_pace_level_id)
 
 
 class UserSerializer(DynamicFieldsModelSerializer):
@@ -189,11 +277,15 @@ class UserSerializer(DynamicFieldsModelSerializer):
     def get_id(self, obj):
         return str(obj.id).zfill(4)
 
+    # 性別名、都道府県名はマスタデータのレジストリから取得する
+    gender_name = MasterValue(GenderMaster, "name")
+    prefecture_name = MasterValue(PrefectureMaster, "name")
+
     def get_gender(self, obj):
-        return obj.gender.name
+        return self.gender_name(obj.gender_id)
 
     def get_activity_prefecture(self, obj):
-        return [item.prefecture.name for item in obj.user_activity_prefecture.all()]
+        return [self.prefecture_name(item.prefecture_id) for item in obj.user_activity_prefecture.all()]
 
 
 class ContractSerializer(DynamicFieldsModelSerializer):
@@ -206,65 +298,191 @@ class ContractSerializer(DynamicFieldsModelSerializer):
         fields = "__all__"
 
 
-class NameSerializer(serializers.Serializer):
+class ActivitySummarySerializer(DynamicFieldsModelSerializer):
     """
-    各マスターデータの名称のシリアライザ
+    登山の活動の集計データのシリアライザ
     """
 
-    id = serializers.IntegerField()
-    name = serializers.CharField(max_length=20)
+    cover_photo_name = serializers.SerializerMethodField()
+    aspect_ratio = serializers.SerializerMethodField()
+    mountains = serializers.ListField(child=serializers.CharField(), source="mountain_names")
+    prefectures = serializers.ListField(child=serializers.CharField(), source="prefecture_names")
+    areas = serializers.ListField(child=serializers.CharField(), source="area_names")
+    tags = serializers.ListField(child=serializers.CharField(), source="tag_names")
 
+    class Meta:
+        model = ActivitySummary
+        fields = [
+            "total_domo_points",
+            "total_photos",
+            "cover_photo_name",
+            "aspect_ratio",
+            "mountains",
+            "prefectures",
+            "areas",
+            "tags",
+        ]
 
-class ActivityAggregatesSerializer(serializers.Serializer):
-    """
-    登山の集計データのシリアライザ
-    """
+    def get_cover_photo_name(self, obj):
+        return format_cover_photo_name(obj.activity_id, obj.cover_photo_seq_no, obj.cover_photo_timestamp)
 
-    total_domo_points = serializers.IntegerField()
-    total_photos = serializers.IntegerField()
+    def get_aspect_ratio(self, obj):
+        return obj.cover_photo_aspect_ratio
 
 
-class ActivityPhotosSerializer(serializers.Serializer):
-    """
-    登山の活動写真ファイル名のシリアライザ
+class Nullable:
+    """値がNoneの場合はdefaultを返す変換関数
+
+    CompiledActivitySerializerでは関数呼び出しを行わずにNoneの判定をソースに展開する
+
+    Attributes:
+        converter (callable): 値がNoneでない場合の変換関数。Noneの場合はそのまま出力する
+        default (object): 値がNoneの場合の出力(ソースに展開するためリテラルで表現できる値)
     """
 
-    cover_photo_name = serializers.SerializerMethodField()
-    aspect_ratio = serializers.SerializerMethodField()
+    def __init__(self, converter, default=None):
+        self.converter = converter
+        self.default = default
 
-    def get_cover_photo_name(self, obj):
-        seq_no = obj["seq_no"]
-        timestamp = obj["timestamp"]
-        cover_photo_name = f"photo_{str(obj['id']).zfill(4)}_{str(seq_no).zfill(2)}_{str(timestamp)}.webp"
-        return cover_photo_name
+    def __call__(self, value):
+        if value is None:
+            return self.default
+        return value if self.converter is None else self.converter(value)
 
-    def get_aspect_ratio(self, obj):
-        return obj["aspect_ratio"]
 
+class CompiledActivitySerializer:
+    """ActivitySerializerとActivitySummarySerializerを結合した出力を、values()の行やタプルから作成する
+    読み取り専用のシリアライザ
 
-class ActivityListSerializer(serializers.Serializer):
-    """
-    登山の活動一覧データのシリアライザ
+    初期化時に出力フィールドの変換処理を1つの関数にコンパイルしておき、行毎にDRFのフィールドの処理を
+    経由せずに変換することで、活動数が多い場合のシリアライズのCPU負荷を削減する。
+    出力するフィールドの順序と値はDRFのシリアライザと同一になる
+
+    Attributes:
+        field_specs (dict): 出力フィールド名と(取得するカラム名またはカラム名のタプル, 変換関数)の対応。
+            変換関数がNoneの場合はカラムの値をそのまま出力し、複数のカラムはその順に変換関数の引数とする
+        fields (list): 出力するフィールド名のリスト(出力順)
+        columns (list): 行から取得するカラム名のリスト(タプルの場合はこの順序)
     """
 
-    aggregates = ActivityAggregatesSerializer(many=True)
-    cover_photo = ActivityPhotosSerializer(many=True)
-    prefectures = NameSerializer(many=True)
-    areas = NameSerializer(many=True)
-    tags = NameSerializer(many=True)
+    field_specs = {
+        # 活動情報(ActivitySerializer)
+        "activity_id": ("id", format_id),
+        "user_id": ("user_id", format_id),
+        "user_name": ("user__name", Nullable(str)),
+        "is_paid": ("user__is_paid", Nullable(bool)),
+        "title": ("title", str),
+        "start_at": ("start_at", format_date),
+        "start_at_display": ("start_at", format_date_display),
+        "end_at": ("end_at", format_date),
+        "stay_days": ("stay_days", int),
+        "activity_days": ("activity_days", int),
+        "active_time": ("active_time", format_minutes),
+        "route_distance": ("route_distance", format_distance_km),
+        "ascent_distance": ("ascent_distance", int),
+        "descent_distance": ("descent_distance", int),
+        "is_plan_submitted": ("is_plan_submitted", bool),
+        "calories": ("calories", int),
+        "course_constant": ("course_constant", int),
+        "course_constant_level": ("course_constant_level_id", ActivitySerializer.course_constant_level_value),
+        "standard_time": ("standard_time", format_minutes),
+        "avg_pace_min": ("avg_pace_level_id", ActivitySerializer.avg_pace_min_value),
+        "avg_pace_max": ("avg_pace_level_id", ActivitySerializer.avg_pace_max_value),
+        "avg_pace_level": ("avg_pace_level_id", ActivitySerializer.avg_pace_level_value),
+        "activity_article": ("activity_article", str),
+        # 活動の集計データ(ActivitySummarySerializer)。集計データが未作成の場合は空の集計データと同じ値にする
+        "total_domo_points": ("summary__total_domo_points", Nullable(int, 0)),
+        "total_photos": ("summary__total_photos", Nullable(int, 0)),
+        "cover_photo_name": (
+            ("id", "summary__cover_photo_seq_no", "summary__cover_photo_timestamp"),
+            format_cover_photo_name,
+        ),
+        # DecimalはJSONでは数値として出力されるため、レンダリング時の変換が不要となるようfloatに変換する
+        "aspect_ratio": ("summary__cover_photo_aspect_ratio", Nullable(float)),
+        "mountains": ("summary__mountain_names", Nullable(None, [])),
+        "prefectures": ("summary__prefecture_names", Nullable(None, [])),
+        "areas": ("summary__area_names", Nullable(None, [])),
+        "tags": ("summary__tag_names", Nullable(None, [])),
+    }
+
+    def __init__(self, fields, summary_fields):
+        """出力フィールドの変換処理をコンパイルする
 
+        Args:
+            fields (list): ActivitySerializerで出力するフィールドのリスト
+            summary_fields (list): ActivitySummarySerializerで出力するフィールドのリスト
 
-class ActivityDetailSerializer(serializers.Serializer):
-    """
-    登山の活動詳細データのシリアライザ
-    """
+        Raises:
+            ValueError: 高速化に対応していないフィールドが指定された場合
+        """
+        # 出力するフィールドの順序をDRFのシリアライザと同じにする
+        self.fields = list(ActivitySerializer(fields=fields).fields) + list(
+            ActivitySummarySerializer(fields=summary_fields).fields
+        )
+        unsupported = [name for name in self.fields if name not in self.field_specs]
+        if unsupported:
+            raise ValueError(f"Unsupported fields: {', '.join(unsupported)}")
+
+        # 取得するカラムのリストを作成(重複は除外)
+        self.columns = []
+        for name in self.fields:
+            columns = self.field_specs[name][0]
+            for column in (columns,) if isinstance(columns, str) else columns:
+                if column not in self.columns:
+                    self.columns.append(column)
+
+        # values()の行(カラム名がキー)とタプル(columnsの順序)のそれぞれの変換関数を作成
+        positions = {column: index for index, column in enumerate(self.columns)}
+        self.convert_dict = self.compile(repr)
+        self.convert_tuple = self.compile(lambda column: repr(positions[column]))
+
+    def compile(self, locate):
+        """1行を出力の辞書に変換する関数をコンパイルする
+
+        フィールド毎の関数呼び出しやループを行わないよう、辞書リテラルを返す関数のソースを作成して実行する。
+        ソースに埋め込むのはfield_specsのフィールド名とカラム名のみで、リクエストの値は含まない
+
+        Args:
+            locate (callable): カラム名を、行のキーまたはインデックスのソース表現に変換する関数
+
+        Returns:
+            callable: 1行を出力の辞書に変換する関数
+        """
+        namespace = {}
+        items = []
+        for index, name in enumerate(self.fields):
+            columns, converter = self.field_specs[name]
+            values = [f"row[{locate(column)}]" for column in ((columns,) if isinstance(columns, str) else columns)]
+            if isinstance(converter, Nullable):
+                # Noneの判定を展開
+                value = values[0]
+                if converter.converter is not None:
+                    namespace[f"convert_{index}"] = converter.converter
+                    value = f"convert_{index}({value})"
+                items.append(f"{name!r}: {converter.default!r} if {values[0]} is None else {value}")
+            elif converter is None:
+                items.append(f"{name!r}: {values[0]}")
+            else:
+                namespace[f"convert_{index}"] = converter
+                items.append(f"{name!r}: convert_{index}({', '.join(values)})")
+
+        exec(f"def convert(row):\n    return {{{', '.join(items)}}}", namespace)
+        return namespace["convert"]
+
+    def serialize(self, rows):
+        """活動の行のリストをシリアライズする
+
+        Args:
+            rows (list[dict] | list[tuple]): values(*columns)の行、またはvalues_list(*columns)のタプルのリスト
+
+        Returns:
+            list[dict]: シリアライズしたデータのリスト
+        """
+        if not rows:
+            return []
 
-    aggregates = ActivityAggregatesSerializer()
-    cover_photo = ActivityPhotosSerializer()
-    prefectures = NameSerializer(many=True)
-    mountains = NameSerializer(many=True)
-    areas = NameSerializer(many=True)
-    tags = NameSerializer(many=True)
+        convert = self.convert_tuple if isinstance(rows[0], tuple) else self.convert_dict
+        return [convert(row) for row in rows]
 
 
 class ClimbingAchievementsSerializer(serializers.Serializer):
@@ -0,0 +1,319 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .cache import invalidate_user_cache, invalidate_activity_cache
+from .summaries import (
+    SUMMARY_NAME_MASTERS,
+    refresh_activity_summaries,
+    refresh_summaries_of_master,
+    refresh_user_mountain_stats,
+)
+from .masters import MASTER_MODELS, master_registry
+from .levels import ACTIVITY_LEVEL_FIELDS, classify_activity_levels
+from .domo import adjust_contract_domo_points
+from .authentication import invalidate_user_load
+from .blacklist import jti_blacklist
+from .models import (
+    User,
+    UserActivityPrefecture,
+    Contract,
+    Activity,
+    ActivityPhotos,
+    ActivityTag,
+    ActivityArea,
+    ActivityPrefecture,
+    ActivityMountain,
+    MountainMaster,
+    MountainPrefecture,
+    PrefectureMaster,
+    UserMountainStats,
+)
+
+
+def invalidate_user_and_activities_cache(user_id):
+    """ユーザーと、ユーザーの全ての活動のレスポンスデータのキャッシュを無効化する
+
+    Args:
+        user_id (int): ユーザーID
+    """
+    invalidate_user_cache(user_id)
+    invalidate_activity_cache(*Activity.objects.filter(user_id=user_id).values_list("id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cache_on_user_change(sender, instance, **kwargs):
+    """ユーザー情報の更新時に、ユーザーと活動詳細のレスポンスデータ、認証で取得したユーザー情報のキャッシュを無効化する"""
+    invalidate_user_and_activities_cache(instance.id)
+    invalidate_user_load(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Contract)
+def invalidate_cache_on_contract_change(sender, instance, **kwargs):
+    """契約情報の更新時に、ユーザーと活動詳細のレスポンスデータのキャッシュを無効化する"""
+    invalidate_user_and_activities_cache(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserActivityPrefecture)
+def invalidate_cache_on_user_data_change(sender, instance, **kwargs):
+    """ユーザーIDを持つデータの更新時に、ユーザーのレスポンスデータのキャッシュを無効化する"""
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Activity)
+def invalidate_cache_on_activity_change(sender, instance, **kwargs):
+    """活動情報の更新時に、ユーザーと活動のレスポンスデータのキャッシュを無効化する"""
+    invalidate_user_cache(instance.user_id)
+    invalidate_activity_cache(instance.id)
+
+
+@receiver([post_save, post_delete], sender=ActivityPhotos)
+def invalidate_cache_on_photo_change(sender, instance, **kwargs):
+    """活動写真の更新時に、ユーザーと活動のレスポンスデータのキャッシュを無効化する"""
+    invalidate_user_cache(instance.user_id)
+    invalidate_activity_cache(instance.activity_id)
+
+
+@receiver([post_save, post_delete], sender=ActivityTag)
+@receiver([post_save, post_delete], sender=ActivityArea)
+@receiver([post_save, post_delete], sender=ActivityPrefecture)
+@receiver([post_save, post_delete], sender=ActivityMountain)
+def invalidate_cache_on_activity_data_change(sender, instance, **kwargs):
+    """活動に紐づくデータの更新時に、活動したユーザーと活動のレスポンスデータのキャッシュを無効化する"""
+    user_id = Activity.objects.filter(id=instance.activity_id).values_list("user_id", flat=True).first()
+    invalidate_user_cache(user_id)
+    invalidate_activity_cache(instance.activity_id)
+
+
+def is_deleted_with(origin, *models):
+    """削除が指定したモデルの削除に伴うカスケード削除かどうかを判定する
+
+    Args:
+        origin (Model | QuerySet): 削除の起点となったインスタンスまたはクエリセット
+        *models (type): 判定するモデルクラス
+
+    Returns:
+        bool: 指定したモデルの削除に伴う削除の場合はTrue
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(pre_save, sender=Activity)
+def classify_levels_on_activity_save(sender, instance, raw, update_fields, **kwargs):
+    """活動の保存時に、未設定のレベルと、平均ペース・コース定数が変更されたレベルを区間の索引で設定する
+
+    更新時は変更前の平均ペースとコース定数を取得して比較する(update_fieldsに含まれない場合は取得しない)。
+    fixtureのロード時(raw=True)は、fixtureのレベルをそのまま登録する
+    """
+    if raw:
+        return
+
+    value_fields = [value_field for value_field, _ in ACTIVITY_LEVEL_FIELDS.values()]
+    previous_values = None
+    if instance.pk is not None and (update_fields is None or not update_fields.isdisjoint(value_fields)):
+        previous_values = Activity.objects.filter(pk=instance.pk).values(*value_fields).first()
+    classify_activity_levels(instance, previous_values)
+
+
+@receiver(post_save, sender=Activity)
+def create_activity_summary(sender, instance, created, raw, **kwargs):
+    """活動の登録時に、活動の集計データを作成する
+
+    fixtureのロード時(raw=True)は、ロード後にrebuild_activity_summariesコマンドで作成する
+    """
+    if created and not raw:
+        refresh_activity_summaries([instance.id])
+
+
+@receiver(post_save, sender=ActivityPhotos)
+@receiver(post_save, sender=ActivityTag)
+@receiver(post_save, sender=ActivityArea)
+@receiver(post_save, sender=ActivityPrefecture)
+@receiver(post_save, sender=ActivityMountain)
+def refresh_summary_on_save(sender, instance, raw, **kwargs):
+    """活動に紐づくデータの登録・更新時に、活動の集計データを再集計する
+
+    fixtureのロード時(raw=True)は、ロード後にrebuild_activity_summariesコマンドで再集計する
+    """
+    if not raw:
+        refresh_activity_summaries([instance.activity_id])
+
+
+@receiver(post_delete, sender=ActivityPhotos)
+@receiver(post_delete, sender=ActivityTag)
+@receiver(post_delete, sender=ActivityArea)
+@receiver(post_delete, sender=ActivityPrefecture)
+@receiver(post_delete, sender=ActivityMountain)
+def refresh_summary_on_delete(sender, instance, origin, **kwargs):
+    """活動に紐づくデータの削除時に、活動の集計データを再集計する
+
+    活動やユーザーの削除に伴うカスケード削除の場合は、集計データも削除されるため再集計しない
+    """
+    if not is_deleted_with(origin, Activity, User):
+        refresh_activity_summaries([instance.activity_id])
+
+
+def refresh_summaries_on_master_save(sender, instance, created, raw, **kwargs):
+    """都道府県・エリア・タグ・山情報の更新時に、参照する活動の集計データ(名称)を再集計する
+
+    登録時は参照する活動がないため再集計しない。削除時は関連テーブルのカスケード削除で再集計する
+    """
+    if not created and not raw:
+        activity_ids = refresh_summaries_of_master(sender, instance.id)
+        invalidate_activity_cache(*activity_ids)
+
+
+for summary_name_master in SUMMARY_NAME_MASTERS:
+    post_save.connect(refresh_summaries_on_master_save, sender=summary_name_master)
+
+
+@receiver(post_save, sender=Activity)
+def refresh_mountain_stats_on_activity_save(sender, instance, raw, **kwargs):
+    """活動の登録・更新時(公開設定、活動開始日時、登った距離の変更等)に、登頂した山の集計データを再集計する
+
+    fixtureのロード時(raw=True)は、ロード後にrebuild_user_mountain_statsコマンドで作成する
+    """
+    if not raw:
+        mountain_ids = list(ActivityMountain.objects.filter(activity=instance).values_list("mountain_id", flat=True))
+        refresh_user_mountain_stats(instance.user_id, mountain_ids)
+
+
+@receiver(pre_save, sender=ActivityMountain)
+def remember_previous_mountain(sender, instance, raw, **kwargs):
+    """活動で登頂した山の更新前に、変更前の山情報IDを保持する"""
+    instance._previous_mountain_id = None
+    if not raw and instance.pk is not None:
+        instance._previous_mountain_id = (
+            ActivityMountain.objects.filter(pk=instance.pk).values_list("mountain_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ActivityMountain)
+def refresh_mountain_stats_on_climb_save(sender, instance, raw, **kwargs):
+    """活動で登頂した山の登録・更新時に、変更前後の山の集計データを再集計する
+
+    fixtureのロード時(raw=True)は、ロード後にrebuild_user_mountain_statsコマンドで作成する
+    """
+    if not raw:
+        user_id = Activity.objects.filter(id=instance.activity_id).values_list("user_id", flat=True).first()
+        mountain_ids = {instance.mountain_id, getattr(instance, "_previous_mountain_id", None)} - {None}
+        refresh_user_mountain_stats(user_id, list(mountain_ids))
+
+
+@receiver(post_delete, sender=ActivityMountain)
+def refresh_mountain_stats_on_climb_delete(sender, instance, origin, **kwargs):
+    """活動で登頂した山の削除時(活動の削除に伴う削除を含む)に、山の集計データを再集計する
+
+    ユーザーや山情報の削除に伴うカスケード削除の場合は、集計データも削除されるため再集計しない
+    """
+    if not is_deleted_with(origin, User, MountainMaster):
+        user_id = Activity.objects.filter(id=instance.activity_id).values_list("user_id", flat=True).first()
+        refresh_user_mountain_stats(user_id, [instance.mountain_id])
+
+
+def refresh_mountain_stats_of_climbers(mountain_id):
+    """山を登頂した全てのユーザーの、山の集計データを再集計してレスポンスデータのキャッシュを無効化する
+
+    Args:
+        mountain_id (int): 山情報ID
+    """
+    user_ids = UserMountainStats.objects.filter(mountain_id=mountain_id).values_list("user_id", flat=True)
+    for user_id in list(user_ids):
+        refresh_user_mountain_stats(user_id, [mountain_id])
+        invalidate_user_cache(user_id)
+
+
+@receiver(post_save, sender=MountainMaster)
+def refresh_mountain_stats_on_mountain_save(sender, instance, raw, **kwargs):
+    """山情報の更新時に、山を登頂したユーザーの山の集計データ(名称、標高)を再集計する"""
+    if not raw:
+        refresh_mountain_stats_of_climbers(instance.id)
+
+
+@receiver([post_save, post_delete], sender=MountainPrefecture)
+def refresh_mountain_stats_on_mountain_prefecture_change(sender, instance, raw=False, origin=None, **kwargs):
+    """山の都道府県の更新時に、山を登頂したユーザーの山の集計データ(都道府県名)を再集計する
+
+    山情報の削除に伴うカスケード削除の場合は、集計データも削除されるため再集計しない
+    """
+    if not raw and not (origin is not None and is_deleted_with(origin, MountainMaster)):
+        refresh_mountain_stats_of_climbers(instance.mountain_id)
+
+
+@receiver(post_save, sender=PrefectureMaster)
+def refresh_mountain_stats_on_prefecture_save(sender, instance, created, raw, **kwargs):
+    """都道府県の更新時に、都道府県の山を登頂したユーザーの山の集計データ(都道府県名)を再集計する
+
+    登録時は都道府県の山がないため再集計しない。削除時は山の都道府県のカスケード削除で再集計する
+    """
+    if not created and not raw:
+        mountain_ids = MountainPrefecture.objects.filter(prefecture=instance).values_list("mountain_id", flat=True)
+        for mountain_id in sorted(set(mountain_ids)):
+            refresh_mountain_stats_of_climbers(mountain_id)
+
+
+@receiver(pre_save, sender=ActivityPhotos)
+def remember_previous_domo_points(sender, instance, raw, **kwargs):
+    """活動写真の更新前に、変更前のユーザーIDとDOMOポイントを保持する"""
+    instance._previous_domo_points = None
+    if not raw and instance.pk is not None:
+        instance._previous_domo_points = (
+            ActivityPhotos.objects.filter(pk=instance.pk).values_list("user_id", "domo_points").first()
+        )
+
+
+@receiver(post_save, sender=ActivityPhotos)
+def adjust_domo_points_on_photo_save(sender, instance, raw, **kwargs):
+    """活動写真の登録・更新時に、変更前後の差分をユーザーの契約情報のDOMOポイントに反映する
+
+    fixtureのロード時(raw=True)は、ロード後にupdate_domo_pointコマンドで照合する
+    """
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_domo_points", None)
+    if previous is None:
+        adjust_contract_domo_points(instance.user_id, instance.domo_points)
+    elif previous[0] == instance.user_id:
+        adjust_contract_domo_points(instance.user_id, instance.domo_points - previous[1])
+    else:
+        adjust_contract_domo_points(previous[0], -previous[1])
+        adjust_contract_domo_points(instance.user_id, instance.domo_points)
+
+
+@receiver(post_delete, sender=ActivityPhotos)
+def adjust_domo_points_on_photo_delete(sender, instance, origin, **kwargs):
+    """活動写真の削除時(活動の削除に伴う削除を含む)に、ユーザーの契約情報のDOMOポイントから減算する
+
+    ユーザーの削除に伴うカスケード削除の場合は、契約情報も削除されるため減算しない
+    """
+    if not is_deleted_with(origin, User):
+        adjust_contract_domo_points(instance.user_id, -instance.domo_points)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def notify_token_blacklisted(sender, instance, created, **kwargs):
+    """リフレッシュトークンのブラックリストへの登録時に、全てのプロセスのブラックリストのフィルタに追加する"""
+    if created:
+        jti_blacklist.added(instance.token.jti)
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def notify_token_unblacklisted(sender, instance, **kwargs):
+    """リフレッシュトークンのブラックリストからの削除時に、全てのプロセスのブラックリストのフィルタを作成し直す"""
+    jti_blacklist.removed()
+
+
+def invalidate_master_registry(sender, **kwargs):
+    """マスタデータの更新時に、全てのプロセスのマスタデータのレジストリを読み込み直す
+
+    マスタデータのバージョンは全てのレスポンスデータのキャッシュキーとETagに含まれるため、
+    バージョンの更新により全てのユーザーと活動のキャッシュも無効化される
+    """
+    master_registry.invalidate()
+
+
+for master_model in MASTER_MODELS:
+    post_save.connect(invalidate_master_registry, sender=master_model)
+    post_delete.connect(invalidate_master_registry, sender=master_model)
@@ -0,0 +1,288 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from jwt import InvalidTokenError
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+# 署名鍵に使用できる非対称鍵の署名アルゴリズム
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+
+
+def generate_private_key(algorithm):
+    """署名アルゴリズムの秘密鍵を作成する
+
+    Args:
+        algorithm (str): 署名アルゴリズム(RS256、EdDSA)
+
+    Returns:
+        str: PEM形式(PKCS#8)の秘密鍵
+
+    Raises:
+        ValueError: 非対応の署名アルゴリズムの場合
+    """
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unsupported signing algorithm '{algorithm}'")
+
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+class SigningKey:
+    """kidで識別する1つの署名鍵(読み込み済みの秘密鍵と公開鍵)
+
+    Attributes:
+        kid (str): 鍵ID(トークンのヘッダのkid)
+        private_key (object): 署名に使用する秘密鍵
+        public_key (object): 検証に使用する公開鍵
+        jwk (dict): 公開鍵のJWK
+    """
+
+    __slots__ = ("kid", "private_key", "public_key", "jwk")
+
+    def __init__(self, kid, algorithm, private_key_pem):
+        """PEM形式の秘密鍵を読み込み、公開鍵とJWKを作成する
+
+        Args:
+            kid (str): 鍵ID
+            algorithm (str): 署名アルゴリズム(RS256、EdDSA)
+            private_key_pem (str): PEM形式の秘密鍵
+        """
+        jwk_algorithm = get_default_algorithms()[algorithm]
+        self.kid = kid
+        self.private_key = jwk_algorithm.prepare_key(private_key_pem)
+        self.public_key = self.private_key.public_key()
+        self.jwk = {
+            **json.loads(jwk_algorithm.to_jwk(self.public_key)),
+            "kid": kid,
+            "alg": algorithm,
+            "use": "sig",
+        }
+
+
+class SigningKeySet:
+    """JWT_SIGNING_KEYSの設定の署名鍵と、検証済みのトークンのLRUを保持するクラス
+
+    ACTIVE_KIDの鍵でトークンに署名し、KEYSの全ての鍵で検証する。鍵のローテーションは、
+    新しい鍵をKEYSに追加(JWKSで公開)してからACTIVE_KIDを切り替え、旧鍵はリフレッシュトークンの
+    有効期限が過ぎてから削除する。KEYSが空の場合はSIMPLE_JWTのALGORITHM(HS256)で署名する
+
+    Attributes:
+        algorithm (str): 非対称鍵の署名アルゴリズム
+        keys (dict): kidと署名鍵(SigningKey)の辞書
+        active (SigningKey): 署名に使用する鍵(非対称鍵を使用しない場合はNone)
+        accept_hs256 (bool): kidのないHS256のトークンを検証するかどうか
+    """
+
+    def __init__(self, options):
+        """設定から署名鍵を読み込む
+
+        Args:
+            options (dict): JWT_SIGNING_KEYSの設定
+
+        Raises:
+            ImproperlyConfigured: アルゴリズムが非対応、またはACTIVE_KIDの鍵がKEYSに存在しない場合
+        """
+        self.algorithm = options["ALGORITHM"]
+        if options["KEYS"] and self.algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ImproperlyConfigured(f"Unsupported signing algorithm '{self.algorithm}'")
+
+        self.keys = {kid: SigningKey(kid, self.algorithm, pem) for kid, pem in options["KEYS"].items()}
+        if self.keys and options["ACTIVE_KID"] not in self.keys:
+            raise ImproperlyConfigured(f"Active signing key '{options['ACTIVE_KID']}' is not in KEYS")
+
+        self.active = self.keys.get(options["ACTIVE_KID"])
+        self.accept_hs256 = self.active is None or options["ACCEPT_HS256"]
+        self.max_age = options["JWKS_MAX_AGE"]
+        self.verify_cache_size = options["VERIFY_CACHE_SIZE"]
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    def jwks(self):
+        """全ての署名鍵の公開鍵をJWKSの形式で取得する
+
+        Returns:
+            dict: 公開鍵のJWKのリスト(keys)
+        """
+        return {"keys": [key.jwk for key in self.keys.values()]}
+
+    def get_verified(self, token, leeway):
+        """検証済みのトークンのペイロードを取得する(有効期限切れの場合は取得しない)
+
+        Args:
+            token (str): トークン
+            leeway (float): 有効期限の許容範囲(秒)
+
+        Returns:
+            dict: ペイロードの複製。検証済みでない場合、または有効期限切れの場合はNone
+        """
+        with self._lock:
+            payload = self._verified.get(token)
+            if payload is None:
+                return None
+            if "exp" in payload and payload["exp"] + leeway <= time.time():
+                del self._verified[token]
+                return None
+            self._verified.move_to_end(token)
+        return dict(payload)
+
+    def set_verified(self, token, payload):
+        """検証済みのトークンのペイロードを保持する
+
+        Args:
+            token (str): トークン
+            payload (dict): 検証済みのペイロード
+        """
+        if self.verify_cache_size <= 0:
+            return
+        with self._lock:
+            self._verified[token] = dict(payload)
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.verify_cache_size:
+                self._verified.popitem(last=False)
+
+
+class SigningKeys:
+    """現在の設定の署名鍵を取得する関数(設定の変更後は読み込み直す)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cached = (None, None)
+
+    def __call__(self):
+        options = settings.JWT_SIGNING_KEYS
+        cached_options, key_set = self._cached
+        if cached_options is not options:
+            with self._lock:
+                cached_options, key_set = self._cached
+                if cached_options is not options:
+                    key_set = SigningKeySet(options)
+                    self._cached = (options, key_set)
+        return key_set
+
+
+signing_keys = SigningKeys()
+
+
+class KeySetTokenBackend(TokenBackend):
+    """署名鍵のkidでトークンの署名・検証を行うトークンバックエンド
+
+    署名時はヘッダにkidを設定し、検証時はヘッダのkidの公開鍵で検証する。
+    検証済みのトークンはSigningKeySetのLRUで保持し、同じトークンの署名の検証を省略する
+    (有効期限は取得の度に確認し、ブラックリストの確認はトークンクラスで行う)
+    """
+
+    def __init__(self):
+        super().__init__(
+            api_settings.ALGORITHM,
+            api_settings.SIGNING_KEY,
+            api_settings.VERIFYING_KEY,
+            api_settings.AUDIENCE,
+            api_settings.ISSUER,
+            None,
+            api_settings.LEEWAY,
+            api_settings.JSON_ENCODER,
+        )
+
+    def encode(self, payload):
+        """ペイロードを有効な署名鍵で署名したトークンを作成する
+
+        Args:
+            payload (dict): ペイロード
+
+        Returns:
+            str: トークン
+        """
+        key_set = signing_keys()
+        if key_set.active is None:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            key_set.active.private_key,
+            algorithm=key_set.algorithm,
+            headers={"kid": key_set.active.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        """トークンを検証し、ペイロードを取得する
+
+        Args:
+            token (str): トークン
+            verify (bool): 署名を検証するかどうか
+
+        Returns:
+            dict: ペイロード
+
+        Raises:
+            TokenBackendError: トークンが不正、署名鍵が存在しない、または有効期限切れの場合
+        """
+        if not verify:
+            return super().decode(token, verify=False)
+
+        key_set = signing_keys()
+        leeway = self.get_leeway().total_seconds()
+        payload = key_set.get_verified(token, leeway)
+        if payload is not None:
+            return payload
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+        if kid is None:
+            # kidのないトークンはSIMPLE_JWTの設定(HS256)で検証する
+            if not key_set.accept_hs256:
+                raise TokenBackendError(_("Token is invalid or expired"))
+            payload = super().decode(token)
+        else:
+            key = key_set.keys.get(kid)
+            if key is None:
+                raise TokenBackendError(_("Token is invalid or expired"))
+            try:
+                payload = jwt.decode(
+                    token,
+                    key.public_key,
+                    algorithms=[key_set.algorithm],
+                    audience=self.audience,
+                    issuer=self.issuer,
+                    leeway=leeway,
+                    options={"verify_aud": self.audience is not None},
+                )
+            except InvalidTokenError as ex:
+                raise TokenBackendError(_("Token is invalid or expired")) from ex
+
+        key_set.set_verified(token, payload)
+        return payload
+
+
+token_backend = KeySetTokenBackend()
+
+
+class SignedAccessToken(AccessToken):
+    """署名鍵のkidで署名・検証するアクセストークン"""
+
+    _token_backend = token_backend
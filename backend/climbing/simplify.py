@@ -0,0 +1,164 @@
+import math
+import numpy as np
+
+# 地球の半径(m)
+EARTH_RADIUS = 6378137.0
+
+# Webメルカトルのズームレベル0での赤道上の1ピクセルあたりの距離(m)
+METERS_PER_PIXEL_AT_ZOOM_0 = 2 * math.pi * EARTH_RADIUS / 256
+
+
+def project_to_meters(longitudes, latitudes):
+    """経度・緯度を、ルートの中心の緯度を基準とした平面座標(m)に変換する
+
+    登山のルートの範囲では、正距円筒図法による近似で誤差は十分に小さい
+
+    Args:
+        longitudes (ndarray): 経度の配列
+        latitudes (ndarray): 緯度の配列
+
+    Returns:
+        ndarray: (点の数, 2)の平面座標(m)の配列
+    """
+    scale = math.radians(1) * EARTH_RADIUS
+    x = longitudes * scale * math.cos(math.radians(float(latitudes.mean())))
+    y = latitudes * scale
+    return np.column_stack([x, y])
+
+
+def segment_distances(points, start, end):
+    """区間の始点・終点を結ぶ線分と、区間内の各点との距離を計算する
+
+    Args:
+        points (ndarray): (点の数, 2)の平面座標の配列
+        start (int): 区間の始点のインデックス
+        end (int): 区間の終点のインデックス
+
+    Returns:
+        ndarray: 区間内(始点・終点を除く)の各点と線分との距離の配列
+    """
+    inner = points[start + 1 : end]
+    origin = points[start]
+    direction = points[end] - origin
+    length_squared = float(direction @ direction)
+
+    # 始点と終点が同じ位置の場合は、始点からの距離とする
+    if length_squared == 0:
+        return np.hypot(*(inner - origin).T)
+
+    ratio = np.clip((inner - origin) @ direction / length_squared, 0, 1)
+    return np.hypot(*(inner - origin - ratio[:, None] * direction).T)
+
+
+def douglas_peucker_significance(points):
+    """Douglas-Peucker法で各点が残る許容誤差の上限を計算する
+
+    ある点は、その点と祖先の区間の分割点の距離が全て許容誤差を超える場合に残るため、
+    分割時の距離と親の区間の値の小さい方を各点の値とする。
+    値が許容誤差より大きい点を残すことで、1回の計算で任意の許容誤差の簡略化結果が得られる
+
+    Args:
+        points (ndarray): (点の数, 2)の平面座標の配列
+
+    Returns:
+        ndarray: 各点が残る許容誤差の上限の配列(始点・終点は無限大)
+    """
+    count = len(points)
+    significance = np.zeros(count)
+    significance[[0, -1]] = np.inf
+
+    # (区間の始点, 区間の終点, 親の区間の値)のスタックで再帰を使わずに処理する
+    stack = [(0, count - 1, np.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+
+        distances = segment_distances(points, start, end)
+        index = int(distances.argmax())
+        split = start + 1 + index
+        value = min(float(distances[index]), parent)
+        significance[split] = value
+
+        stack.append((start, split, value))
+        stack.append((split, end, value))
+
+    return significance
+
+
+def simplify_levels(longitudes, latitudes, tolerances):
+    """複数の許容誤差(m)でルートを簡略化し、各許容誤差で残す点のインデックスを取得する
+
+    Args:
+        longitudes (list[float]): 経度のリスト
+        latitudes (list[float]): 緯度のリスト
+        tolerances (list[float]): 許容誤差(m)のリスト
+
+    Returns:
+        list[ndarray]: 許容誤差毎の、残す点のインデックスの配列
+    """
+    if len(longitudes) < 3:
+        return [np.arange(len(longitudes)) for _ in tolerances]
+
+    points = project_to_meters(np.asarray(longitudes, dtype=float), np.asarray(latitudes, dtype=float))
+    significance = douglas_peucker_significance(points)
+    return [np.flatnonzero(significance > tolerance) for tolerance in tolerances]
+
+
+def meters_per_pixel(zoom, latitude):
+    """Webメルカトルの地図のズームレベルでの1ピクセルあたりの距離(m)を計算する
+
+    Args:
+        zoom (float): ズームレベル
+        latitude (float): 緯度
+
+    Returns:
+        float: 1ピクセルあたりの距離(m)
+    """
+    return METERS_PER_PIXEL_AT_ZOOM_0 * math.cos(math.radians(latitude)) / 2**zoom
+
+
+def largest_triangle_three_buckets(x, y, threshold):
+    """Largest-Triangle-Three-Buckets法で、グラフの形状を保つように点を間引く
+
+    始点と終点を除く点を等間隔のバケットに分け、各バケットから、直前に選択した点と
+    次のバケットの平均点とで作る三角形の面積が最大となる点を選択する。
+    バケットの平均点はまとめて計算し、バケット内の面積の計算はNumPyで一括して行う
+
+    Args:
+        x (ndarray): x軸の値の配列(昇順)
+        y (ndarray): y軸の値の配列
+        threshold (int): 間引いた後の点の数
+
+    Returns:
+        ndarray: 選択した点のインデックスの配列
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # 始点と終点を除く点を、threshold - 2個のバケットに分割
+    edges = np.linspace(1, count - 1, threshold - 1).astype(int)
+    sizes = np.diff(edges)
+    average_x = np.add.reduceat(x[: count - 1], edges[:-1]) / sizes
+    average_y = np.add.reduceat(y[: count - 1], edges[:-1]) / sizes
+
+    # 最後のバケットの次は終点とする
+    next_x = np.append(average_x[1:], x[-1])
+    next_y = np.append(average_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
@@ -0,0 +1,287 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import CharField, F, IntegerField, Max, Min, OuterRef, Prefetch, Subquery, Sum, Count, Value
+from django.db.models.functions import Coalesce
+from .models import (
+    Activity,
+    ActivityArea,
+    ActivityMountain,
+    ActivityPhotos,
+    ActivityPrefecture,
+    ActivitySummary,
+    ActivityTag,
+    AreaMaster,
+    MountainMaster,
+    MountainPrefecture,
+    PrefectureMaster,
+    TagMaster,
+    UserMountainStats,
+)
+
+# 活動の集計データに名称を保持するマスタデータと、(活動との関連テーブル, マスタデータのフィールド名)の対応
+SUMMARY_NAME_MASTERS = {
+    PrefectureMaster: (ActivityPrefecture, "prefecture"),
+    AreaMaster: (ActivityArea, "area"),
+    TagMaster: (ActivityTag, "tag"),
+    MountainMaster: (ActivityMountain, "mountain"),
+}
+
+
+def _photo_aggregate(expression):
+    """活動ID毎の写真の集計値を返すサブクエリを作成する
+
+    Args:
+        expression (Aggregate): 集計式
+
+    Returns:
+        Subquery: 活動ID毎の集計値のサブクエリ
+    """
+    # デフォルトの並び順(id)がGROUP BYに含まれないよう、order_by()で解除する
+    return Subquery(
+        ActivityPhotos.objects.filter(activity=OuterRef("pk"))
+        .order_by()
+        .values("activity")
+        .annotate(value=expression)
+        .values("value"),
+        output_field=IntegerField(),
+    )
+
+
+def _cover_photo(field_name):
+    """活動のカバー写真の指定フィールドを返すサブクエリを作成する
+
+    Args:
+        field_name (str): 取得するActivityPhotosのフィールド名
+
+    Returns:
+        Subquery: カバー写真のフィールド値のサブクエリ
+    """
+    return Subquery(
+        ActivityPhotos.objects.filter(activity=OuterRef("pk"), is_cover_photo=True)
+        .order_by("id")
+        .values(field_name)[:1]
+    )
+
+
+def get_activity_names(**activity_filter):
+    """活動ID毎の都道府県名、エリア名、タグ名、登頂した山の名称を1クエリで取得する
+
+    4つの関連テーブルをUNION ALLでまとめて取得し、活動ID毎に名称を整理する
+
+    Args:
+        **activity_filter: 対象の活動を絞り込む条件(例: user_id=1, is_public=True)
+
+    Returns:
+        defaultdict: 活動IDをキーとし、"prefectures"、"areas"、"tags"、"mountains"の名称リストを値とする辞書
+    """
+    activity_filter = {f"activity__{key}": value for key, value in activity_filter.items()}
+
+    def names(model, relation, kind):
+        return (
+            model.objects.filter(**activity_filter)
+            .order_by()
+            .annotate(
+                name_activity_id=F("activity_id"),
+                name_kind=Value(kind, output_field=CharField()),
+                name_value=F(f"{relation}__name"),
+                name_order=F("id"),
+            )
+            .values_list("name_activity_id", "name_kind", "name_value", "name_order")
+        )
+
+    rows = (
+        names(ActivityPrefecture, "prefecture", "prefectures")
+        .union(names(ActivityArea, "area", "areas"), all=True)
+        .union(names(ActivityTag, "tag", "tags"), all=True)
+        .union(names(ActivityMountain, "mountain", "mountains"), all=True)
+    )
+
+    # 登録順(関連テーブルのID順)に名称を整理
+    result = defaultdict(lambda: {"prefectures": [], "areas": [], "tags": [], "mountains": []})
+    for activity_id, kind, name, _ in sorted(rows, key=lambda row: row[3]):
+        result[activity_id][kind].append(name)
+
+    return result
+
+
+def build_activity_summaries(activity_ids):
+    """活動の集計データを作成する
+
+    活動写真の集計値とカバー写真の情報を1クエリ、名称を1クエリで取得する
+
+    Args:
+        activity_ids (list[int]): 活動IDのリスト
+
+    Returns:
+        list[ActivitySummary]: 保存前の活動の集計データのリスト
+    """
+    aggregates = (
+        Activity.objects.filter(id__in=activity_ids)
+        .order_by()
+        .annotate(
+            total_domo_points=Coalesce(_photo_aggregate(Sum("domo_points")), 0),
+            total_photos=Coalesce(_photo_aggregate(Count("id")), 0),
+            cover_photo_seq_no=_cover_photo("seq_no"),
+            cover_photo_timestamp=_cover_photo("timestamp"),
+            cover_photo_aspect_ratio=_cover_photo("aspect_ratio"),
+        )
+        .values(
+            "id",
+            "total_domo_points",
+            "total_photos",
+            "cover_photo_seq_no",
+            "cover_photo_timestamp",
+            "cover_photo_aspect_ratio",
+        )
+    )
+    names = get_activity_names(id__in=activity_ids)
+
+    summaries = []
+    for aggregate in aggregates:
+        activity_id = aggregate.pop("id")
+        activity_names = names[activity_id]
+        summaries.append(
+            ActivitySummary(
+                activity_id=activity_id,
+                **aggregate,
+                prefecture_names=activity_names["prefectures"],
+                area_names=activity_names["areas"],
+                tag_names=activity_names["tags"],
+                mountain_names=activity_names["mountains"],
+            )
+        )
+
+    return summaries
+
+
+def refresh_activity_summaries(activity_ids):
+    """活動の集計データを再集計して保存する
+
+    Args:
+        activity_ids (list[int]): 活動IDのリスト
+
+    Returns:
+        int: 保存した集計データの件数
+    """
+    summaries = build_activity_summaries(activity_ids)
+
+    with transaction.atomic():
+        ActivitySummary.objects.filter(activity_id__in=activity_ids).delete()
+        ActivitySummary.objects.bulk_create(summaries)
+
+    return len(summaries)
+
+
+def refresh_summaries_of_master(model, master_id, batch_size=1000):
+    """マスタデータを参照する全ての活動の集計データ(名称)を、batch_size件ずつ再集計して保存する
+
+    Args:
+        model (type): SUMMARY_NAME_MASTERSのマスタデータのモデルクラス
+        master_id (int): マスタデータのID
+        batch_size (int): 1回に再集計する活動の件数
+
+    Returns:
+        list[int]: 再集計した活動IDのリスト
+    """
+    relation_model, field_name = SUMMARY_NAME_MASTERS[model]
+    activity_ids = sorted(
+        set(relation_model.objects.filter(**{f"{field_name}_id": master_id}).values_list("activity_id", flat=True))
+    )
+    for start in range(0, len(activity_ids), batch_size):
+        refresh_activity_summaries(activity_ids[start : start + batch_size])
+
+    return activity_ids
+
+
+def get_summary(activity):
+    """活動の集計データを取得する
+
+    集計データが未作成の場合は、空の集計データを返す
+
+    Args:
+        activity (Activity): summaryをselect_relatedした活動
+
+    Returns:
+        ActivitySummary: 活動の集計データ
+    """
+    try:
+        return activity.summary
+    except ActivitySummary.DoesNotExist:
+        return ActivitySummary(activity=activity)
+
+
+def build_user_mountain_stats(user_id, mountain_ids=None):
+    """ユーザーの登頂した山毎の集計データを作成する
+
+    公開対象の活動で登頂した山毎の集計値を1クエリ、山情報と山の都道府県を2クエリで取得する
+
+    Args:
+        user_id (int): ユーザーID
+        mountain_ids (list[int], optional): 集計する山情報IDのリスト。指定しない場合は全ての山
+
+    Returns:
+        list[UserMountainStats]: 保存前のユーザーの登頂した山毎の集計データのリスト
+    """
+    climbs = ActivityMountain.objects.filter(activity__user_id=user_id, activity__is_public=True)
+    if mountain_ids is not None:
+        climbs = climbs.filter(mountain_id__in=mountain_ids)
+
+    aggregates = list(
+        climbs.order_by()
+        .values("mountain_id")
+        .annotate(
+            climb_count=Count("id"),
+            first_climbed_at=Min("activity__start_at"),
+            last_climbed_at=Max("activity__start_at"),
+            total_ascent=Coalesce(Sum("activity__ascent_distance"), 0),
+        )
+    )
+
+    mountains = MountainMaster.objects.prefetch_related(
+        Prefetch("mountain_prefecture", queryset=MountainPrefecture.objects.select_related("prefecture"))
+    ).in_bulk([aggregate["mountain_id"] for aggregate in aggregates])
+
+    stats = []
+    for aggregate in aggregates:
+        mountain = mountains[aggregate["mountain_id"]]
+        prefectures = [mountain_prefecture.prefecture for mountain_prefecture in mountain.mountain_prefecture.all()]
+        stats.append(
+            UserMountainStats(
+                user_id=user_id,
+                **aggregate,
+                mountain_name=mountain.name,
+                mountain_name_ruby=mountain.name_ruby,
+                elevation=mountain.elevation,
+                prefecture_names=[prefecture.name for prefecture in prefectures],
+                prefecture_names_ruby=[prefecture.name_ruby for prefecture in prefectures],
+            )
+        )
+
+    return stats
+
+
+def refresh_user_mountain_stats(user_id, mountain_ids=None):
+    """ユーザーの登頂した山毎の集計データを再集計して保存する
+
+    登頂した活動がなくなった山の集計データは削除する
+
+    Args:
+        user_id (int): ユーザーID
+        mountain_ids (list[int], optional): 再集計する山情報IDのリスト。指定しない場合は全ての山
+
+    Returns:
+        int: 保存した集計データの件数
+    """
+    if mountain_ids is not None and not mountain_ids:
+        return 0
+
+    stats = build_user_mountain_stats(user_id, mountain_ids)
+
+    with transaction.atomic():
+        existing = UserMountainStats.objects.filter(user_id=user_id)
+        if mountain_ids is not None:
+            existing = existing.filter(mountain_id__in=mountain_ids)
+        existing.delete()
+        UserMountainStats.objects.bulk_create(stats)
+
+    return len(stats)
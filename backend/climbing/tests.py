@@ -1,34 +1,137 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.cache.backends.base import memcache_key_warnings
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.exceptions import AuthenticationFailed
 from django.urls import reverse
 from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from django.contrib.auth.hashers import make_password
 from types import SimpleNamespace
+from io import StringIO
+from .models import (
+    User,
+    Activity,
+    ActivitySummary,
+    UserMountainStats,
+    MountainMaster,
+    CourseConstantLevelMaster,
+    AvgPaceLevelMaster,
+    ActivityTag,
+    ActivityArea,
+    ActivityPrefecture,
+    ActivityPhotos,
+    ActivityMountain,
+    Contract,
+    TagMaster,
+    PrefectureMaster,
+)
+from .cache import response_cache
+from .masters import MASTER_MODELS, master_registry
+from .levels import ACTIVITY_LEVEL_FIELDS, update_reclassified_activities
+from .authentication import TOKEN_USER_FIELDS, CookieJWTAuthentication, get_user_cache_key
+from .serializers import AuthTokenObtainPairSerializer
+from .blacklist import BloomFilter, JtiBlacklist, jti_blacklist
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from .hashing import (
+    PasswordHashBusy,
+    PasswordHashExecutor,
+    check_shared_limit,
+    check_user_password,
+    password_hash_executor,
+)
+from .signing import generate_private_key
+from .domo import add_domo_points, apply_domo_point_drift, find_domo_point_drift
+from .serializers import ActivitySerializer, ActivitySummarySerializer, CompiledActivitySerializer
+from .summaries import get_summary
+from rest_framework.renderers import JSONRenderer
+from .renderers import FastJSONRenderer
+from decimal import Decimal
+from datetime import datetime, timedelta
+import jwt
+import msgpack
 import json
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock
+
+FIXTURES = [
+    "test/gender_master.json",
+    "test/prefecture_master.json",
+    "test/plan_master.json",
+    "test/tag_master.json",
+    "test/area_master.json",
+    "test/avg_pace_level_master.json",
+    "test/course_constant_level_master.json",
+    "test/mountain_master.json",
+    "test/mountain_prefecture.json",
+    "test/user.json",
+    "test/user_activity_prefecture.json",
+    "test/contract.json",
+    "test/activity.json",
+    "test/activity_tag.json",
+    "test/activity_prefecture.json",
+    "test/activity_area.json",
+    "test/activity_photo.json",
+    "test/activity_mountain.json",
+]
+
+# テスト間でキャッシュを共有しないよう、テストではプロセス内のキャッシュを使用する
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=TEST_CACHES, MASTER_REGISTRY={"CHECK_INTERVAL": 0})
+class ClimbingTestCase(TestCase):
+    """fixtureをロードし、活動の集計データを作成するテストの基底クラス"""
+
+    fixtures = FIXTURES
+
+    @classmethod
+    def setUpTestData(cls):
+        # fixtureのロード(raw=True)ではシグナルで集計しないため、ロード後に集計データを作成
+        call_command("rebuild_activity_summaries", stdout=StringIO())
+        call_command("rebuild_user_mountain_stats", stdout=StringIO())
+        call_command("update_domo_point", stdout=StringIO())
 
+    def setUp(self):
+        cache.clear()
+
+        # テスト毎にマスタデータのレジストリを読み込み直し、クエリ数の確認に含めない
+        master_registry.tables()
+
+
+def duplicate_activities(user):
+    """ユーザーの活動情報を関連データごと複製し、活動数を2倍にする"""
 
-class UserAuthenticationTest(TestCase):
-    fixtures = [
-        "test/gender_master.json",
-        "test/prefecture_master.json",
-        "test/plan_master.json",
-        "test/tag_master.json",
-        "test/area_master.json",
-        "test/avg_pace_level_master.json",
-        "test/course_constant_level_master.json",
-        "test/mountain_master.json",
-        "test/mountain_prefecture.json",
-        "test/user.json",
-        "test/user_activity_prefecture.json",
-        "test/contract.json",
-        "test/activity.json",
-        "test/activity_tag.json",
-        "test/activity_prefecture.json",
-        "test/activity_area.json",
-        "test/activity_photo.json",
-        "test/activity_mountain.json",
-    ]
+    for activity in Activity.objects.filter(user=user):
+        tags = list(ActivityTag.objects.filter(activity=activity))
+        areas = list(ActivityArea.objects.filter(activity=activity))
+        prefectures = list(ActivityPrefecture.objects.filter(activity=activity))
+        photos = list(ActivityPhotos.objects.filter(activity=activity))
 
+        activity.pk = None
+        activity.save()
+
+        for related in [*tags, *areas, *prefectures, *photos]:
+            related.pk = None
+            related.activity = activity
+            related.save()
+
+
+class UserAuthenticationTest(ClimbingTestCase):
     def setUp(self):
+        super().setUp()
+
         # テスト用クライアントのセットアップ
         self.client = APIClient()
         self.valid_user_data = {
@@ -469,7 +572,7 @@ class UserAuthenticationTest(TestCase):
             "name": "テスト太郎",
             "birth_year": 1982,
             "is_paid": True,
-            "domo_points": 0,
+            "domo_points": 419,
         }
 
         with self.subTest("チェック2"):
@@ -580,3 +683,2267 @@ class UserAuthenticationTest(TestCase):
         with self.subTest("チェック1"):
             # ステータスコード401を確認
             self.assertEqual(activity_achievement_result.status_code, 401)
+
+
+class ActivityListQueryCountTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-list", kwargs={"user_id": self.user.id})
+
+    def get_activity_list(self):
+        """登山の活動リストを取得し、レスポンスと発行されたSELECTクエリ数を返す"""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+
+        selects = [query for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        return response, len(selects)
+
+    def test_query_count_is_constant(self):
+        """活動数が増えても登山の活動リストの取得クエリ数が一定であることを確認"""
+
+        response_before, queries_before = self.get_activity_list()
+
+        duplicate_activities(self.user)
+        duplicate_activities(self.user)
+
+        response_after, queries_after = self.get_activity_list()
+
+        with self.subTest("チェック1"):
+            # ステータスコード200を確認
+            self.assertEqual(response_before.status_code, 200)
+            self.assertEqual(response_after.status_code, 200)
+
+        with self.subTest("チェック2"):
+            # 活動数が4倍になっていることを確認
+            self.assertEqual(len(response_after.json()), len(response_before.json()) * 4)
+
+        with self.subTest("チェック3"):
+            # 活動数に関わらずクエリ数が一定であることを確認
+            self.assertEqual(queries_before, queries_after)
+
+        with self.subTest("チェック4"):
+            # 活動情報と活動の集計データを1クエリで取得していることを確認
+            self.assertEqual(queries_after, 1)
+
+    def test_merge_by_activity_id(self):
+        """複製した活動に、複製元と同じ集計値、カバー写真、名称が結合されていることを確認"""
+
+        duplicate_activities(self.user)
+
+        response, _ = self.get_activity_list()
+        activities = {item["activity_id"]: item for item in response.json()}
+
+        with self.subTest("チェック1"):
+            # 複製後の活動に複製元の名称と集計値が結合されていることを確認
+            original = activities["0001"]
+            duplicated = activities["0028"]
+            for key in ["total_domo_points", "total_photos", "aspect_ratio", "prefectures", "areas", "tags"]:
+                self.assertEqual(original[key], duplicated[key])
+
+        with self.subTest("チェック2"):
+            # カバー写真のファイル名が活動IDに対応していることを確認
+            self.assertEqual(duplicated["cover_photo_name"], "photo_0028_01_1722765280.webp")
+
+    def test_activity_list_for_unknown_user(self):
+        """存在しないユーザーの登山の活動リストが404となることを確認"""
+
+        response = self.client.get(reverse("activity-list", kwargs={"user_id": 9999}))
+
+        with self.subTest("チェック1"):
+            # ステータスコード404を確認
+            self.assertEqual(response.status_code, 404)
+
+
+class ActivityListPaginationTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-list", kwargs={"user_id": self.user.id})
+
+    def test_walk_all_pages(self):
+        """カーソルを辿って取得した全ページが、ページネーションなしの活動リストと一致することを確認"""
+
+        full_list = self.client.get(self.url).json()
+
+        pages = []
+        params = {"limit": 10}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages.append(page)
+            if page["next_cursor"] is None:
+                break
+            params = {"limit": 10, "cursor": page["next_cursor"]}
+
+        with self.subTest("チェック1"):
+            # 27件が10件ずつ3ページに分割されていることを確認
+            self.assertEqual([len(page["results"]) for page in pages], [10, 10, 7])
+
+        with self.subTest("チェック2"):
+            # 全ページの結合結果がページネーションなしの活動リストと一致することを確認
+            self.assertEqual([item for page in pages for item in page["results"]], full_list)
+
+    def test_first_page_query_count_is_constant(self):
+        """活動数が増えても1ページ目の取得クエリ数が一定であることを確認"""
+
+        with CaptureQueriesContext(connection) as context_before:
+            self.client.get(self.url, {"limit": 5})
+
+        duplicate_activities(self.user)
+
+        with CaptureQueriesContext(connection) as context_after:
+            response = self.client.get(self.url, {"limit": 5})
+
+        with self.subTest("チェック1"):
+            # 1ページ目の件数を確認
+            self.assertEqual(len(response.json()["results"]), 5)
+
+        with self.subTest("チェック2"):
+            # 活動数に関わらずクエリ数が一定であることを確認
+            self.assertEqual(len(context_before.captured_queries), len(context_after.captured_queries))
+
+    def test_invalid_parameters(self):
+        """不正なlimitやcursorを指定した場合に400となることを確認"""
+
+        for index, params in enumerate([{"limit": 0}, {"limit": 1000}, {"limit": "a"}, {"cursor": "invalid"}]):
+            with self.subTest(f"チェック{index + 1}"):
+                # ステータスコード400を確認
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class ActivityListFilterTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-list", kwargs={"user_id": self.user.id})
+        self.full_list = self.client.get(self.url).json()
+
+    def assert_filtered(self, params, predicate):
+        """絞り込み結果が、全件の活動リストを条件で絞り込んだ結果と一致することを確認する"""
+
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+
+        expected = [activity for activity in self.full_list if predicate(activity)]
+        self.assertTrue(expected)
+        self.assertEqual(response.json(), expected)
+
+    def test_filter_by_names(self):
+        """名称による絞り込み結果を確認"""
+
+        with self.subTest("チェック1"):
+            # タグで絞り込めることを確認
+            self.assert_filtered({"tag": "低山"}, lambda activity: "低山" in activity["tags"])
+
+        with self.subTest("チェック2"):
+            # 同じパラメータの複数指定は、いずれかに一致する活動となることを確認
+            self.assert_filtered(
+                {"prefecture": ["佐賀", "大分"]},
+                lambda activity: {"佐賀", "大分"} & set(activity["prefectures"]),
+            )
+
+        with self.subTest("チェック3"):
+            # 異なるパラメータの指定は、全てに一致する活動となることを確認
+            self.assert_filtered(
+                {"prefecture": "佐賀", "tag": "低山"},
+                lambda activity: "佐賀" in activity["prefectures"] and "低山" in activity["tags"],
+            )
+
+        with self.subTest("チェック4"):
+            # 登頂した山で絞り込めることを確認
+            mountain = ActivityMountain.objects.filter(activity_id=1).values_list("mountain__name", flat=True)[0]
+            activity_ids = set(
+                ActivityMountain.objects.filter(mountain__name=mountain).values_list("activity_id", flat=True)
+            )
+            self.assert_filtered({"mountain": mountain}, lambda activity: int(activity["activity_id"]) in activity_ids)
+
+        with self.subTest("チェック5"):
+            # 一致する活動がない場合は空リストとなることを確認
+            self.assertEqual(self.client.get(self.url, {"tag": "スキー"}).json(), [])
+
+    def test_filter_by_ranges(self):
+        """期間、距離の範囲、コース定数レベルによる絞り込み結果を確認"""
+
+        with self.subTest("チェック1"):
+            # 活動開始日の期間(終了日を含む)で絞り込めることを確認
+            self.assert_filtered(
+                {"start_date_from": "2022-04-01", "start_date_to": "2022-04-30"},
+                lambda activity: "2022-04-01" <= activity["start_at"][:10] <= "2022-04-30",
+            )
+
+        with self.subTest("チェック2"):
+            # 走行距離(レスポンスはkm)と登った距離の範囲で絞り込めることを確認
+            self.assert_filtered(
+                {"route_distance_min": 10000, "route_distance_max": 15000, "ascent_distance_min": 900},
+                lambda activity: 10 <= activity["route_distance"] <= 15 and activity["ascent_distance"] >= 900,
+            )
+
+        with self.subTest("チェック3"):
+            # コース定数レベルで絞り込めることを確認
+            activity_ids = set(Activity.objects.filter(course_constant_level_id=3).values_list("id", flat=True))
+            self.assert_filtered(
+                {"course_constant_level": 3}, lambda activity: int(activity["activity_id"]) in activity_ids
+            )
+
+    def test_filter_with_pagination(self):
+        """絞り込みとページネーションを組み合わせた結果を確認"""
+
+        expected = self.client.get(self.url, {"prefecture": "福岡"}).json()
+
+        results = []
+        params = {"prefecture": "福岡", "limit": 5}
+        while True:
+            page = self.client.get(self.url, params).json()
+            results.extend(page["results"])
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        with self.subTest("チェック1"):
+            # 全ページの結合結果が絞り込み結果と一致することを確認
+            self.assertEqual(results, expected)
+
+    def test_repeated_parameters_are_cached_separately(self):
+        """同じパラメータの値の組み合わせ毎にレスポンスがキャッシュされることを確認"""
+
+        single = self.client.get(self.url, {"prefecture": "佐賀"}).json()
+        multiple = self.client.get(self.url, {"prefecture": ["佐賀", "大分"]}).json()
+
+        with self.subTest("チェック1"):
+            # 複数指定のレスポンスが単一指定のキャッシュと区別されていることを確認
+            self.assertGreater(len(multiple), len(single))
+
+    def test_invalid_parameters(self):
+        """不正な絞り込み条件を指定した場合に400となることを確認"""
+
+        invalid_params = [
+            {"start_date_from": "2022/04/01"},
+            {"start_date_to": "abc"},
+            {"route_distance_min": "a"},
+            {"ascent_distance_max": -1},
+            {"course_constant_level": "hard"},
+        ]
+        for index, params in enumerate(invalid_params):
+            with self.subTest(f"チェック{index + 1}"):
+                # ステータスコード400を確認
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class ActivityBatchDetailTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-batch-detail")
+
+    def test_matches_activity_detail(self):
+        """まとめて取得した活動詳細が、個別に取得した活動詳細と一致することを確認"""
+
+        activity_ids = [27, 3, 15, 3, 9999]
+        response = self.client.get(self.url, {"ids": ",".join(map(str, activity_ids))})
+        data = response.json()
+
+        with self.subTest("チェック1"):
+            # ステータスコード200を確認
+            self.assertEqual(response.status_code, 200)
+
+        with self.subTest("チェック2"):
+            # 重複を除いた指定順で、個別の活動詳細と一致することを確認
+            expected = [
+                self.client.get(reverse("activity-detail", kwargs={"activity_id": activity_id})).json()
+                for activity_id in [27, 3, 15]
+            ]
+            self.assertEqual(data["results"], expected)
+
+        with self.subTest("チェック3"):
+            # 存在しない活動IDがnot_foundに含まれることを確認
+            self.assertEqual(data["not_found"], [9999])
+
+    def test_query_count_is_constant(self):
+        """指定した活動IDの数に関わらず、取得クエリ数が一定であることを確認"""
+
+        counts = []
+        for activity_ids in ["1", ",".join(str(activity_id) for activity_id in range(1, 28))]:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url, {"ids": activity_ids})
+            counts.append(len([query for query in context.captured_queries if query["sql"].startswith("SELECT")]))
+
+        with self.subTest("チェック1"):
+            # 1件でも27件でも1クエリで取得していることを確認
+            self.assertEqual(counts, [1, 1])
+
+    def test_invalid_parameters(self):
+        """不正な活動IDや上限を超える活動IDを指定した場合に400となることを確認"""
+
+        too_many = ",".join(str(activity_id) for activity_id in range(1, 52))
+        for index, params in enumerate([{}, {"ids": ""}, {"ids": "1,a"}, {"ids": too_many}]):
+            with self.subTest(f"チェック{index + 1}"):
+                # ステータスコード400を確認
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class ActivityGeodataTest(ClimbingTestCase):
+    # テスト用にコピーする活動の地理データのディレクトリ
+    source_dir = os.path.join(settings.BASE_DIR.parent, "frontend", "public", "data", "activity")
+
+    def setUp(self):
+        super().setUp()
+
+        # 活動ID1、2の地理データ(写真を除く)を一時ディレクトリにコピーし、マニフェストを作成
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.geodata_dir = os.path.join(temp_dir, "activity")
+        for dir_name in ["0001", "0002"]:
+            shutil.copytree(
+                os.path.join(self.source_dir, dir_name),
+                os.path.join(self.geodata_dir, dir_name),
+                ignore=shutil.ignore_patterns("*.webp"),
+            )
+
+        geodata_settings = override_settings(
+            GEODATA={
+                **settings.GEODATA,
+                "SOURCE_DIR": self.geodata_dir,
+                "BUNDLE_DIR": os.path.join(temp_dir, "bundle"),
+            }
+        )
+        geodata_settings.enable()
+        self.addCleanup(geodata_settings.disable)
+        call_command("build_geodata_manifest", stdout=StringIO())
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-geodata", kwargs={"activity_id": 1})
+
+    def read_source(self, file_name):
+        with open(os.path.join(self.geodata_dir, "0001", file_name), encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_returns_bundle(self):
+        """活動の地理データを1つのレスポンスで、gzipで圧縮済みのまま返すことを確認"""
+
+        # ディレクトリを走査せずにマニフェストから返すことを確認するため、os.scandirの呼び出しを検知
+        with mock.patch("climbing.geodata.os.scandir", side_effect=AssertionError("scandir called")):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+        with self.subTest("チェック1"):
+            # ステータスコード200とgzipのContent-Encodingを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertIn("Accept-Encoding", response["Vary"])
+
+        data = json.loads(gzip.decompress(response.content))
+        with self.subTest("チェック2"):
+            # 各地理データがソースファイルの内容と一致することを確認
+            self.assertEqual(data["activity_id"], "0001")
+            self.assertEqual(data["route"], self.read_source("route_2022-02-25_09_24.geojson"))
+            self.assertEqual(data["graph"], self.read_source("graph_2022-02-25_09_24.geojson"))
+            self.assertEqual(data["rest_points"], self.read_source("rest_2022-02-25_09_24.json"))
+            self.assertEqual(data["check_points"], self.read_source("check_point_2022-02-25_09_24.json"))
+            self.assertEqual(data["photos"], self.read_source("photo_2022-02-25_09_24.json"))
+
+        with self.subTest("チェック3"):
+            # GPXファイルはURLのみを返すことを確認
+            self.assertEqual(data["files"]["gpx"], "/data/activity/0001/yamap_2022-02-25_09_24.gpx")
+            self.assertNotIn("gpx", data)
+
+        with self.subTest("チェック4"):
+            # gzipに対応しないクライアントには展開したJSONを返すことを確認
+            plain = self.client.get(self.url, HTTP_ACCEPT_ENCODING="identity")
+            self.assertFalse(plain.has_header("Content-Encoding"))
+            self.assertEqual(json.loads(plain.content), data)
+
+    def test_conditional_get_and_rebuild(self):
+        """ETagが一致する場合は304を返し、ソースファイルの更新後に再作成したバンドルを返すことを確認"""
+
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.subTest("チェック1"):
+            # If-None-Matchが一致する場合に304となることを確認
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # 休憩地点のファイルを更新してマニフェストを再作成
+        rest_path = os.path.join(self.geodata_dir, "0001", "rest_2022-02-25_09_24.json")
+        with open(rest_path, "w", encoding="utf-8") as file:
+            json.dump({"rest_info": []}, file)
+        output = StringIO()
+        call_command("build_geodata_manifest", stdout=output)
+
+        with self.subTest("チェック2"):
+            # 変更された活動のみバンドルを再作成することを確認
+            self.assertIn("(1 bundles rebuilt)", output.getvalue())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        with self.subTest("チェック3"):
+            # 更新後の地理データとETagを返すことを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            self.assertEqual(json.loads(response.content)["rest_points"], {"rest_info": []})
+
+    def test_route_levels(self):
+        """ズームレベル、点の数の上限に応じて簡略化したルートを返すことを確認"""
+
+        url = reverse("activity-route", kwargs={"activity_id": 1})
+        source = self.read_source("route_2022-02-25_09_24.geojson")
+
+        full = self.client.get(url)
+        with self.subTest("チェック1"):
+            # 指定しない場合は簡略化しないルートを返すことを確認
+            self.assertEqual(full.status_code, 200)
+            self.assertEqual(json.loads(full.content)["features"], source["features"])
+
+        with self.subTest("チェック2"):
+            # 点の数の上限以下の最も細かい詳細度を返し、始点と終点を含むことを確認
+            route = json.loads(self.client.get(url, {"max_points": 100}).content)
+            simplification = route["properties"]["simplification"]
+            self.assertLessEqual(simplification["point_count"], 100)
+            self.assertEqual(simplification["tolerance"], 30)
+            self.assertEqual(route["features"][0], source["features"][0])
+            self.assertEqual(route["features"][-1], source["features"][-1])
+
+        with self.subTest("チェック3"):
+            # 全体表示のズームレベルでは、ペイロードが10分の1以下となることを確認
+            overview = self.client.get(url, {"zoom": 10})
+            self.assertEqual(json.loads(overview.content)["properties"]["simplification"]["tolerance"], 100)
+            self.assertLess(len(overview.content) * 10, len(full.content))
+
+        with self.subTest("チェック4"):
+            # 拡大時は簡略化しないルートを返すことを確認
+            route = json.loads(self.client.get(url, {"zoom": 18}).content)
+            self.assertEqual(route["properties"]["simplification"]["tolerance"], 0)
+
+        with self.subTest("チェック5"):
+            # 不正なズームレベル、点の数の上限の場合に400となることを確認
+            for params in [{"zoom": "a"}, {"zoom": 30}, {"max_points": 1}, {"max_points": "1.5"}]:
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_chart_series(self):
+        """グラフの系列を指定した点の数に間引いた列指向の配列で返し、点の数毎にキャッシュすることを確認"""
+
+        url = reverse("activity-chart", kwargs={"activity_id": 1})
+        features = self.read_source("graph_2022-02-25_09_24.geojson")["features"]
+
+        data = self.client.get(url, {"points": 50}).json()
+        with self.subTest("チェック1"):
+            # 指定した点の数に間引き、全ての系列の長さが一致することを確認
+            self.assertEqual(data["point_count"], 50)
+            self.assertEqual(data["original_point_count"], len(features))
+            self.assertEqual({len(values) for values in data["series"].values()}, {50})
+
+        with self.subTest("チェック2"):
+            # 始点・終点と最高地点を含むことを確認
+            elevations = [feature["properties"]["elevation"] for feature in features]
+            self.assertEqual(data["series"]["elevation"][0], elevations[0])
+            self.assertEqual(data["series"]["elevation"][-1], elevations[-1])
+            self.assertEqual(max(data["series"]["elevation"]), max(elevations))
+
+        with self.subTest("チェック3"):
+            # 日時がUNIX時間(ミリ秒)で返ることを確認
+            self.assertEqual(data["series"]["timestamp"][0], 1645748689000)
+
+        with self.subTest("チェック4"):
+            # 元の点の数以上を指定した場合は間引かないことを確認
+            data = self.client.get(url, {"points": 1000}).json()
+            self.assertEqual(data["series"]["total_distance"], [f["properties"]["total_distance"] for f in features])
+
+        with self.subTest("チェック5"):
+            # 2回目以降はバンドルを読み込まずにキャッシュから返すことを確認
+            with mock.patch("climbing.views.geodata_manifest.load_bundle") as load_bundle:
+                response = self.client.get(url, {"points": 50})
+            self.assertEqual(response.status_code, 200)
+            load_bundle.assert_not_called()
+
+        with self.subTest("チェック6"):
+            # 不正な点の数の場合に400となることを確認
+            for params in [{"points": "a"}, {"points": 2}, {"points": 2001}]:
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_not_found(self):
+        """地理データが存在しない活動、非公開の活動の場合に404となることを確認"""
+
+        with self.subTest("チェック1"):
+            # マニフェストに存在しない活動の場合に404となることを確認
+            response = self.client.get(reverse("activity-geodata", kwargs={"activity_id": 3}))
+            self.assertEqual(response.status_code, 404)
+
+        with self.subTest("チェック2"):
+            # 非公開の活動の場合に404となることを確認
+            Activity.objects.filter(id=2).update(is_public=False)
+            response = self.client.get(reverse("activity-geodata", kwargs={"activity_id": 2}))
+            self.assertEqual(response.status_code, 404)
+
+
+class UserRecordsBundleTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("user_records_bundle", kwargs={"user_id": self.user.id})
+
+    def test_matches_individual_endpoints(self):
+        """まとめて取得した各セクションが、個別のエンドポイントの応答と一致することを確認"""
+
+        response = self.client.get(self.url)
+        data = response.json()
+
+        expected = {
+            "activities": self.client.get(reverse("activity-list", kwargs={"user_id": self.user.id})).json(),
+            "profile": self.client.get(reverse("user_profile", kwargs={"user_id": self.user.id})).json(),
+            "achievements": self.client.get(reverse("activity_achievement", kwargs={"user_id": self.user.id})).json(),
+        }
+
+        with self.subTest("チェック1"):
+            # ステータスコード200を確認
+            self.assertEqual(response.status_code, 200)
+
+        with self.subTest("チェック2"):
+            # 全てのセクションが個別のエンドポイントの応答と一致することを確認
+            self.assertEqual(data, expected)
+
+    def test_select_sections(self):
+        """sectionsで指定したセクションのみが返されることを確認"""
+
+        response = self.client.get(self.url, {"sections": "profile,achievements"})
+
+        with self.subTest("チェック1"):
+            # 指定したセクションのみが含まれることを確認
+            self.assertEqual(set(response.json()), {"profile", "achievements"})
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url, {"sections": "profile"})
+
+        with self.subTest("チェック2"):
+            # プロファイル情報のみの場合は、ユーザー情報と活動する都道府県の2クエリで取得していることを確認
+            self.assertEqual(len([query for query in context.captured_queries if query["sql"].startswith("SELECT")]), 2)
+
+    def test_invalid_requests(self):
+        """不正なセクションや存在しないユーザーを指定した場合の応答を確認"""
+
+        for index, params in enumerate([{"sections": ""}, {"sections": "profile,unknown"}]):
+            with self.subTest(f"チェック{index + 1}"):
+                # ステータスコード400を確認
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+        with self.subTest("チェック3"):
+            # 存在しないユーザーの場合はステータスコード404を確認
+            url = reverse("user_records_bundle", kwargs={"user_id": 9999})
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CompiledActivitySerializerTest(ClimbingTestCase):
+    def render_drf(self, fields, summary_fields):
+        """DRFのシリアライザで全ての活動をシリアライズしたJSONを返す"""
+
+        instances = list(Activity.objects.select_related("user", "avg_pace_level", "course_constant_level", "summary"))
+        activities = ActivitySerializer(instances, many=True, fields=fields).data
+        summaries = ActivitySummarySerializer(
+            [get_summary(instance) for instance in instances], many=True, fields=summary_fields
+        ).data
+
+        return JSONRenderer().render([{**activity, **summary} for activity, summary in zip(activities, summaries)])
+
+    def assert_identical(self, fields, summary_fields):
+        """values()の行とタプルからシリアライズしたJSONが、DRFのシリアライザと一致することを確認する"""
+
+        serializer = CompiledActivitySerializer(fields, summary_fields)
+        expected = self.render_drf(fields, summary_fields)
+
+        rows = list(Activity.objects.values(*serializer.columns))
+        self.assertEqual(JSONRenderer().render(serializer.serialize(rows)), expected)
+
+        tuples = list(Activity.objects.values_list(*serializer.columns))
+        self.assertEqual(JSONRenderer().render(serializer.serialize(tuples)), expected)
+
+    def test_byte_identical_output(self):
+        """活動一覧と活動詳細の全フィールドで、DRFのシリアライザと同一のJSONとなることを確認"""
+
+        # カバー写真がない活動と、集計データが未作成の活動を用意
+        ActivityPhotos.objects.filter(activity_id=1).delete()
+        ActivitySummary.objects.filter(activity_id=2).delete()
+
+        all_fields = list(CompiledActivitySerializer.field_specs)
+        summary_fields = list(ActivitySummarySerializer().fields)
+        fields = [field for field in all_fields if field not in summary_fields]
+
+        with self.subTest("チェック1"):
+            # 活動詳細の全フィールドで一致することを確認
+            self.assert_identical(fields, summary_fields)
+
+        with self.subTest("チェック2"):
+            # 活動一覧のフィールドで一致することを確認
+            self.assert_identical(
+                ["activity_id", "title", "start_at", "route_distance", "is_plan_submitted"],
+                ["total_domo_points", "cover_photo_name", "aspect_ratio", "tags"],
+            )
+
+    def test_unsupported_field(self):
+        """高速化に対応していないフィールドを指定した場合にValueErrorとなることを確認"""
+
+        with self.subTest("チェック1"):
+            # ValueErrorが発生することを確認
+            with self.assertRaises(ValueError):
+                CompiledActivitySerializer(["activity_id", "avg_pace"], [])
+
+
+class ResponseCacheTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.urls = {
+            "activity_list": reverse("activity-list", kwargs={"user_id": self.user.id}),
+            "climbing_achievements": reverse("activity_achievement", kwargs={"user_id": self.user.id}),
+            "user_profile": reverse("user_profile", kwargs={"user_id": self.user.id}),
+        }
+
+    def get_with_queries(self, url, params=None):
+        """GETリクエストを送信し、レスポンスと発行されたSELECTクエリ数を返す"""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+
+        selects = [query for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        return response, len(selects)
+
+    def test_second_request_skips_database(self):
+        """2回目のリクエストがDBにアクセスせずキャッシュから応答されることを確認"""
+
+        for endpoint, url in self.urls.items():
+            hits_before = response_cache.stats()["endpoints"].get(endpoint, {}).get("hits", 0)
+
+            first, first_queries = self.get_with_queries(url)
+            second, second_queries = self.get_with_queries(url)
+
+            with self.subTest(f"チェック1({endpoint})"):
+                # 1回目はDBから取得し、2回目はDBにアクセスしないことを確認
+                self.assertGreater(first_queries, 0)
+                self.assertEqual(second_queries, 0)
+
+            with self.subTest(f"チェック2({endpoint})"):
+                # キャッシュからの応答が1回目と一致することを確認
+                self.assertEqual(first.json(), second.json())
+
+            with self.subTest(f"チェック3({endpoint})"):
+                # ヒット数が加算されていることを確認
+                self.assertEqual(response_cache.stats()["endpoints"][endpoint]["hits"], hits_before + 1)
+
+    def test_query_parameters_are_cached_separately(self):
+        """クエリパラメータ毎にキャッシュが区別されることを確認"""
+
+        full_list = self.client.get(self.urls["activity_list"]).json()
+        page = self.client.get(self.urls["activity_list"], {"limit": 5}).json()
+
+        with self.subTest("チェック1"):
+            # ページネーションなしとありで異なる応答となることを確認
+            self.assertEqual(len(full_list), 27)
+            self.assertEqual(len(page["results"]), 5)
+
+    def test_cache_key_is_memcached_safe(self):
+        """空白や制御文字を含む長いクエリパラメータでも、キャッシュキーがMemcachedのキーの制限に収まることを確認"""
+
+        params = {"tag": "登山 " * 100, "title": "a\tb"}
+        with mock.patch.object(response_cache, "set", wraps=response_cache.set) as cache_set:
+            first = self.client.get(self.urls["activity_list"], params)
+        response, queries = self.get_with_queries(self.urls["activity_list"], params)
+
+        with self.subTest("チェック1"):
+            # キャッシュキーがMemcachedのキーの制限に収まることを確認
+            key = cache_set.call_args.args[0]
+            self.assertEqual(list(memcache_key_warnings(key)), [])
+
+        with self.subTest("チェック2"):
+            # 同じクエリパラメータの2回目はキャッシュから応答することを確認
+            self.assertEqual(response.json(), first.json())
+            self.assertEqual(queries, 0)
+
+    def test_invalidate_on_activity_change(self):
+        """活動情報の更新時にキャッシュが無効化されることを確認"""
+
+        self.client.get(self.urls["activity_list"])
+
+        activity = Activity.objects.get(id=27)
+        activity.title = "更新後のタイトル"
+        activity.save()
+
+        response, queries = self.get_with_queries(self.urls["activity_list"])
+
+        with self.subTest("チェック1"):
+            # DBから再取得され、更新後のタイトルが応答されることを確認
+            self.assertGreater(queries, 0)
+            self.assertEqual(response.json()[0]["title"], "更新後のタイトル")
+
+    def test_invalidate_on_related_data_change(self):
+        """活動に紐づくデータの更新時にキャッシュが無効化されることを確認"""
+
+        self.client.get(self.urls["activity_list"])
+
+        ActivityTag.objects.filter(activity_id=27).delete()
+
+        response = self.client.get(self.urls["activity_list"])
+
+        with self.subTest("チェック1"):
+            # 削除したタグが応答に含まれないことを確認
+            self.assertEqual(response.json()[0]["tags"], [])
+
+        self.client.get(self.urls["user_profile"])
+
+        contract = self.user.contract
+        contract.domo_points = 100
+        contract.save()
+
+        response = self.client.get(self.urls["user_profile"])
+
+        with self.subTest("チェック2"):
+            # 更新後のDOMOポイントが応答されることを確認
+            self.assertEqual(response.json()["domo_points"], 100)
+
+    def test_stats_requires_admin(self):
+        """キャッシュの統計情報が管理者以外に公開されないことを確認"""
+
+        response = self.client.get(reverse("response_cache_stats"))
+
+        with self.subTest("チェック1"):
+            # ステータスコード403を確認
+            self.assertEqual(response.status_code, 403)
+
+
+class ActivityDetailCacheTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-detail", kwargs={"activity_id": 27})
+
+    def get_with_queries(self, url, params=None):
+        """GETリクエストを送信し、レスポンスと発行されたSELECTクエリ数を返す"""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+
+        selects = [query for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        return response, len(selects)
+
+    def test_detail_is_cached(self):
+        """活動詳細が1クエリで取得され、2回目はDBにアクセスせずキャッシュから応答されることを確認"""
+
+        first, first_queries = self.get_with_queries(self.url)
+        second, second_queries = self.get_with_queries(self.url)
+
+        with self.subTest("チェック1"):
+            # 1回目は1クエリ、2回目はDBにアクセスしないことを確認
+            self.assertEqual(first_queries, 1)
+            self.assertEqual(second_queries, 0)
+
+        with self.subTest("チェック2"):
+            # キャッシュからの応答が1回目と一致することを確認
+            self.assertEqual(first.json(), second.json())
+
+    def test_invalidate_on_update(self):
+        """活動写真やユーザー情報の更新時に活動詳細のキャッシュが無効化されることを確認"""
+
+        self.client.get(self.url)
+
+        photo = ActivityPhotos.objects.filter(activity_id=27).first()
+        photo.domo_points += 10
+        photo.save()
+
+        response = self.client.get(self.url)
+
+        with self.subTest("チェック1"):
+            # 更新後のDOMOポイントの合計が応答されることを確認
+            expected = sum(ActivityPhotos.objects.filter(activity_id=27).values_list("domo_points", flat=True))
+            self.assertEqual(response.json()["total_domo_points"], expected)
+
+        self.user.name = "更新後の名前"
+        self.user.save()
+
+        response = self.client.get(self.url)
+
+        with self.subTest("チェック2"):
+            # 更新後のユーザー名が応答されることを確認
+            self.assertEqual(response.json()["user_name"], "更新後の名前")
+
+    def test_batch_shares_detail_cache(self):
+        """まとめて取得する活動詳細が、活動詳細のキャッシュを共有することを確認"""
+
+        batch_url = reverse("activity-batch-detail")
+        self.client.get(self.url)
+
+        response, queries = self.get_with_queries(batch_url, {"ids": "27,26"})
+
+        with self.subTest("チェック1"):
+            # キャッシュにない活動のみを1クエリで取得していることを確認
+            self.assertEqual(queries, 1)
+            self.assertEqual([detail["activity_id"] for detail in response.json()["results"]], ["0027", "0026"])
+
+        response, queries = self.get_with_queries(batch_url, {"ids": "26,27"})
+
+        with self.subTest("チェック2"):
+            # 全てキャッシュにある場合はDBにアクセスしないことを確認
+            self.assertEqual(queries, 0)
+            self.assertEqual([detail["activity_id"] for detail in response.json()["results"]], ["0026", "0027"])
+
+        with self.subTest("チェック3"):
+            # まとめて取得した活動詳細が、キャッシュされた活動詳細と一致することを確認
+            self.assertEqual(response.json()["results"][1], self.client.get(self.url).json())
+
+
+class ConditionalGetTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.urls = {
+            "activity_list": reverse("activity-list", kwargs={"user_id": self.user.id}),
+            "activity_detail": reverse("activity-detail", kwargs={"activity_id": 27}),
+            "climbing_achievements": reverse("activity_achievement", kwargs={"user_id": self.user.id}),
+            "user_profile": reverse("user_profile", kwargs={"user_id": self.user.id}),
+        }
+
+    def get_with_queries(self, url, etag=None):
+        """If-None-Matchを指定してGETリクエストを送信し、レスポンスと発行されたSELECTクエリ数を返す"""
+
+        headers = {"If-None-Match": etag} if etag else {}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers=headers)
+
+        selects = [query for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        return response, len(selects)
+
+    def test_not_modified_skips_database(self):
+        """ETagが一致する場合に、DBにアクセスせず304となることを確認"""
+
+        for endpoint, url in self.urls.items():
+            first = self.client.get(url)
+            response, queries = self.get_with_queries(url, first["ETag"])
+
+            with self.subTest(f"チェック1({endpoint})"):
+                # 1回目のレスポンスにETagとLast-Modifiedが設定されていることを確認
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first["ETag"].startswith('"'))
+                self.assertTrue(first.has_header("Last-Modified"))
+
+            with self.subTest(f"チェック2({endpoint})"):
+                # DBにアクセスせずに304となり、同じETagが返されることを確認
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(queries, 0)
+                self.assertEqual(response["ETag"], first["ETag"])
+
+    def test_if_none_match_formats(self):
+        """弱いETag、複数のETag、不一致のETagを指定した場合の応答を確認"""
+
+        etag = self.client.get(self.urls["activity_list"])["ETag"]
+
+        with self.subTest("チェック1"):
+            # 弱いETagでも304となることを確認
+            self.assertEqual(self.get_with_queries(self.urls["activity_list"], f"W/{etag}")[0].status_code, 304)
+
+        with self.subTest("チェック2"):
+            # 複数のETagのいずれかが一致すれば304となることを確認
+            self.assertEqual(self.get_with_queries(self.urls["activity_list"], f'"other", {etag}')[0].status_code, 304)
+
+        with self.subTest("チェック3"):
+            # 一致しない場合は200となることを確認
+            self.assertEqual(self.get_with_queries(self.urls["activity_list"], '"other"')[0].status_code, 200)
+
+        with self.subTest("チェック4"):
+            # クエリパラメータが異なる場合はETagも異なることを確認
+            self.assertNotEqual(self.client.get(self.urls["activity_list"], {"limit": 5})["ETag"], etag)
+
+    def test_etag_changes_on_update(self):
+        """データの更新時にETagが変わることを確認"""
+
+        etags = {endpoint: self.client.get(url)["ETag"] for endpoint, url in self.urls.items()}
+
+        ActivityPhotos.objects.filter(activity_id=27).first().save()
+
+        with self.subTest("チェック1"):
+            # 活動写真を更新した活動の詳細とユーザーの一覧は200となることを確認
+            for endpoint in ["activity_list", "activity_detail"]:
+                self.assertEqual(self.get_with_queries(self.urls[endpoint], etags[endpoint])[0].status_code, 200)
+
+        with self.subTest("チェック2"):
+            # 他の活動の詳細のETagは変わらないことを確認
+            other_url = reverse("activity-detail", kwargs={"activity_id": 26})
+            other_etag = self.client.get(other_url)["ETag"]
+            ActivityTag.objects.filter(activity_id=27).delete()
+            self.assertEqual(self.get_with_queries(other_url, other_etag)[0].status_code, 304)
+
+        detail_etag = self.client.get(self.urls["activity_detail"])["ETag"]
+
+        contract = self.user.contract
+        contract.domo_points = 100
+        contract.save()
+
+        with self.subTest("チェック3"):
+            # 契約情報の更新時は、ユーザーの活動の詳細も200となることを確認
+            self.assertEqual(self.get_with_queries(self.urls["activity_detail"], detail_etag)[0].status_code, 200)
+
+    def test_error_response_has_no_etag(self):
+        """エラーのレスポンスにETagが設定されないことを確認"""
+
+        response = self.client.get(reverse("activity-detail", kwargs={"activity_id": 9999}))
+
+        with self.subTest("チェック1"):
+            # ステータスコード404でETagが設定されていないことを確認
+            self.assertEqual(response.status_code, 404)
+            self.assertFalse(response.has_header("ETag"))
+
+
+class RendererTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.urls = {
+            "activity_list": reverse("activity-list", kwargs={"user_id": self.user.id}),
+            "activity_detail": reverse("activity-detail", kwargs={"activity_id": 27}),
+            "climbing_achievements": reverse("activity_achievement", kwargs={"user_id": self.user.id}),
+            "user_profile": reverse("user_profile", kwargs={"user_id": self.user.id}),
+        }
+
+    def test_json_is_identical_to_drf(self):
+        """JSONのレスポンスが、DRFのJSONRendererと同一のバイト列となることを確認"""
+
+        for endpoint, url in self.urls.items():
+            response = self.client.get(url)
+
+            with self.subTest(f"チェック1({endpoint})"):
+                # Content-Typeにcharset=utf-8が含まれることを確認
+                self.assertEqual(response["Content-Type"], "application/json; charset=utf-8")
+
+            with self.subTest(f"チェック2({endpoint})"):
+                # DRFのJSONRendererと同一のバイト列であることを確認
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_json_special_values(self):
+        """Decimal、日時、改行として扱われる文字がDRFのJSONRendererと同一に変換されることを確認"""
+
+        data = {
+            "decimal": Decimal("1.50"),
+            "datetime": datetime(2024, 1, 2, 3, 4, 5, 678901),
+            "text": "行区切り\u2028段落区切り\u2029",
+            1: "数値のキー",
+        }
+
+        with self.subTest("チェック1"):
+            # DRFのJSONRendererと同一のバイト列であることを確認
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_message_pack(self):
+        """AcceptヘッダーにMessagePackを指定した場合に、JSONと同じデータがMessagePackで返されることを確認"""
+
+        for endpoint, url in self.urls.items():
+            json_response = self.client.get(url)
+            response = self.client.get(url, headers={"Accept": "application/msgpack"})
+
+            with self.subTest(f"チェック1({endpoint})"):
+                # Content-Typeを確認
+                self.assertEqual(response["Content-Type"], "application/msgpack")
+
+            with self.subTest(f"チェック2({endpoint})"):
+                # デコードしたデータがJSONと一致することを確認
+                self.assertEqual(msgpack.unpackb(response.content), json_response.json())
+
+            with self.subTest(f"チェック3({endpoint})"):
+                # 表現毎にETagが異なり、Vary: Acceptが設定されていることを確認
+                self.assertNotEqual(response["ETag"], json_response["ETag"])
+                self.assertIn("Accept", response["Vary"])
+
+
+class ActivitySummaryTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+
+    def get_summary_values(self):
+        """全ての活動の集計データを比較可能な形式で取得する"""
+
+        return list(ActivitySummary.objects.order_by("activity").values())
+
+    def test_incremental_update_matches_rebuild(self):
+        """シグナルで更新した集計データが、再作成コマンドの結果と一致することを確認"""
+
+        photo = ActivityPhotos.objects.filter(activity_id=1).first()
+        photo.pk = None
+        photo.is_cover_photo = False
+        photo.domo_points = 7
+        photo.save()
+        ActivityTag.objects.filter(activity_id=2).delete()
+        ActivityPhotos.objects.filter(activity_id=3, is_cover_photo=True).update(is_cover_photo=False)
+        ActivityPhotos.objects.filter(activity_id=3).last().save()
+
+        incremental = self.get_summary_values()
+        call_command("rebuild_activity_summaries", stdout=StringIO())
+        rebuilt = self.get_summary_values()
+
+        with self.subTest("チェック1"):
+            # 追加した写真のDOMOポイントと枚数が反映されていることを確認
+            summary = ActivitySummary.objects.get(activity_id=1)
+            self.assertEqual(summary.total_domo_points, 18)
+            self.assertEqual(summary.total_photos, 5)
+
+        with self.subTest("チェック2"):
+            # 削除したタグが反映されていることを確認
+            self.assertEqual(ActivitySummary.objects.get(activity_id=2).tag_names, [])
+
+        with self.subTest("チェック3"):
+            # カバー写真がない活動の集計データを確認
+            self.assertIsNone(ActivitySummary.objects.get(activity_id=3).cover_photo_seq_no)
+
+        with self.subTest("チェック4"):
+            # シグナルによる更新と再作成の結果が一致することを確認
+            self.assertEqual(incremental, rebuilt)
+
+    def test_delete_activity(self):
+        """活動を削除した場合に集計データも削除されることを確認"""
+
+        Activity.objects.get(id=1).delete()
+
+        with self.subTest("チェック1"):
+            # 集計データが削除されていることを確認
+            self.assertFalse(ActivitySummary.objects.filter(activity_id=1).exists())
+
+    def test_rename_master(self):
+        """マスタデータの名称の変更時に、参照する活動の集計データとレスポンスの名称が更新されることを確認"""
+
+        url = reverse("activity-list", kwargs={"user_id": self.user.id})
+        self.client.get(url)
+
+        tag = ActivityTag.objects.select_related("tag").order_by("id").first().tag
+        tag.name = "名称変更後のタグ"
+        tag.save()
+
+        activity_ids = set(ActivityTag.objects.filter(tag=tag).values_list("activity_id", flat=True))
+        activities = {int(activity["activity_id"]): activity for activity in self.client.get(url).json()}
+
+        incremental = self.get_summary_values()
+        call_command("rebuild_activity_summaries", stdout=StringIO())
+
+        with self.subTest("チェック1"):
+            # タグを参照する全ての活動の一覧データに、変更後の名称が含まれることを確認
+            for activity_id in activity_ids:
+                self.assertIn("名称変更後のタグ", activities[activity_id]["tags"])
+
+        with self.subTest("チェック2"):
+            # 再集計の結果が再作成の結果と一致することを確認
+            self.assertEqual(incremental, self.get_summary_values())
+
+    def test_rebuild_invalidates_cache(self):
+        """集計データの再作成コマンドで、キャッシュ済みの一覧データが再作成後の集計データに更新されることを確認"""
+
+        url = reverse("activity-list", kwargs={"user_id": self.user.id})
+        activity_id = ActivityTag.objects.filter(activity__user=self.user).order_by("id").first().activity_id
+
+        # シグナルを送信しない更新で集計データをずらし、ずれた一覧データをキャッシュ
+        ActivitySummary.objects.filter(activity_id=activity_id).update(tag_names=["ずれたタグ"])
+        self.client.get(url)
+        call_command("rebuild_activity_summaries", stdout=StringIO())
+        activities = {int(activity["activity_id"]): activity for activity in self.client.get(url).json()}
+
+        with self.subTest("チェック1"):
+            # 再作成後の集計データの名称が返ることを確認
+            self.assertNotIn("ずれたタグ", activities[activity_id]["tags"])
+            self.assertEqual(
+                activities[activity_id]["tags"], ActivitySummary.objects.get(activity_id=activity_id).tag_names
+            )
+
+    def test_activity_without_cover_photo(self):
+        """カバー写真がない活動の一覧データを確認"""
+
+        ActivityPhotos.objects.filter(activity_id=27).delete()
+
+        response = self.client.get(reverse("activity-list", kwargs={"user_id": self.user.id}))
+        activity = response.json()[0]
+
+        with self.subTest("チェック1"):
+            # 写真に関する集計値を確認
+            self.assertEqual(activity["total_domo_points"], 0)
+            self.assertEqual(activity["total_photos"], 0)
+            self.assertIsNone(activity["cover_photo_name"])
+            self.assertIsNone(activity["aspect_ratio"])
+
+
+class UserMountainStatsTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity_achievement", kwargs={"user_id": self.user.id})
+
+    def get_stats_values(self):
+        """全てのユーザーの登頂した山毎の集計データを比較可能な形式で取得する"""
+
+        fields = [field.attname for field in UserMountainStats._meta.concrete_fields if field.name != "id"]
+        return list(UserMountainStats.objects.order_by("user", "mountain").values(*fields))
+
+    def test_incremental_update_matches_rebuild(self):
+        """シグナルで更新した集計データが、再作成コマンドの結果と一致することを確認"""
+
+        climbs = ActivityMountain.objects.filter(mountain__name="宝満山").order_by("id")
+        first_climb = climbs.first()
+
+        # 登頂した山の追加・変更・削除、活動の非公開化・削除、山情報の更新
+        ActivityMountain.objects.create(activity_id=1, mountain=first_climb.mountain)
+        changed = climbs.last()
+        changed.mountain = MountainMaster.objects.get(name="天山")
+        changed.save()
+        ActivityMountain.objects.filter(activity_id=2).first().delete()
+        activity = Activity.objects.get(id=first_climb.activity_id)
+        activity.is_public = False
+        activity.save()
+        Activity.objects.get(id=4).delete()
+        mountain = MountainMaster.objects.get(name="仏頂山")
+        mountain.elevation = 870
+        mountain.save()
+
+        incremental = self.get_stats_values()
+        call_command("rebuild_user_mountain_stats", stdout=StringIO())
+        rebuilt = self.get_stats_values()
+
+        with self.subTest("チェック1"):
+            # 追加・非公開化・変更が反映された宝満山の登頂回数を確認
+            stats = UserMountainStats.objects.get(user=self.user, mountain__name="宝満山")
+            self.assertEqual(stats.climb_count, 4)
+
+        with self.subTest("チェック2"):
+            # 山情報の更新が反映されていることを確認
+            self.assertEqual(UserMountainStats.objects.get(user=self.user, mountain=mountain).elevation, 870)
+
+        with self.subTest("チェック3"):
+            # シグナルによる更新結果が再作成の結果と一致することを確認
+            self.assertEqual(incremental, rebuilt)
+
+    def test_rename_prefecture(self):
+        """都道府県名の変更時に、都道府県の山の集計データの都道府県名を更新することを確認"""
+
+        stats = UserMountainStats.objects.filter(user=self.user).exclude(prefecture_names=[]).first()
+        prefecture = PrefectureMaster.objects.get(name=stats.prefecture_names[0])
+        prefecture.name = "変更後の県"
+        prefecture.name_ruby = "へんこうごのけん"
+        prefecture.save()
+
+        incremental = self.get_stats_values()
+        call_command("rebuild_user_mountain_stats", stdout=StringIO())
+        rebuilt = self.get_stats_values()
+
+        with self.subTest("チェック1"):
+            # 都道府県の山の集計データに変更後の都道府県名が反映されていることを確認
+            stats = UserMountainStats.objects.get(user=self.user, mountain_id=stats.mountain_id)
+            self.assertIn("変更後の県", stats.prefecture_names)
+            self.assertIn("へんこうごのけん", stats.prefecture_names_ruby)
+
+        with self.subTest("チェック2"):
+            # シグナルによる更新結果が再作成の結果と一致することを確認
+            self.assertEqual(incremental, rebuilt)
+
+    def test_rebuild_invalidates_cache(self):
+        """集計データの再作成コマンドで、キャッシュ済みの登山の活動実績が再作成後の集計データに更新されることを確認"""
+
+        stats = UserMountainStats.objects.filter(user=self.user).order_by("mountain_id").first()
+
+        # シグナルを送信しない更新で集計データをずらし、ずれた活動実績をキャッシュ
+        UserMountainStats.objects.filter(id=stats.id).update(mountain_name="ずれた山")
+        self.client.get(self.url)
+        call_command("rebuild_user_mountain_stats", stdout=StringIO())
+        response = self.client.get(self.url)
+
+        with self.subTest("チェック1"):
+            # 再作成後の山の名称が返ることを確認
+            self.assertNotIn("ずれた山", response.content.decode())
+            self.assertIn(stats.mountain_name, response.content.decode())
+
+    def test_achievements_single_table_read(self):
+        """登山の活動実績を、ユーザーの取得と集計データの1クエリで取得することを確認"""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        queries = [query["sql"] for query in context.captured_queries if query["sql"].startswith("SELECT")]
+
+        with self.subTest("チェック1"):
+            # ステータスコード200を確認
+            self.assertEqual(response.status_code, 200)
+
+        with self.subTest("チェック2"):
+            # ユーザーの取得と集計データの取得の2クエリであることを確認
+            self.assertEqual(len(queries), 2)
+            self.assertIn("climbing_user_mountain_stats", queries[1])
+            self.assertNotIn("JOIN", queries[1])
+
+
+class MasterRegistryTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+
+    def test_read_views_do_not_join_masters(self):
+        """活動一覧・詳細、プロファイルの取得でマスタデータのテーブルを参照しないことを確認"""
+
+        urls = [
+            reverse("activity-list", kwargs={"user_id": self.user.id}),
+            reverse("activity-detail", kwargs={"activity_id": 1}),
+            reverse("user_profile", kwargs={"user_id": self.user.id}),
+            reverse("activity-list", kwargs={"user_id": self.user.id}) + "?tag=登山&prefecture=福岡",
+        ]
+        master_tables = [model._meta.db_table for model in MASTER_MODELS]
+
+        for index, url in enumerate(urls):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            with self.subTest(f"チェック{index + 1}"):
+                # ステータスコード200と、マスタデータのテーブルを参照しないことを確認
+                self.assertEqual(response.status_code, 200)
+                for query in context.captured_queries:
+                    for table in master_tables:
+                        self.assertNotIn(f'"{table}"', query["sql"])
+
+    def test_reload_on_master_update(self):
+        """マスタデータの更新時にレジストリを読み込み直し、レスポンスに反映することを確認"""
+
+        url = reverse("activity-detail", kwargs={"activity_id": 1})
+        tables = master_registry.tables()
+
+        with self.subTest("チェック1"):
+            # バージョンが変わらない場合は読み込み直さないことを確認
+            self.assertIs(master_registry.tables(), tables)
+
+        level_id = Activity.objects.get(id=1).course_constant_level_id
+        previous_level = self.client.get(url).json()["course_constant_level"]
+        level = CourseConstantLevelMaster.objects.get(id=level_id)
+        level.level = "テスト"
+        level.save()
+
+        with self.subTest("チェック2"):
+            # 更新後は読み込み直したテーブルの値を返すことを確認
+            self.assertEqual(master_registry.get(CourseConstantLevelMaster).get(level_id, "level"), "テスト")
+            self.assertEqual(tables[CourseConstantLevelMaster].get(level_id, "level"), previous_level)
+
+        with self.subTest("チェック3"):
+            # キャッシュ済みの活動詳細にも更新が反映されることを確認
+            self.assertEqual(self.client.get(url).json()["course_constant_level"], "テスト")
+
+    def test_master_update_bumps_single_version(self):
+        """マスタデータの更新時に、ユーザー・活動毎ではなくマスタデータのバージョンのみを更新することを確認"""
+
+        url = reverse("activity-detail", kwargs={"activity_id": 1})
+        etag = self.client.get(url)["ETag"]
+        user_ids = list(User.objects.values_list("id", flat=True))
+        activity_ids = list(Activity.objects.values_list("id", flat=True))
+        user_versions = response_cache.get_versions("user", user_ids)
+        activity_versions = response_cache.get_versions("activity", activity_ids)
+
+        level = CourseConstantLevelMaster.objects.first()
+        level.level = "テスト"
+        level.save()
+
+        with self.subTest("チェック1"):
+            # ユーザーと活動毎のバージョンは更新しないことを確認
+            self.assertEqual(response_cache.get_versions("user", user_ids), user_versions)
+            self.assertEqual(response_cache.get_versions("activity", activity_ids), activity_versions)
+
+        with self.subTest("チェック2"):
+            # 更新前のETagでは304を返さず、ETagが変わることを確認
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_filter_by_unknown_name(self):
+        """マスタデータに存在しない名称で絞り込んだ場合に、活動が0件となることを確認"""
+
+        url = reverse("activity-list", kwargs={"user_id": self.user.id})
+        response = self.client.get(url, {"tag": "存在しないタグ"})
+
+        with self.subTest("チェック1"):
+            # ステータスコード200と、活動が0件であることを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), [])
+
+
+class ActivityLevelClassificationTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+
+        self.classify_avg_pace = ACTIVITY_LEVEL_FIELDS["avg_pace_level_id"][1]
+        self.classify_course_constant = ACTIVITY_LEVEL_FIELDS["course_constant_level_id"][1]
+
+    def test_classify_values(self):
+        """平均ペースとコース定数を、マスタデータの区間に分類することを確認"""
+
+        avg_pace_levels = {level.min: level.id for level in AvgPaceLevelMaster.objects.all()}
+        course_constant_levels = {level.min: level.id for level in CourseConstantLevelMaster.objects.all()}
+        cases = [
+            # (分類する関数, 区間の下限とIDの対応, 値, 分類される区間の下限)
+            (self.classify_avg_pace, avg_pace_levels, 69.9, 50),
+            (self.classify_avg_pace, avg_pace_levels, 70, 70),
+            (self.classify_avg_pace, avg_pace_levels, 155.58, 150),
+            (self.classify_avg_pace, avg_pace_levels, 10, 50),
+            (self.classify_avg_pace, avg_pace_levels, 400, 330),
+            (self.classify_course_constant, course_constant_levels, 11, 1),
+            (self.classify_course_constant, course_constant_levels, 12, 12),
+            (self.classify_course_constant, course_constant_levels, 100, 25),
+        ]
+
+        for index, (classify, levels, value, lower_bound) in enumerate(cases):
+            with self.subTest(f"チェック{index + 1}"):
+                # 値以下の下限を持つ最後の区間(範囲外は端の区間)に分類されることを確認
+                self.assertEqual(classify(value), levels[lower_bound])
+
+        with self.subTest(f"チェック{len(cases) + 1}"):
+            # 値がNoneの場合はNoneとなることを確認
+            self.assertIsNone(self.classify_avg_pace(None))
+
+    def test_classify_on_save(self):
+        """活動の保存時に、未設定のレベルと、平均ペース・コース定数が変更されたレベルを設定することを確認"""
+
+        activity = Activity.objects.get(id=1)
+        hand_set_level_id = activity.avg_pace_level_id
+
+        activity.pk = None
+        activity.avg_pace_level_id = None
+        activity.course_constant_level_id = None
+        activity.save()
+        activity.refresh_from_db()
+
+        with self.subTest("チェック1"):
+            # 未設定のレベルが区間の索引で設定されることを確認
+            self.assertEqual(activity.avg_pace_level_id, self.classify_avg_pace(activity.avg_pace))
+            self.assertEqual(activity.course_constant_level_id, self.classify_course_constant(activity.course_constant))
+
+        activity = Activity.objects.get(id=1)
+        activity.title = "タイトル変更"
+        activity.save()
+
+        with self.subTest("チェック2"):
+            # 設定済みのレベルは変更しないことを確認
+            self.assertEqual(Activity.objects.get(id=1).avg_pace_level_id, hand_set_level_id)
+
+        activity = Activity.objects.get(id=1)
+        course_constant_level_id = activity.course_constant_level_id
+        activity.avg_pace = activity.avg_pace + 1000
+        activity.save()
+        activity.refresh_from_db()
+
+        with self.subTest("チェック3"):
+            # 平均ペースの変更時は平均ペースレベルのみを分類し直すことを確認
+            self.assertEqual(activity.avg_pace_level_id, self.classify_avg_pace(activity.avg_pace))
+            self.assertEqual(activity.course_constant_level_id, course_constant_level_id)
+
+    def test_reclassify_command(self):
+        """reclassify_activity_levelsコマンドで、活動のレベルを分類し直すことを確認"""
+
+        url = reverse("activity-detail", kwargs={"activity_id": 1})
+        activity = Activity.objects.get(id=1)
+        expected_level_id = self.classify_avg_pace(activity.avg_pace)
+        self.assertNotEqual(activity.avg_pace_level_id, expected_level_id)
+        self.client.get(url)
+
+        out = StringIO()
+        call_command("reclassify_activity_levels", "--dry-run", stdout=out)
+
+        with self.subTest("チェック1"):
+            # ドライランでは更新しないことを確認
+            self.assertIn("would be reclassified", out.getvalue())
+            self.assertEqual(Activity.objects.get(id=1).avg_pace_level_id, activity.avg_pace_level_id)
+
+        out = StringIO()
+        with mock.patch(
+            "climbing.levels.update_reclassified_activities", wraps=update_reclassified_activities
+        ) as update:
+            call_command("reclassify_activity_levels", "--batch-size", "5", stdout=out)
+
+        with self.subTest("チェック2"):
+            # 全ての活動のレベルが区間の索引の分類と一致することを確認
+            self.assertIn("Successfully reclassified", out.getvalue())
+            for activity in Activity.objects.all():
+                self.assertEqual(activity.avg_pace_level_id, self.classify_avg_pace(activity.avg_pace))
+                self.assertEqual(
+                    activity.course_constant_level_id, self.classify_course_constant(activity.course_constant)
+                )
+
+        with self.subTest("チェック3"):
+            # 分類し直した活動をバッチサイズ毎に更新することを確認
+            sizes = [len(call.args[0]) for call in update.call_args_list]
+            self.assertGreater(len(sizes), 1)
+            self.assertTrue(all(size <= 5 for size in sizes))
+
+        with self.subTest("チェック4"):
+            # キャッシュ済みの活動詳細に、分類し直したレベルが反映されることを確認
+            level = AvgPaceLevelMaster.objects.get(id=expected_level_id)
+            self.assertEqual(self.client.get(url).json()["avg_pace_min"], level.min)
+
+
+class DomoPointsTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # テスト用クライアントのセットアップ(JWT認証のクエリを除外するため強制認証)
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.urls = {
+            "user_profile": reverse("user_profile", kwargs={"user_id": self.user.id}),
+            "activity_detail": reverse("activity-detail", kwargs={"activity_id": 27}),
+        }
+
+    def get_photo_total(self, **photo_filter):
+        """活動写真のDOMOポイントの合計を取得する"""
+
+        return sum(ActivityPhotos.objects.filter(**photo_filter).values_list("domo_points", flat=True))
+
+    def test_add_domo_points(self):
+        """add_domo_pointsで、写真、活動、ユーザーのDOMOポイントに加算されることを確認"""
+
+        photo = ActivityPhotos.objects.filter(activity_id=27).first()
+        profile = self.client.get(self.urls["user_profile"]).json()
+        detail = self.client.get(self.urls["activity_detail"]).json()
+
+        add_domo_points(photo.id, 5)
+
+        with self.subTest("チェック1"):
+            # 写真、活動の集計データ、契約情報のDOMOポイントに加算されることを確認
+            self.assertEqual(ActivityPhotos.objects.get(id=photo.id).domo_points, photo.domo_points + 5)
+            self.assertEqual(
+                ActivitySummary.objects.get(activity_id=27).total_domo_points, self.get_photo_total(activity_id=27)
+            )
+            self.assertEqual(Contract.objects.get(user=self.user).domo_points, self.get_photo_total(user=self.user))
+
+        with self.subTest("チェック2"):
+            # キャッシュ済みのプロファイルと活動詳細に、加算後のDOMOポイントが反映されることを確認
+            self.assertEqual(
+                self.client.get(self.urls["user_profile"]).json()["domo_points"], profile["domo_points"] + 5
+            )
+            self.assertEqual(
+                self.client.get(self.urls["activity_detail"]).json()["total_domo_points"],
+                detail["total_domo_points"] + 5,
+            )
+
+    def test_photo_changes_adjust_contract(self):
+        """活動写真の登録・更新・削除、活動の削除で、契約情報のDOMOポイントが増減することを確認"""
+
+        def assert_contract_matches_photos():
+            self.assertEqual(Contract.objects.get(user=self.user).domo_points, self.get_photo_total(user=self.user))
+
+        photo = ActivityPhotos.objects.filter(activity_id=1).first()
+        photo.pk = None
+        photo.is_cover_photo = False
+        photo.domo_points = 7
+        photo.save()
+
+        with self.subTest("チェック1"):
+            # 登録した写真のDOMOポイントが加算されることを確認
+            assert_contract_matches_photos()
+
+        photo.domo_points = 10
+        photo.save()
+
+        with self.subTest("チェック2"):
+            # 更新前後の差分が反映されることを確認
+            assert_contract_matches_photos()
+
+        photo.delete()
+
+        with self.subTest("チェック3"):
+            # 削除した写真のDOMOポイントが減算されることを確認
+            assert_contract_matches_photos()
+
+        Activity.objects.get(id=2).delete()
+
+        with self.subTest("チェック4"):
+            # 活動の削除に伴い削除された写真のDOMOポイントが減算されることを確認
+            assert_contract_matches_photos()
+
+    def test_reconcile_command(self):
+        """update_domo_pointコマンドで、DOMOポイントの合計の差異が修正されることを確認"""
+
+        self.client.get(self.urls["user_profile"])
+        Contract.objects.filter(user=self.user).update(domo_points=0)
+        ActivitySummary.objects.filter(activity_id=27).update(total_domo_points=0)
+
+        out = StringIO()
+        call_command("update_domo_point", "--dry-run", stdout=out)
+
+        with self.subTest("チェック1"):
+            # ドライランでは差異を表示し、更新しないことを確認
+            self.assertIn(f"user {self.user.id}: 0 -> {self.get_photo_total(user=self.user)}", out.getvalue())
+            self.assertIn("1 users, 1 activities would be fixed", out.getvalue())
+            self.assertEqual(Contract.objects.get(user=self.user).domo_points, 0)
+
+        out = StringIO()
+        call_command("update_domo_point", "--batch-size", "1", stdout=out)
+
+        with self.subTest("チェック2"):
+            # 差異のあったユーザーと活動が修正されることを確認
+            self.assertIn("1 users, 1 activities fixed", out.getvalue())
+            self.assertEqual(Contract.objects.get(user=self.user).domo_points, self.get_photo_total(user=self.user))
+            self.assertEqual(
+                ActivitySummary.objects.get(activity_id=27).total_domo_points, self.get_photo_total(activity_id=27)
+            )
+
+        with self.subTest("チェック3"):
+            # キャッシュ済みのプロファイルに修正後のDOMOポイントが反映されることを確認
+            response = self.client.get(self.urls["user_profile"])
+            self.assertEqual(response.json()["domo_points"], self.get_photo_total(user=self.user))
+
+        out = StringIO()
+        call_command("update_domo_point", stdout=out)
+
+        with self.subTest("チェック4"):
+            # 差異がない場合は何も修正しないことを確認
+            self.assertIn("0 users, 0 activities fixed", out.getvalue())
+
+    def test_reconcile_keeps_concurrent_increments(self):
+        """照合後に加算されたDOMOポイントが、差異の反映で失われないことを確認"""
+
+        Contract.objects.filter(user=self.user).update(domo_points=0)
+        drifted_contracts, drifted_summaries = find_domo_point_drift()
+
+        # 照合と反映の間にDOMOポイントを加算
+        add_domo_points(ActivityPhotos.objects.filter(activity_id=27).first().id, 3)
+        apply_domo_point_drift(drifted_contracts, drifted_summaries)
+
+        with self.subTest("チェック1"):
+            # 契約情報のDOMOポイントが、加算後の活動写真の合計と一致することを確認
+            self.assertEqual(Contract.objects.get(user=self.user).domo_points, self.get_photo_total(user=self.user))
+
+
+class TokenUserTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.get(email="test@example.com")
+        self.authentication = CookieJWTAuthentication()
+
+    def authenticate(self, access_token):
+        """アクセストークンを認証ヘッダーに設定したリクエストを認証し、ユーザーと発行されたクエリ数を返す"""
+
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        with CaptureQueriesContext(connection) as context:
+            user, _ = self.authentication.authenticate(request)
+
+        return user, len(context.captured_queries)
+
+    def get_access_token(self, **claims):
+        """ログイン時と同じクレームのアクセストークンを発行する(claimsで上書き、Noneの場合は削除)"""
+
+        access_token = AuthTokenObtainPairSerializer.get_token(self.user).access_token
+        for name, value in claims.items():
+            if value is None:
+                del access_token[name]
+            else:
+                access_token[name] = value
+
+        return str(access_token)
+
+    def test_user_from_claims(self):
+        """認証時にDBにアクセスせず、クレームからユーザーを作成することを確認"""
+
+        user, queries = self.authenticate(self.get_access_token())
+
+        with self.subTest("チェック1"):
+            # DBにアクセスしないことを確認
+            self.assertEqual(queries, 0)
+
+        with self.subTest("チェック2"):
+            # クレームの値がユーザー情報と一致することを確認
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(user.email, self.user.email)
+            self.assertEqual(user.is_paid, self.user.is_paid)
+            self.assertTrue(user.is_authenticated)
+
+    def test_inactive_user_is_rejected(self):
+        """無効なユーザーのクレームを持つアクセストークンで認証できないことを確認"""
+
+        with self.subTest("チェック1"):
+            # AuthenticationFailedが発生することを確認
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(self.get_access_token(is_active=False))
+
+    def test_refresh_reloads_user(self):
+        """リフレッシュトークンでの払い出し時に、ユーザーを取得してクレームを更新し、無効なユーザーを拒否することを確認"""
+
+        client = APIClient()
+        url = reverse("token_refresh")
+        refresh_token = AuthTokenObtainPairSerializer.get_token(self.user)
+        User.objects.filter(id=self.user.id).update(is_paid=not self.user.is_paid)
+        response = client.post(url, {"refresh": str(refresh_token)}, format="json")
+
+        with self.subTest("チェック1"):
+            # 払い出したトークンのクレームが最新のユーザー情報であることを確認
+            self.assertEqual(response.status_code, 200)
+            user, _ = self.authenticate(response.json()["access_token"])
+            self.assertEqual(user.is_paid, not self.user.is_paid)
+
+        refresh_token = AuthTokenObtainPairSerializer.get_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        response = client.post(url, {"refresh": str(refresh_token)}, format="json")
+
+        with self.subTest("チェック2"):
+            # 無効化されたユーザーのリフレッシュトークンは401で拒否されることを確認
+            self.assertEqual(response.status_code, 401)
+            self.assertIsNone(response.cookies.get(settings.SIMPLE_JWT["AUTH_COOKIE"]))
+
+    def test_full_user_load_is_cached(self):
+        """クレームに含まれない情報の参照時に、ユーザー情報を1回だけDBから取得することを確認"""
+
+        user, _ = self.authenticate(self.get_access_token())
+        with CaptureQueriesContext(connection) as context:
+            is_staff = user.is_staff
+
+        with self.subTest("チェック1"):
+            # 1クエリでユーザー情報を取得することを確認
+            self.assertEqual(is_staff, self.user.is_staff)
+            self.assertEqual(len(context.captured_queries), 1)
+
+        user, _ = self.authenticate(self.get_access_token())
+        with CaptureQueriesContext(connection) as context:
+            user.is_staff
+
+        with self.subTest("チェック2"):
+            # 2回目のリクエストはキャッシュから取得することを確認
+            self.assertEqual(len(context.captured_queries), 0)
+
+        self.user.is_staff = True
+        self.user.save()
+        user, _ = self.authenticate(self.get_access_token())
+
+        with self.subTest("チェック3"):
+            # ユーザー情報の更新後は、更新後の値を取得することを確認
+            self.assertTrue(user.is_staff)
+
+    def test_cached_user_fields(self):
+        """キャッシュするユーザー情報が、パスワードのハッシュ等を含まないフィールドの辞書であることを確認"""
+
+        user, _ = self.authenticate(self.get_access_token())
+        user.is_staff
+        cached = cache.get(get_user_cache_key(self.user.id))
+
+        with self.subTest("チェック1"):
+            # 権限等のフィールドのみの辞書であることを確認
+            self.assertEqual(set(cached), set(TOKEN_USER_FIELDS))
+            self.assertNotIn("password", cached)
+            self.assertNotIn("email", cached)
+
+    def test_token_without_new_claims(self):
+        """クレームの追加前に発行されたアクセストークンでは、ユーザー情報から値を取得することを確認"""
+
+        user, queries = self.authenticate(self.get_access_token(is_active=None, is_paid=None))
+
+        with self.subTest("チェック1"):
+            # ユーザー情報を取得し、値がユーザー情報と一致することを確認
+            self.assertEqual(queries, 1)
+            self.assertEqual(user.is_paid, self.user.is_paid)
+
+
+class TokenBlacklistFilterTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+
+    def refresh(self, refresh_token):
+        """リフレッシュトークンでアクセストークンを払い出す"""
+
+        return self.client.post(reverse("token_refresh"), {"refresh": str(refresh_token)}, format="json")
+
+    def get_counter_changes(self, blacklist, function):
+        """処理の前後のブラックリストの判定の統計情報の差分を取得する"""
+
+        before = blacklist.stats()
+        function()
+        after = blacklist.stats()
+
+        return {name: after[name] - before[name] for name in ["memory_negatives", "lru_hits", "db_fallbacks"]}
+
+    def test_rotated_token_is_rejected(self):
+        """払い出しに使用したリフレッシュトークンを、DBを参照せずに拒否することを確認"""
+
+        refresh_token = AuthTokenObtainPairSerializer.get_token(self.user)
+        responses = []
+
+        changes = self.get_counter_changes(jti_blacklist, lambda: responses.append(self.refresh(refresh_token)))
+
+        with self.subTest("チェック1"):
+            # 払い出しに成功し、ブラックリスト外の判定がメモリ内で行われることを確認
+            self.assertEqual(responses[0].status_code, 200)
+            self.assertEqual(changes, {"memory_negatives": 1, "lru_hits": 0, "db_fallbacks": 0})
+
+        changes = self.get_counter_changes(jti_blacklist, lambda: responses.append(self.refresh(refresh_token)))
+
+        with self.subTest("チェック2"):
+            # 使用済みのトークンは拒否され、LRUで判定されることを確認
+            self.assertEqual(responses[1].status_code, 401)
+            self.assertEqual(changes, {"memory_negatives": 0, "lru_hits": 1, "db_fallbacks": 0})
+
+    def test_other_worker_sees_blacklist(self):
+        """他のワーカープロセスでブラックリストに登録されたトークンを判定できることを確認"""
+
+        other_worker = JtiBlacklist()
+        refresh_token = AuthTokenObtainPairSerializer.get_token(self.user)
+        jti = refresh_token["jti"]
+
+        with self.subTest("チェック1"):
+            # 登録前はブラックリスト外と判定されることを確認
+            self.assertFalse(other_worker.contains(jti))
+
+        self.refresh(refresh_token)
+
+        with self.subTest("チェック2"):
+            # 登録後はキャッシュのバージョンの確認で追加を読み込み、ブラックリストと判定されることを確認
+            self.assertTrue(other_worker.contains(jti))
+            self.assertEqual(other_worker.stats()["db_fallbacks"], 0)
+
+        BlacklistedToken.objects.filter(token__jti=jti).delete()
+
+        with self.subTest("チェック3"):
+            # 削除後はフィルタを作成し直し、ブラックリスト外と判定されることを確認
+            self.assertFalse(other_worker.contains(jti))
+
+    def test_rebuild_publishes_complete_filter(self):
+        """フィルタの作成し直し中も、ロックなしの判定が作成途中のフィルタを参照しないことを確認"""
+
+        refresh_token = AuthTokenObtainPairSerializer.get_token(self.user)
+        jti = refresh_token["jti"]
+        self.refresh(refresh_token)
+        blacklist = JtiBlacklist()
+        blacklist.sync()
+
+        # フィルタへの追加毎に、判定で参照されるフィルタに登録済みのJTIが含まれるかを記録
+        published = []
+        add = BloomFilter.add
+
+        def add_and_check(bloom_filter, item):
+            published.append(jti in blacklist._filter)
+            add(bloom_filter, item)
+
+        with mock.patch.object(BloomFilter, "add", add_and_check):
+            with blacklist._lock:
+                blacklist.rebuild()
+
+        with self.subTest("チェック1"):
+            # 作成し直し中も、登録済みのJTIを含むフィルタが参照されることを確認
+            self.assertTrue(published)
+            self.assertTrue(all(published))
+
+        with self.subTest("チェック2"):
+            # 作成し直し後もブラックリストと判定されることを確認
+            self.assertTrue(blacklist.contains(jti))
+
+    def test_false_positive_falls_back_to_db(self):
+        """Bloomフィルタの偽陽性の場合にDBで確認し、メトリクスに記録することを確認"""
+
+        blacklist = JtiBlacklist()
+        with mock.patch.object(BloomFilter, "__contains__", return_value=True):
+            contained = blacklist.contains(uuid.uuid4().hex)
+
+        with self.subTest("チェック1"):
+            # ブラックリスト外と判定され、DBへのフォールバックと偽陽性が記録されることを確認
+            self.assertFalse(contained)
+            self.assertEqual(blacklist.stats()["db_fallbacks"], 1)
+            self.assertEqual(blacklist.stats()["false_positives"], 1)
+
+    def test_bloom_filter(self):
+        """Bloomフィルタに偽陰性がなく、偽陽性率が設定値の範囲内であることを確認"""
+
+        bloom_filter = BloomFilter(1000, 0.01)
+        items = [uuid.uuid4().hex for _ in range(1000)]
+        for item in items:
+            bloom_filter.add(item)
+
+        with self.subTest("チェック1"):
+            # 追加した要素は全て含まれると判定されることを確認
+            self.assertTrue(all(item in bloom_filter for item in items))
+
+        with self.subTest("チェック2"):
+            # 追加していない要素の偽陽性率が3%未満であることを確認
+            false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10000))
+            self.assertLess(false_positives, 300)
+
+
+class PruneExpiredTokensTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # 有効期限切れのトークン5件(うち2件はブラックリスト登録済み)と有効期限内のトークン2件を登録
+        user = User.objects.get(email="test@example.com")
+        now = aware_utcnow()
+        for index in range(7):
+            expires_at = now - timedelta(days=1) if index < 5 else now + timedelta(days=1)
+            token = OutstandingToken.objects.create(
+                user=user, jti=uuid.uuid4().hex, token=f"token-{index}", created_at=now, expires_at=expires_at
+            )
+            if index in (1, 3, 5):
+                BlacklistedToken.objects.create(token=token)
+
+    def test_prune_in_chunks(self):
+        """有効期限切れのトークンのみをチャンク毎に削除し、削除件数を出力することを確認"""
+
+        versions = response_cache.get_versions(JtiBlacklist.version_scope, ["removed"])
+        out = StringIO()
+        call_command("prune_expired_tokens", batch_size=2, pause=0, stdout=out)
+        output = out.getvalue()
+
+        with self.subTest("チェック1"):
+            # 有効期限内のトークンとそのブラックリストの登録のみが残っていることを確認
+            self.assertFalse(OutstandingToken.objects.filter(expires_at__lte=aware_utcnow()).exists())
+            self.assertEqual(OutstandingToken.objects.count(), 2)
+            self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+        with self.subTest("チェック2"):
+            # 3回のチャンクに分けて削除し、合計の削除件数を出力することを確認
+            self.assertIn("chunk 3: 1 outstanding, 0 blacklisted", output)
+            self.assertNotIn("chunk 4", output)
+            self.assertIn("Successfully deleted 5 outstanding and 2 blacklisted tokens in 3 chunks", output)
+
+        with self.subTest("チェック3"):
+            # 有効期限切れの削除では、ブラックリストのフィルタの作成し直しを通知しないことを確認
+            self.assertEqual(response_cache.get_versions(JtiBlacklist.version_scope, ["removed"]), versions)
+
+    def test_dry_run(self):
+        """ドライランでは削除せずに、削除対象の件数のみを出力することを確認"""
+
+        out = StringIO()
+        call_command("prune_expired_tokens", dry_run=True, stdout=out)
+
+        with self.subTest("チェック1"):
+            # 削除対象の件数を出力し、トークンが削除されていないことを確認
+            self.assertIn("5 outstanding and 2 blacklisted tokens would be deleted", out.getvalue())
+            self.assertEqual(OutstandingToken.objects.count(), 7)
+            self.assertEqual(BlacklistedToken.objects.count(), 3)
+
+
+class PasswordHashExecutorTest(ClimbingTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def occupy(self, executor):
+        """実行枠を1つ占有するハッシュ計算をバックグラウンドで開始し、実行が始まるまで待機する"""
+
+        started = threading.Event()
+
+        def task():
+            started.set()
+            self.release.wait(5)
+
+        thread = threading.Thread(target=executor.run, args=(task,))
+        thread.start()
+        started.wait(5)
+        return thread
+
+    @override_settings(
+        PASSWORD_HASH_EXECUTOR={"MAX_WORKERS": 1, "QUEUE_SIZE": 0, "QUEUE_TIMEOUT": 1.0, "RETRY_AFTER": 3}
+    )
+    def test_overflow_login_is_rejected(self):
+        """ハッシュ計算の実行枠が空いていない場合、ログインを待機せずに503で拒否することを確認"""
+
+        thread = self.occupy(password_hash_executor)
+        credentials = {"email": "test@example.com", "password": "test1234"}
+
+        started_at = time.perf_counter()
+        response = self.client.post(reverse("token_obtain_pair"), credentials, format="json")
+        elapsed = time.perf_counter() - started_at
+
+        with self.subTest("チェック1"):
+            # 503と再試行までの待機時間が返り、待機時間(QUEUE_TIMEOUT)を待たずに拒否されることを確認
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "3")
+            self.assertLess(elapsed, 0.5)
+
+        self.release.set()
+        thread.join()
+        response = self.client.post(reverse("token_obtain_pair"), credentials, format="json")
+
+        with self.subTest("チェック2"):
+            # 実行枠が空いた後はログインできることを確認
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        PASSWORD_HASH_EXECUTOR={"MAX_WORKERS": 1, "QUEUE_SIZE": 1, "QUEUE_TIMEOUT": 0.05, "RETRY_AFTER": 1}
+    )
+    def test_queue_timeout(self):
+        """待機時間内に実行を開始できない場合、ハッシュ計算を取り消して拒否することを確認"""
+
+        executor = PasswordHashExecutor()
+        thread = self.occupy(executor)
+        called = []
+
+        with self.subTest("チェック1"):
+            # 待機中のハッシュ計算が取り消され、実行されないことを確認
+            with self.assertRaises(PasswordHashBusy):
+                executor.run(called.append, True)
+            self.release.set()
+            thread.join()
+            self.assertEqual(called, [])
+
+        with self.subTest("チェック2"):
+            # 拒否の件数が記録されることを確認
+            self.assertEqual(executor.stats()["rejected_timeout"], 1)
+            self.assertEqual(executor.stats()["completed"], 1)
+
+    @override_settings(
+        PASSWORD_HASH_EXECUTOR={
+            "MAX_WORKERS": 2,
+            "QUEUE_SIZE": 0,
+            "QUEUE_TIMEOUT": 1.0,
+            "RETRY_AFTER": 2,
+            "SHARED_LIMIT": 1,
+            "SHARED_TIMEOUT": 60,
+        }
+    )
+    def test_shared_limit_across_workers(self):
+        """他のワーカープロセスのハッシュ計算で共有の実行枠が埋まっている場合、ログインを待機せずに503で拒否することを確認"""
+
+        # 他のワーカープロセスでハッシュ計算を実行中の状態を、別のインスタンスで再現
+        thread = self.occupy(PasswordHashExecutor())
+        credentials = {"email": "test@example.com", "password": "test1234"}
+        rejected = password_hash_executor.stats()["rejected_shared"]
+
+        started_at = time.perf_counter()
+        response = self.client.post(reverse("token_obtain_pair"), credentials, format="json")
+        elapsed = time.perf_counter() - started_at
+
+        with self.subTest("チェック1"):
+            # プロセス内の実行枠が空いていても、503と再試行までの待機時間が待機せずに返ることを確認
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "2")
+            self.assertLess(elapsed, 0.5)
+            self.assertEqual(password_hash_executor.stats()["rejected_shared"], rejected + 1)
+
+        self.release.set()
+        thread.join()
+        response = self.client.post(reverse("token_obtain_pair"), credentials, format="json")
+
+        with self.subTest("チェック2"):
+            # 共有の実行枠が空いた後はログインでき、実行中の件数が0に戻ることを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(password_hash_executor.stats()["shared_running"], 0)
+
+    @override_settings(
+        PASSWORD_HASH_EXECUTOR={
+            "MAX_WORKERS": 4,
+            "QUEUE_SIZE": 0,
+            "QUEUE_TIMEOUT": 1.0,
+            "RETRY_AFTER": 1,
+            "SHARED_LIMIT": 2,
+            "SHARED_TIMEOUT": 60,
+        }
+    )
+    def test_shared_slots_are_balanced(self):
+        """複数のワーカープロセスで実行枠の取得・解放が競合しても、全ての実行枠が解放されることを確認"""
+
+        results = {"ok": 0, "rejected": 0}
+        lock = threading.Lock()
+
+        # ワーカープロセス毎のインスタンスで、ハッシュ計算の代わりに短い処理を繰り返す
+        def worker(executor):
+            for _ in range(50):
+                try:
+                    executor.run(time.sleep, 0.001)
+                    result = "ok"
+                except PasswordHashBusy:
+                    result = "rejected"
+                with lock:
+                    results[result] += 1
+
+        threads = [threading.Thread(target=worker, args=(PasswordHashExecutor(),)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self.subTest("チェック1"):
+            # 実行と拒否の両方が発生し、全て処理されたことを確認
+            self.assertEqual(results["ok"] + results["rejected"], 300)
+            self.assertGreater(results["rejected"], 0)
+
+        with self.subTest("チェック2"):
+            # 全ての実行枠が解放されていることを確認
+            self.assertEqual(password_hash_executor.stats()["shared_running"], 0)
+
+    def test_shared_limit_requires_atomic_backend(self):
+        """addがアトミックでないキャッシュのバックエンドでは、システムチェックのエラーとし、実行時は制限しないことを確認"""
+
+        options = {**settings.PASSWORD_HASH_EXECUTOR, "SHARED_LIMIT": 1, "SHARED_TIMEOUT": 60}
+        file_caches = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": ""}}
+
+        with tempfile.TemporaryDirectory() as location:
+            file_caches["default"]["LOCATION"] = location
+            with override_settings(CACHES=file_caches, PASSWORD_HASH_EXECUTOR=options):
+                errors = check_shared_limit(None)
+                shared_limit = PasswordHashExecutor.shared_limit(options)
+
+        with self.subTest("チェック1"):
+            # システムチェックのエラーとなることを確認
+            self.assertEqual([error.id for error in errors], ["climbing.E001"])
+
+        with self.subTest("チェック2"):
+            # 全てのワーカープロセスの制限を行わないことを確認
+            self.assertIsNone(shared_limit)
+
+        with self.subTest("チェック3"):
+            # LocMemCacheではエラーとならないことを確認
+            with override_settings(PASSWORD_HASH_EXECUTOR=options):
+                self.assertEqual(check_shared_limit(None), [])
+
+    def test_outdated_hash_is_upgraded(self):
+        """古いアルゴリズムのハッシュは、照合に成功した場合に現在のアルゴリズムで更新されることを確認"""
+
+        self.user.password = make_password("test1234", hasher="pbkdf2_sha1")
+        self.user.save(update_fields=["password"])
+
+        with self.subTest("チェック1"):
+            # 照合に成功し、ハッシュが更新されていることを確認
+            self.assertTrue(check_user_password(self.user, "test1234"))
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+        with self.subTest("チェック2"):
+            # 誤ったパスワードは照合に失敗することを確認
+            self.assertFalse(check_user_password(self.user, "test12345"))
+
+
+def signing_key_settings(keys, active_kid, algorithm="RS256", accept_hs256=False):
+    """非対称鍵で署名するJWT_SIGNING_KEYSの設定を作成する"""
+
+    return {
+        **settings.JWT_SIGNING_KEYS,
+        "ALGORITHM": algorithm,
+        "ACTIVE_KID": active_kid,
+        "KEYS": keys,
+        "ACCEPT_HS256": accept_hs256,
+    }
+
+
+class AsymmetricSigningTest(ClimbingTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        # テストで使用する署名鍵を作成
+        cls.rsa_keys = {"k1": generate_private_key("RS256"), "k2": generate_private_key("RS256")}
+        cls.ed25519_key = generate_private_key("EdDSA")
+
+    def setUp(self):
+        super().setUp()
+
+        self.client = APIClient()
+        self.user = User.objects.get(email="test@example.com")
+        self.url = reverse("activity-list", kwargs={"user_id": self.user.id})
+
+    def issue_access_token(self):
+        """ログイン時と同じクレームのアクセストークンを発行する"""
+
+        return str(AuthTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def get_with_token(self, access_token):
+        """アクセストークンをcookieに設定して活動一覧を取得する"""
+
+        self.client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = access_token
+        return self.client.get(self.url)
+
+    def test_verify_with_jwks(self):
+        """RS256で署名したトークンを、JWKSの公開鍵でローカルに検証できることを確認"""
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings({"k1": self.rsa_keys["k1"]}, "k1")):
+            access_token = self.issue_access_token()
+            jwks_response = self.client.get(reverse("jwks"))
+            response = self.get_with_token(access_token)
+
+        with self.subTest("チェック1"):
+            # ヘッダにkidとアルゴリズムが設定されていることを確認
+            self.assertEqual(jwt.get_unverified_header(access_token), {"alg": "RS256", "kid": "k1", "typ": "JWT"})
+
+        with self.subTest("チェック2"):
+            # JWKSにkidの公開鍵が含まれ、キャッシュ可能であることを確認
+            self.assertEqual(jwks_response.status_code, 200)
+            self.assertEqual([key["kid"] for key in jwks_response.json()["keys"]], ["k1"])
+            self.assertIn("max-age=3600", jwks_response["Cache-Control"])
+
+        with self.subTest("チェック3"):
+            # JWKSの公開鍵のみでトークンを検証できることを確認
+            public_key = jwt.PyJWK(jwks_response.json()["keys"][0]).key
+            payload = jwt.decode(access_token, public_key, algorithms=["RS256"])
+            self.assertEqual(payload["email"], "test@example.com")
+
+        with self.subTest("チェック4"):
+            # バックエンドでも認証に成功することを確認
+            self.assertEqual(response.status_code, 200)
+
+    def test_key_rotation(self):
+        """鍵のローテーション中は旧鍵のトークンを検証し、旧鍵の削除後は拒否することを確認"""
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings({"k1": self.rsa_keys["k1"]}, "k1")):
+            old_token = self.issue_access_token()
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings(self.rsa_keys, "k2")):
+            new_token = self.issue_access_token()
+            rotating_response = self.get_with_token(old_token)
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings({"k2": self.rsa_keys["k2"]}, "k2")):
+            rotated_response = self.get_with_token(old_token)
+            new_response = self.get_with_token(new_token)
+
+        with self.subTest("チェック1"):
+            # 切り替え後は新しい鍵で署名されることを確認
+            self.assertEqual(jwt.get_unverified_header(new_token)["kid"], "k2")
+
+        with self.subTest("チェック2"):
+            # 旧鍵が残っている間は旧鍵のトークンで認証でき、削除後は拒否されることを確認
+            self.assertEqual(rotating_response.status_code, 200)
+            self.assertEqual(rotated_response.status_code, 401)
+            self.assertEqual(new_response.status_code, 200)
+
+    def test_eddsa(self):
+        """EdDSAで署名したトークンで認証でき、JWKSにEd25519の公開鍵が含まれることを確認"""
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings({"e1": self.ed25519_key}, "e1", "EdDSA")):
+            response = self.get_with_token(self.issue_access_token())
+            jwks = self.client.get(reverse("jwks")).json()
+
+        with self.subTest("チェック1"):
+            # 認証に成功し、公開鍵がOKP(Ed25519)であることを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((jwks["keys"][0]["kty"], jwks["keys"][0]["crv"]), ("OKP", "Ed25519"))
+
+    def test_hs256_fallback(self):
+        """署名鍵がない場合はHS256で署名し、移行後のHS256のトークンの受け入れを設定で切り替えられることを確認"""
+
+        hs256_token = self.issue_access_token()
+
+        with self.subTest("チェック1"):
+            # kidのないHS256のトークンが発行され、JWKSは空であることを確認
+            self.assertEqual(jwt.get_unverified_header(hs256_token)["alg"], "HS256")
+            self.assertNotIn("kid", jwt.get_unverified_header(hs256_token))
+            self.assertEqual(self.client.get(reverse("jwks")).json(), {"keys": []})
+
+        for accept_hs256, status_code in [(True, 200), (False, 401)]:
+            options = signing_key_settings({"k1": self.rsa_keys["k1"]}, "k1", accept_hs256=accept_hs256)
+            with self.settings(JWT_SIGNING_KEYS=options):
+                response = self.get_with_token(hs256_token)
+
+            with self.subTest("チェック2", accept_hs256=accept_hs256):
+                # 非対称鍵への移行後は、設定に応じてHS256のトークンを受け入れる・拒否することを確認
+                self.assertEqual(response.status_code, status_code)
+
+    def test_verification_is_cached(self):
+        """同じトークンの2回目以降の検証では、署名の検証を省略することを確認"""
+
+        with self.settings(JWT_SIGNING_KEYS=signing_key_settings({"k1": self.rsa_keys["k1"]}, "k1")):
+            access_token = self.issue_access_token()
+            with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+                first = self.get_with_token(access_token)
+                second = self.get_with_token(access_token)
+
+        with self.subTest("チェック1"):
+            # 2回とも認証に成功し、署名の検証は1回のみであることを確認
+            self.assertEqual((first.status_code, second.status_code), (200, 200))
+            self.assertEqual(decode.call_count, 1)
+
+
+class LeanMiddlewareTest(ClimbingTestCase):
+    def process(self, request):
+        """MIDDLEWAREの設定のミドルウェアでリクエストを処理し、ビューが受け取ったリクエストを取得する"""
+
+        received = []
+
+        def view(request):
+            received.append(request)
+            return HttpResponse()
+
+        handler = view
+        for path in reversed(settings.MIDDLEWARE):
+            handler = import_string(path)(handler)
+        handler(request)
+
+        return received[0]
+
+    def test_lean_lane(self):
+        """JWT認証のみのAPIの参照でのみ、セッション・認証・メッセージの処理を省略することを確認"""
+
+        factory = APIRequestFactory()
+        requests = {
+            "api GET": (factory.get(reverse("activity-list", kwargs={"user_id": 1})), False),
+            "api POST": (factory.post(reverse("token_obtain_pair")), True),
+            "admin GET": (factory.get(reverse("admin:index")), True),
+        }
+
+        for name, (request, is_processed) in requests.items():
+            received = self.process(request)
+
+            with self.subTest("チェック1", request=name):
+                # APIの参照ではセッション・ユーザー・メッセージが設定されず、それ以外では設定されることを確認
+                for attribute in ["session", "user", "_messages"]:
+                    self.assertEqual(hasattr(received, attribute), is_processed)
+
+    def test_admin_login_page(self):
+        """管理画面のログインページを表示できることを確認"""
+
+        response = self.client.get(reverse("admin:login"))
+
+        with self.subTest("チェック1"):
+            # ログインページが表示され、CSRFトークンのcookieが設定されることを確認
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
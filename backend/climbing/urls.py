@@ -4,18 +4,32 @@ from .views import (
     CsrfTokenView,
     AuthTokenObtainPairView,
     AuthTokenRefreshView,
+    JsonWebKeySet,
     ActivityList,
     ActivityDetail,
+    ActivityBatchDetail,
+    ActivityGeodata,
+    ActivityRoute,
+    ActivityChartSeries,
     UserProfile,
     ClimbingAchievements,
+    UserRecordsBundle,
+    ResponseCacheStats,
 )
 
 urlpatterns = [
     path("api/auth/csrf/", CsrfTokenView.as_view(), name="csrf_token"),
     path("api/auth/token/", AuthTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/auth/token/refresh/", AuthTokenRefreshView.as_view(), name="token_refresh"),
+    path("api/auth/jwks/", JsonWebKeySet.as_view(), name="jwks"),
     path("api/users/<int:user_id>/", ActivityList.as_view(), name="activity-list"),
+    path("api/activities/", ActivityBatchDetail.as_view(), name="activity-batch-detail"),
     path("api/activities/<int:activity_id>/", ActivityDetail.as_view(), name="activity-detail"),
+    path("api/activities/<int:activity_id>/geodata/", ActivityGeodata.as_view(), name="activity-geodata"),
+    path("api/activities/<int:activity_id>/route/", ActivityRoute.as_view(), name="activity-route"),
+    path("api/activities/<int:activity_id>/chart/", ActivityChartSeries.as_view(), name="activity-chart"),
     path("api/achievements/<int:user_id>/", ClimbingAchievements.as_view(), name="activity_achievement"),
     path("api/users/profile/<int:user_id>/", UserProfile.as_view(), name="user_profile"),
+    path("api/users/<int:user_id>/bundle/", UserRecordsBundle.as_view(), name="user_records_bundle"),
+    path("api/cache/stats/", ResponseCacheStats.as_view(), name="response_cache_stats"),
 ]
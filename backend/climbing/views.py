@@ -1,30 +1,42 @@
+import functools
+import gzip
 import logging
+import re
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
-from .models import Activity, User, PrefectureMaster, AreaMaster, MountainPrefecture
+from .models import Activity, User, PrefectureMaster, AreaMaster, UserMountainStats
 from .serializers import (
     AuthTokenObtainPairSerializer,
     AuthTokenRefreshSerializer,
     ActivitySerializer,
-    ActivityListSerializer,
-    ActivityDetailSerializer,
+    ActivitySummarySerializer,
+    CompiledActivitySerializer,
     UserSerializer,
     ContractSerializer,
     ClimbingAchievementsSerializer,
 )
-from django.db.models import Sum, Count, F
-from collections import defaultdict
-from django.http import JsonResponse
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
 from django.middleware.csrf import get_token
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from django.conf import settings
 from rest_framework import status
+from .queries import get_public_activities, get_public_activity, get_public_activities_by_ids, get_user_with_profile
+from .summaries import get_summary
+from .pagination import KeysetPagination, InvalidPageParameter
+from .filters import ActivityFilter, InvalidFilterParameter
+from .cache import cache_user_response, cache_activity_response, response_cache, is_not_modified
+from .geodata import geodata_manifest, select_route_level, build_chart_series
+from .blacklist import jti_blacklist
+from .hashing import PasswordHashBusy, password_hash_executor
+from .signing import signing_keys
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
 logger = logging.getLogger(settings.LOGGER["APP"])
 
@@ -52,7 +64,7 @@ class CsrfTokenView(APIView):
             JsonResponse: CSRFトークン
         """
         token = get_token(request)
-        return JsonResponse({"CSRF_Token": token})
+        return JsonResponse({"CSRF_Token": token}, content_type="application/json; charset=utf-8")
 
 
 @method_decorator(csrf_protect, name="dispatch")
@@ -77,7 +89,7 @@ class AuthTokenObtainPairView(TokenObtainPairView):
             **kwargs: 任意のキーワード引数
 
         Returns:
-            Response: 認証結果、ユーザーID
+            Response: 認証結果、ユーザーID。ログインの集中によりパスワードを照合できない場合は503
         """
 
         # リクエストデータをシリアライズ
@@ -86,6 +98,14 @@ class AuthTokenObtainPairView(TokenObtainPairView):
         # データの検証
         try:
             serializer.is_valid(raise_exception=True)
+        except PasswordHashBusy as e:
+            # パスワードのハッシュ計算の実行枠が空いていない場合は、再試行までの待機時間を返す
+            logger.warning(f"Authentication Error (login rejected : {e})")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)},
+            )
         except Exception as e:
             if hasattr(e, "detail") and isinstance(e.detail, dict):
                 for field, errors in e.detail.items():
@@ -239,6 +259,101 @@ class AuthTokenRefreshView(TokenRefreshView):
         return response
 
 
+class JsonWebKeySet(APIView):
+    """トークンの署名を検証する公開鍵(JWKS)を返すAPIビュークラス
+
+    フロントエンドのサーバーが、レスポンスをキャッシュしてトークンの検証をローカルで行うために使用する
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+        authentication_classes (list): 認証に関するクラスのリスト
+    """
+
+    permission_classes = [AllowAny]  # 全てのユーザーがアクセス可能
+    authentication_classes = []  # 認証は不要
+
+    def get(self, request, *args, **kwargs):
+        """GETメソッドで署名鍵の公開鍵を取得する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            Response: 公開鍵のJWKのリスト(非対称鍵を使用しない場合は空)
+        """
+        key_set = signing_keys()
+        response = Response(key_set.jwks())
+        patch_cache_control(response, public=True, max_age=key_set.max_age)
+        return response
+
+
+@functools.cache
+def get_activity_list_serializer():
+    """活動一覧の高速化したシリアライザを取得する(初回のみ作成する)
+
+    Returns:
+        CompiledActivitySerializer: 活動一覧のフィールドを出力するシリアライザ
+    """
+
+    # 活動情報でシリアライザで返したいフィールドを指定
+    fields = [
+        "activity_id",
+        "user_id",
+        "user_name",
+        "is_paid",
+        "title",
+        "start_at",
+        "start_at_display",
+        "end_at",
+        "stay_days",
+        "activity_days",
+        "active_time",
+        "route_distance",
+        "ascent_distance",
+        "is_plan_submitted",
+    ]
+
+    # 活動の集計データでシリアライザで返したいフィールドを指定
+    summary_fields = [
+        "total_domo_points",
+        "total_photos",
+        "cover_photo_name",
+        "aspect_ratio",
+        "prefectures",
+        "areas",
+        "tags",
+    ]
+
+    return CompiledActivitySerializer(fields, summary_fields)
+
+
+def get_activity_list(user_id, **kwargs):
+    """ユーザーの公開対象の活動一覧の行を、活動一覧のシリアライザに必要なカラムで取得する
+
+    Args:
+        user_id (int): ユーザーID
+        **kwargs: get_public_activitiesに渡す条件(position、limit、conditions)
+
+    Returns:
+        list[dict]: 活動情報の行のリスト
+    """
+    return get_public_activities(user_id, get_activity_list_serializer().columns, **kwargs)
+
+
+def serialize_activity_list(activity_rows):
+    """活動情報の行を、活動の集計データを含めた活動一覧のデータにシリアライズする
+
+    Args:
+        activity_rows (list[dict]): get_activity_listで取得した活動情報の行のリスト
+
+    Returns:
+        list[dict]: 活動一覧のデータのリスト
+    """
+    return get_activity_list_serializer().serialize(activity_rows)
+
+
 class ActivityList(APIView):
     """登山の活動一覧を取得するAPIビュークラス
 
@@ -248,9 +363,15 @@ class ActivityList(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response("activity_list")
     def get(self, request, *args, **kwargs):
         """GETメソッドで登山の活動一覧を取得する
 
+        クエリパラメータにlimitまたはcursorを指定した場合は、活動開始日時と活動IDの降順で
+        キーセットページネーションを行い、次のページのカーソルを含めて返す。
+        タグ、都道府県、エリア、山の名称、活動開始日の期間、距離の範囲、コース定数レベルを
+        指定した場合は、条件に一致する活動のみを返す
+
         Args:
             request (HttpRequest): リクエストオブジェクト
             *args: 任意の引数
@@ -261,117 +382,88 @@ class ActivityList(APIView):
         """
         user_id = self.kwargs["user_id"]
 
-        # 対象ユーザ—の情報を取得
+        # ページネーションと絞り込みの条件を取得
         try:
-            user_instance = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return Response({"error": "No user found for the User-ID"}, status=404)
-
-        # 対象ユーザーの公開対象の活動情報を取得
-        activity_instances = user_instance.activities.filter(is_public=True)
+            paginator = KeysetPagination(request.query_params)
+            activity_filter = ActivityFilter(request.query_params)
+        except (InvalidPageParameter, InvalidFilterParameter) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 対象ユーザーの公開対象の活動情報を、集計値とカバー写真の情報を含めて取得
+        if paginator.is_paginated:
+            # 次のページの有無を判定するため1件多く取得
+            activity_rows = paginator.paginate(
+                get_activity_list(
+                    user_id,
+                    position=paginator.position,
+                    limit=paginator.limit + 1,
+                    conditions=activity_filter.conditions,
+                )
+            )
+        else:
+            activity_rows = get_activity_list(user_id, conditions=activity_filter.conditions)
 
-        # 対象ユーザ—の活動情報が存在しない場合は、空リストを返して正常終了
-        if not activity_instances.exists():
-            return Response([])
+        # 対象ユーザ—の活動情報が存在しない場合は、ユーザーの存在を確認
+        if not activity_rows:
+            if not User.objects.filter(id=user_id).exists():
+                return Response({"error": "No user found for the User-ID"}, status=404)
 
-        # 活動ID毎のdomoポイント数と写真数を集計
-        activity_aggregates = list(
-            activity_instances.annotate(
-                total_domo_points=Sum("activity_photos__domo_points"),
-                total_photos=Count("activity_photos"),
-            ).values("id", "total_domo_points", "total_photos")
-        )
+            # 活動情報が存在しない場合は、空リストを返して正常終了
+            return paginator.get_paginated_response([]) if paginator.is_paginated else Response([])
 
-        # 活動IDと活動した都道府県名を取得
-        activity_prefectures = list(
-            activity_instances.annotate(name=F("activity_prefecture__prefecture__name")).values("id", "name")
-        )
-
-        # 活動IDと活動エリア名を取得
-        activity_areas = list(activity_instances.annotate(name=F("activity_area__area__name")).values("id", "name"))
+        # レスポンスデータの作成
+        response_data = serialize_activity_list(activity_rows)
 
-        # 活動IDと活動タグ名を取得
-        activity_tags = list(activity_instances.annotate(name=F("activity_tags__tag__name")).values("id", "name"))
+        # ページネーションを指定された場合は、次のページのカーソルを含めて返す
+        if paginator.is_paginated:
+            return paginator.get_paginated_response(response_data)
 
-        # 活動IDとカバー写真のシーケンス番号、タイムスタンプ、アスペクト比を取得
-        cover_photo = list(
-            activity_instances.filter(activity_photos__is_cover_photo=True)
-            .annotate(
-                seq_no=F("activity_photos__seq_no"),
-                timestamp=F("activity_photos__timestamp"),
-                aspect_ratio=F("activity_photos__aspect_ratio"),
-            )
-            .values("id", "seq_no", "timestamp", "aspect_ratio")
-        )
+        # 正常終了
+        return Response(response_data)
 
-        # 取得したデータをまとめる
-        marge_data = {
-            "aggregates": activity_aggregates,
-            "prefectures": activity_prefectures,
-            "areas": activity_areas,
-            "tags": activity_tags,
-            "cover_photo": cover_photo,
-        }
 
-        # 活動情報でシリアライザで返したいフィールドを指定
-        fields = [
-            "activity_id",
-            "user_id",
-            "user_name",
-            "is_paid",
-            "title",
-            "start_at",
-            "start_at_display",
-            "end_at",
-            "stay_days",
-            "activity_days",
-            "active_time",
-            "route_distance",
-            "ascent_distance",
-            "is_plan_submitted",
-        ]
-
-        # 活動情報をシリアライズ
-        activities = ActivitySerializer(activity_instances, many=True, fields=fields).data
-
-        # 取得したデータをシリアライズ
-        activity_list_info = ActivityListSerializer(marge_data).data
-
-        # 活動ID毎に活動の都道府県情報を整理
-        prefectures = defaultdict(list)
-        for item in activity_list_info["prefectures"]:
-            prefectures[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動エリア情報を整理
-        areas = defaultdict(list)
-        for item in activity_list_info["areas"]:
-            areas[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動タグ情報を整理
-        tags = defaultdict(list)
-        for item in activity_list_info["tags"]:
-            tags[item["id"]].append(item["name"])
+def serialize_activity_details(activity_instances):
+    """活動情報を、活動の集計データを含めた活動詳細のデータにシリアライズする
 
-        # レスポンスデータの作成
-        response_data = []
-        for index, activity in enumerate(activities):
-            activity_id = int(activity["activity_id"])
-            response_data.append(
-                {
-                    **activity,
-                    **activity_list_info["aggregates"][index],
-                    **activity_list_info["cover_photo"][index],
-                    "prefectures": prefectures.get(activity_id, []),
-                    "areas": areas.get(activity_id, []),
-                    "tags": tags.get(activity_id, []),
-                }
-            )
+    Args:
+        activity_instances (list[Activity]): 活動の集計データをselect_relatedした活動情報のリスト
 
-        # レスポンスデータを活動開始日時で降順ソート
-        response_data.sort(key=lambda item: item["start_at"], reverse=True)
+    Returns:
+        list[dict]: 活動詳細のデータのリスト
+    """
 
-        # 正常終了
-        return Response(response_data)
+    # 活動情報でシリアライザで返したいフィールドを指定
+    fields = [
+        "activity_id",
+        "user_id",
+        "user_name",
+        "is_paid",
+        "title",
+        "start_at",
+        "start_at_display",
+        "end_at",
+        "stay_days",
+        "activity_days",
+        "active_time",
+        "route_distance",
+        "ascent_distance",
+        "is_plan_submitted",
+        "descent_distance",
+        "calories",
+        "course_constant",
+        "course_constant_level",
+        "standard_time",
+        "avg_pace_min",
+        "avg_pace_max",
+        "avg_pace_level",
+        "activity_article",
+    ]
+
+    # 活動情報と活動の集計データをシリアライズ
+    activities = ActivitySerializer(activity_instances, many=True, fields=fields).data
+    summaries = ActivitySummarySerializer([get_summary(instance) for instance in activity_instances], many=True).data
+
+    return [{**activity, **summary} for activity, summary in zip(activities, summaries)]
 
 
 class ActivityDetail(APIView):
@@ -383,6 +475,7 @@ class ActivityDetail(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @cache_activity_response("activity_detail")
     def get(self, request, *args, **kwargs):
         """GETメソッドで登山の活動詳細を取得する
 
@@ -396,134 +489,315 @@ class ActivityDetail(APIView):
         """
         activity_id = self.kwargs["activity_id"]
 
-        # 対象ユーザーの公開対象の活動情報を取得
-        activity_instance = Activity.objects.filter(id=activity_id, is_public=True)
+        # 公開対象の活動情報を、活動の集計データを含めて取得
+        activity_instance = get_public_activity(activity_id)
 
-        # 対象ユーザ—の活動情報が存在しない場合は、確認
-        if not activity_instance.exists():
+        # 対象ユーザ—の活動情報が存在しない場合
+        if activity_instance is None:
             return Response({"error": "No activity found for the user"}, status=404)
 
-        # Activityごとに集計
-        activity_aggregates = (
-            activity_instance.annotate(
-                total_domo_points=Sum("activity_photos__domo_points"),
-                total_photos=Count("activity_photos"),
-            )
-            .values("id", "total_domo_points", "total_photos")
-            .first()
-        )
+        # レスポンスデータの作成
+        response_data = serialize_activity_details([activity_instance])[0]
 
-        # 活動IDと活動した都道府県名を取得
-        activity_prefectures = list(
-            activity_instance.annotate(name=F("activity_prefecture__prefecture__name")).values("id", "name")
-        )
+        return Response(response_data)
 
-        # 活動IDと活動した山名を取得
-        activity_mountains = list(
-            activity_instance.annotate(name=F("activity_mountains__mountain__name")).values("id", "name")
-        )
 
-        # 活動IDと活動エリア名を取得
-        activity_areas = list(activity_instance.annotate(name=F("activity_area__area__name")).values("id", "name"))
+class ActivityBatchDetail(APIView):
+    """複数の登山の活動詳細をまとめて返すAPIビュークラス
 
-        # 活動IDと活動タグ名を取得
-        activity_tags = list(activity_instance.annotate(name=F("activity_tags__tag__name")).values("id", "name"))
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+        ids_query_param (str): 活動IDのクエリパラメータ名
+        max_ids (int): 1回のリクエストで指定可能な活動IDの上限
+    """
 
-        # 活動IDとカバー写真のシーケンス番号を取得
-        cover_photo = (
-            activity_instance.filter(activity_photos__is_cover_photo=True)
-            .annotate(
-                seq_no=F("activity_photos__seq_no"),
-                timestamp=F("activity_photos__timestamp"),
-                aspect_ratio=F("activity_photos__aspect_ratio"),
-            )
-            .values("id", "seq_no", "timestamp", "aspect_ratio")
-            .first()
-        )
+    permission_classes = [IsAuthenticated]
+    ids_query_param = "ids"
+    max_ids = 50
 
-        # 取得したデータをまとめる
-        marge_data = {
-            "aggregates": activity_aggregates,
-            "cover_photo": cover_photo,
-            "prefectures": activity_prefectures,
-            "mountains": activity_mountains,
-            "areas": activity_areas,
-            "tags": activity_tags,
-        }
+    def get(self, request, *args, **kwargs):
+        """GETメソッドでカンマ区切りの活動IDに対応する登山の活動詳細を取得する
 
-        # 活動情報でシリアライザで返したいフィールドを指定
-        fields = [
-            "activity_id",
-            "user_id",
-            "user_name",
-            "is_paid",
-            "title",
-            "start_at",
-            "start_at_display",
-            "end_at",
-            "stay_days",
-            "activity_days",
-            "active_time",
-            "route_distance",
-            "ascent_distance",
-            "is_plan_submitted",
-            "descent_distance",
-            "calories",
-            "course_constant",
-            "course_constant_level",
-            "standard_time",
-            "avg_pace_min",
-            "avg_pace_max",
-            "avg_pace_level",
-            "activity_article",
-        ]
-
-        # 活動情報をシリアライズ
-        activity = ActivitySerializer(activity_instance.first(), fields=fields).data
-
-        # 取得したデータをシリアライズ
-        activity_list_info = ActivityDetailSerializer(marge_data).data
-
-        # 活動ID毎に活動タグ情報を整理
-        mountains = defaultdict(list)
-        for item in activity_list_info["mountains"]:
-            mountains[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動の都道府県情報を整理
-        prefectures = defaultdict(list)
-        for item in activity_list_info["prefectures"]:
-            prefectures[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動エリア情報を整理
-        areas = defaultdict(list)
-        for item in activity_list_info["areas"]:
-            areas[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動タグ情報を整理
-        tags = defaultdict(list)
-        for item in activity_list_info["tags"]:
-            tags[item["id"]].append(item["name"])
-
-        # 活動ID毎に活動タグ情報を整理
-        tags = defaultdict(list)
-        for item in activity_list_info["tags"]:
-            tags[item["id"]].append(item["name"])
+        活動詳細は指定された活動IDの順に返し、存在しないまたは非公開の活動IDはnot_foundに含める。
+        活動詳細のキャッシュはActivityDetailと共有し、キャッシュにない活動のみを一括で取得する
 
-        # レスポンスデータの作成
-        response_data = []
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            Response: 登山の活動詳細のリスト、見つからなかった活動IDのリスト
+        """
+        raw_ids = request.query_params.get(self.ids_query_param, "")
+
+        # 活動IDのリストを取得(重複は除外し、指定された順序を維持)
+        try:
+            activity_ids = list(dict.fromkeys(int(value) for value in raw_ids.split(",") if value.strip()))
+        except ValueError:
+            return Response({"error": "ids must be comma-separated integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not activity_ids:
+            return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(activity_ids) > self.max_ids:
+            return Response({"error": f"ids must not exceed {self.max_ids} items"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 活動詳細のキャッシュをまとめて取得
+        versions = response_cache.get_response_versions("activity", activity_ids)
+        keys = {
+            activity_id: response_cache.make_key("activity_detail", "activity", activity_id, versions[activity_id])
+            for activity_id in activity_ids
+        }
+        cached = response_cache.get_many("activity_detail", list(keys.values()))
+        details = {activity_id: cached[key] for activity_id, key in keys.items() if key in cached}
+
+        # キャッシュにない活動は、公開対象の活動情報を活動の集計データを含めて一括で取得
+        missing_ids = [activity_id for activity_id in activity_ids if activity_id not in details]
+        if missing_ids:
+            activity_instances = get_public_activities_by_ids(missing_ids)
+            serialized = dict(
+                zip([instance.id for instance in activity_instances], serialize_activity_details(activity_instances))
+            )
+            response_cache.set_many({keys[activity_id]: data for activity_id, data in serialized.items()})
+            details.update(serialized)
+
+        # 指定された活動IDの順にレスポンスデータを作成
         response_data = {
-            **activity,
-            **activity_list_info["aggregates"],
-            **activity_list_info["cover_photo"],
-            "mountains": mountains.get(activity_id, []),
-            "prefectures": prefectures.get(activity_id, []),
-            "areas": areas.get(activity_id, []),
-            "tags": tags.get(activity_id, []),
+            "results": [details[activity_id] for activity_id in activity_ids if activity_id in details],
+            "not_found": [activity_id for activity_id in activity_ids if activity_id not in details],
         }
 
         return Response(response_data)
 
 
+# Accept-Encodingにgzipを含むかどうかの判定パターン
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+def get_public_geodata_entry(activity_id):
+    """公開対象の活動の、地理データのマニフェストのエントリを取得する
+
+    Args:
+        activity_id (int): 活動ID
+
+    Returns:
+        dict: マニフェストのエントリ。地理データが存在しないまたは非公開の活動の場合はNone
+    """
+    entry = geodata_manifest.get(activity_id)
+    if entry is None or not Activity.objects.filter(id=activity_id, is_public=True).exists():
+        return None
+    return entry
+
+
+def precompressed_response(request, bundle_entry):
+    """gzipで圧縮済みのバンドルからJSONのレスポンスを作成する
+
+    Accept-Encodingにgzipを含むリクエストには圧縮済みのバイト列をそのまま返し、
+    含まないリクエストには展開したJSONを返す。If-None-Matchが一致する場合は
+    バンドルを読み込まずに304を返す
+
+    Args:
+        request (Request): リクエストオブジェクト
+        bundle_entry (dict): マニフェストのバンドルのエントリ
+
+    Returns:
+        HttpResponse: JSONのレスポンス
+    """
+    if is_not_modified(request, bundle_entry["etag"]):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        content = geodata_manifest.read_bundle(bundle_entry)
+        if ACCEPTS_GZIP_RE.search(request.headers.get("Accept-Encoding", "")):
+            response = HttpResponse(content, content_type="application/json; charset=utf-8")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(gzip.decompress(content), content_type="application/json; charset=utf-8")
+
+    response["ETag"] = bundle_entry["etag"]
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+class ActivityGeodata(APIView):
+    """登山の活動の地理データ(ルート、グラフ、休憩地点、チェックポイント、写真、スポット)を返すAPIビュークラス
+
+    build_geodata_manifestコマンドで作成したマニフェストから、gzipで圧縮済みのバンドルを返す
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """GETメソッドで登山の活動の地理データを取得する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            HttpResponse: 登山の活動の地理データのJSON
+        """
+        # マニフェストから地理データのエントリを取得
+        entry = get_public_geodata_entry(self.kwargs["activity_id"])
+        if entry is None:
+            return Response({"error": "No geodata found for the activity"}, status=status.HTTP_404_NOT_FOUND)
+
+        return precompressed_response(request, entry)
+
+
+class ActivityRoute(APIView):
+    """登山の活動のルートを、地図のズームレベルまたは点の数の上限に応じて簡略化して返すAPIビュークラス
+
+    build_geodata_manifestコマンドで詳細度毎に作成した、gzipで圧縮済みのGeoJSONを返す
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+        max_zoom (int): 指定可能なズームレベルの上限
+        min_points (int): 指定可能な点の数の上限の最小値(始点と終点)
+    """
+
+    permission_classes = [IsAuthenticated]
+    max_zoom = 24
+    min_points = 2
+
+    def get(self, request, *args, **kwargs):
+        """GETメソッドで登山の活動の簡略化したルートを取得する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            HttpResponse: 登山の活動のルートのGeoJSON
+        """
+        zoom = request.query_params.get("zoom")
+        max_points = request.query_params.get("max_points")
+
+        # ズームレベル、点の数の上限の検証
+        try:
+            zoom = float(zoom) if zoom else None
+            max_points = int(max_points) if max_points else None
+        except ValueError:
+            return Response(
+                {"error": "zoom must be a number and max_points must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if zoom is not None and not 0 <= zoom <= self.max_zoom:
+            return Response(
+                {"error": f"zoom must be between 0 and {self.max_zoom}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if max_points is not None and max_points < self.min_points:
+            return Response(
+                {"error": f"max_points must be at least {self.min_points}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # マニフェストからルートのエントリを取得
+        entry = get_public_geodata_entry(self.kwargs["activity_id"])
+        if entry is None or entry["route"] is None:
+            return Response({"error": "No route found for the activity"}, status=status.HTTP_404_NOT_FOUND)
+
+        return precompressed_response(request, select_route_level(entry["route"], zoom=zoom, max_points=max_points))
+
+
+class ActivityChartSeries(APIView):
+    """登山の活動の標高・ペースのグラフの系列を、指定した点の数に間引いて返すAPIビュークラス
+
+    グラフの系列は列指向の配列で返し、活動と点の数毎にキャッシュする。
+    キャッシュのバージョンには地理データのバンドルのETagを使用し、バンドルの再作成で無効化する
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+        default_points (int): 点の数を指定しない場合の点の数
+        min_points (int): 指定可能な点の数の最小値
+        max_points (int): 指定可能な点の数の最大値
+    """
+
+    permission_classes = [IsAuthenticated]
+    default_points = 200
+    min_points = 3
+    max_points = 2000
+
+    def get(self, request, *args, **kwargs):
+        """GETメソッドで登山の活動のグラフの系列を取得する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            Response: 点の数、元の点の数、系列名をキーとする値のリスト
+        """
+        activity_id = self.kwargs["activity_id"]
+
+        # 点の数の検証
+        try:
+            points = int(request.query_params.get("points") or self.default_points)
+        except ValueError:
+            return Response({"error": "points must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not self.min_points <= points <= self.max_points:
+            return Response(
+                {"error": f"points must be between {self.min_points} and {self.max_points}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # マニフェストから地理データのエントリを取得
+        entry = get_public_geodata_entry(activity_id)
+        if entry is None or "graph" not in entry["sources"]:
+            return Response({"error": "No chart found for the activity"}, status=status.HTTP_404_NOT_FOUND)
+
+        # バンドルのETagをバージョンとして、活動と点の数毎のETagとキャッシュキーを作成
+        version = entry["etag"].strip('"')
+        variant = f"points={points}"
+        etag = response_cache.make_etag("activity_chart", variant, version, request.accepted_media_type)
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = response_cache.make_key("activity_chart", "activity", activity_id, version, variant)
+            data = response_cache.get("activity_chart", key)
+            if data is None:
+                data = build_chart_series(geodata_manifest.load_bundle(entry)["graph"], points)
+                response_cache.set(key, data)
+            response = Response(data)
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+def get_climbing_achievements(user_instance):
+    """ユーザーの登山の活動実績(登頂した山毎の登頂回数、標高、都道府県)を取得する
+
+    ユーザーの登頂した山毎の集計データを、登頂回数、標高の降順のインデックスで1クエリで取得する
+
+    Args:
+        user_instance (User): ユーザー情報
+
+    Returns:
+        list[dict]: 登頂回数、標高の降順に並んだ登山の活動実績
+    """
+    climbing_achievements = (
+        UserMountainStats.objects.filter(user_id=user_instance.id)
+        .order_by("-climb_count", "-elevation", "mountain_id")
+        .values(
+            "mountain_name",
+            "mountain_name_ruby",
+            "elevation",
+            climbCount=F("climb_count"),
+            prefecture_name=F("prefecture_names"),
+            prefecture_name_ruby=F("prefecture_names_ruby"),
+        )
+    )
+
+    # データをシリアライズ
+    return ClimbingAchievementsSerializer(climbing_achievements, many=True).data
+
+
 class ClimbingAchievements(APIView):
     """登山の活動実績を返すAPIビュークラス
 
@@ -533,6 +807,7 @@ class ClimbingAchievements(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response("climbing_achievements")
     def get(self, request, *args, **kwargs):
         """GETメソッドで登山の活動実績を取得する
 
@@ -553,72 +828,33 @@ class ClimbingAchievements(APIView):
         except User.DoesNotExist:
             return Response({"error": "No user found for the User-ID"}, status=404)
 
-        # 対象ユーザーの公開対象の活動情報を取得
-        activity_instances = user_instance.activities.filter(is_public=True)
+        # レスポンスデータの作成
+        response_data = get_climbing_achievements(user_instance)
 
-        # 対象ユーザ—の活動情報が存在しない場合、空リストを返して正常終了
-        if not activity_instances.exists():
-            return Response([])
+        # 正常終了応答
+        return Response(response_data)
 
-        # 活動情報から山の登頂回数と標高情報を取得
-        climbing_achievements = list(
-            activity_instances.annotate(
-                mountain_id=F("activity_mountains__mountain"),
-                mountain_name=F("activity_mountains__mountain__name"),
-                mountain_name_ruby=F("activity_mountains__mountain__name_ruby"),
-                elevation=F("activity_mountains__mountain__elevation"),
-            )
-            .values(
-                "mountain_id",
-                "mountain_name",
-                "mountain_name_ruby",
-                "elevation",
-            )
-            .annotate(climbCount=Count("mountain_name"))
-            .order_by("-climbCount", "-elevation")
-        )
 
-        # 登頂した山のidのリストを作成
-        mountain_ids = [achievement["mountain_id"] for achievement in climbing_achievements]
+def get_user_profile(user_instance):
+    """ユーザーのプロファイル情報を取得する
 
-        # 登頂した山の都道府県情報を取得
-        prefectures = list(
-            MountainPrefecture.objects.filter(mountain__id__in=mountain_ids)
-            .annotate(
-                prefecture_name=F("prefecture__name"),
-                prefecture_name_ruby=F("prefecture__name_ruby"),
-            )
-            .values("mountain_id", "prefecture_name", "prefecture_name_ruby")
-        )
+    Args:
+        user_instance (User): 性別、契約情報、活動する都道府県を取得済みのユーザー情報
 
-        # 登頂した山の都道府県情報の整理
-        mountain_prefectures = defaultdict(list)
-        mountain_prefectures_ruby = defaultdict(list)
-        for prefecture in prefectures:
-            mountain_id = prefecture["mountain_id"]
-            mountain_prefectures[mountain_id].append(prefecture["prefecture_name"])
-            mountain_prefectures_ruby[mountain_id].append(prefecture["prefecture_name_ruby"])
-
-        # 山の登頂回数と標高情報、山の都道府県情報を整理
-        marge_data = []
-        for achievement in climbing_achievements:
-            mountain_id = achievement["mountain_id"]
-            marge_data.append(
-                {
-                    "mountain_name": achievement["mountain_name"],
-                    "mountain_name_ruby": achievement["mountain_name_ruby"],
-                    "elevation": achievement["elevation"],
-                    "climbCount": achievement["climbCount"],
-                    "prefecture_name": mountain_prefectures.get(mountain_id, []),
-                    "prefecture_name_ruby": mountain_prefectures_ruby.get(mountain_id, []),
-                }
-            )
+    Returns:
+        dict: ユーザーのプロファイル情報
+    """
 
-        # データをシリアライズ
-        response_data = ClimbingAchievementsSerializer(marge_data, many=True).data
+    # ユーザー情報をシリアライズ
+    user_data = UserSerializer(
+        user_instance,
+        fields=["id", "is_paid", "name", "gender", "birth_year", "activity_prefecture"],
+    ).data
 
-        # 正常終了応答
-        return Response(response_data)
+    contract_data = ContractSerializer(user_instance.contract, fields=["domo_points"]).data
+
+    # 辞書をマージ
+    return user_data | contract_data
 
 
 class UserProfile(APIView):
@@ -630,6 +866,7 @@ class UserProfile(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @cache_user_response("user_profile")
     def get(self, request, *args, **kwargs):
         """GETメソッドでユーザーのプロファイル情報を取得する
 
@@ -644,22 +881,101 @@ class UserProfile(APIView):
 
         user_id = self.kwargs["user_id"]
 
-        # 対象ユーザ—の情報を取得
-        try:
-            user_instance = User.objects.get(id=user_id)
-        except User.DoesNotExist:
+        # 対象ユーザ—の情報を、プロファイル情報に必要な関連データを含めて取得
+        user_instance = get_user_with_profile(user_id)
+        if user_instance is None:
             return Response({"error": "No user found for the User-ID"}, status=404)
 
-        # ユーザー情報をシリアライズ
-        user_data = UserSerializer(
-            user_instance,
-            fields=["id", "is_paid", "name", "gender", "birth_year", "activity_prefecture"],
-        ).data
+        # レスポンスデータの作成
+        response_data = get_user_profile(user_instance)
+
+        # 正常終了応答
+        return Response(response_data)
 
-        contract_data = ContractSerializer(user_instance.contract, fields=["domo_points"]).data
 
-        # 辞書をマージ
-        response_data = user_data | contract_data
+class UserRecordsBundle(APIView):
+    """ユーザーの記録ページに必要な活動一覧、プロファイル情報、活動実績をまとめて返すAPIビュークラス
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+        sections_query_param (str): 取得するセクションのクエリパラメータ名
+        available_sections (list): 取得可能なセクション名のリスト
+    """
+
+    permission_classes = [IsAuthenticated]
+    sections_query_param = "sections"
+    available_sections = ["activities", "profile", "achievements"]
+
+    @cache_user_response("user_records_bundle")
+    def get(self, request, *args, **kwargs):
+        """GETメソッドでユーザーの記録ページのデータをまとめて取得する
+
+        クエリパラメータsectionsにカンマ区切りでセクション名を指定した場合は、指定したセクションのみを返す。
+        ユーザー情報は1回だけ取得し、各セクションで共有する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            Response: セクション名をキーとした活動一覧、プロファイル情報、活動実績
+        """
+        user_id = self.kwargs["user_id"]
+
+        # 取得するセクションを取得
+        raw_sections = request.query_params.get(self.sections_query_param)
+        if raw_sections is None:
+            sections = self.available_sections
+        else:
+            sections = [section.strip() for section in raw_sections.split(",") if section.strip()]
+            invalid_sections = [section for section in sections if section not in self.available_sections]
+            if not sections or invalid_sections:
+                return Response(
+                    {"error": f"sections must be selected from {', '.join(self.available_sections)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        # 対象ユーザ—の情報を、プロファイル情報に必要な関連データを含めて取得
+        user_instance = get_user_with_profile(user_id)
+        if user_instance is None:
+            return Response({"error": "No user found for the User-ID"}, status=404)
+
+        # 指定されたセクションのデータを作成
+        response_data = {}
+        if "activities" in sections:
+            response_data["activities"] = serialize_activity_list(get_activity_list(user_id))
+        if "profile" in sections:
+            response_data["profile"] = get_user_profile(user_instance)
+        if "achievements" in sections:
+            response_data["achievements"] = get_climbing_achievements(user_instance)
 
         # 正常終了応答
         return Response(response_data)
+
+
+class ResponseCacheStats(APIView):
+    """レスポンスデータのキャッシュのヒット数とミス数、トークンのブラックリストとパスワードのハッシュ計算の統計情報を返すAPIビュークラス
+
+    Attributes:
+        permission_classes (list): アクセス可能な権限のリスト
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """GETメソッドで応答したワーカープロセスのキャッシュのヒット数とミス数を取得する
+
+        Args:
+            request (HttpRequest): リクエストオブジェクト
+            *args: 任意の引数
+            **kwargs: 任意のキーワード引数
+
+        Returns:
+            Response: プロセスIDとエンドポイント毎のヒット数、ミス数、トークンのブラックリストの判定と
+                パスワードのハッシュ計算の統計情報
+        """
+        return Response(
+            response_cache.stats()
+            | {"token_blacklist": jti_blacklist.stats(), "password_hash": password_hash_executor.stats()}
+        )
@@ -83,20 +83,32 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("climbing.authentication.CookieJWTAuthentication",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "climbing.renderers.FastJSONRenderer",
+        "climbing.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 MIDDLEWARE = [
     "climbing.middleware.AccessLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "climbing.middleware.LeanSessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "climbing.middleware.EnsureCharsetForJsonMiddleware",
+    "climbing.middleware.LeanAuthenticationMiddleware",
+    "climbing.middleware.LeanMessageMiddleware",
 ]
 
+# セッション・Django認証・メッセージのミドルウェアの処理を省略するリクエスト(JWT認証のみのAPIの参照)
+LEAN_MIDDLEWARE = {
+    # 省略するパスの接頭辞(/admin/は対象外)
+    "PATH_PREFIXES": ("/api/",),
+    # 省略するHTTPメソッド(ログイン等の更新系のリクエストは省略しない)
+    "METHODS": ("GET", "HEAD", "OPTIONS"),
+}
+
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOWED_ORIGINS = vault_data.get("CORS_ALLOWED_ORIGINS").split(",")
@@ -144,7 +156,7 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
     # 新しいトークンを取得したときにユーザーのlast_loginフィールドを更新するかどうかを設定
     "UPDATE_LAST_LOGIN": False,
-    # トークンの署名に使用するアルゴリズムを設定
+    # トークンの署名に使用するアルゴリズムを設定(JWT_SIGNING_KEYSのKEYSが空の場合)
     "ALGORITHM": "HS256",
     # トークンの署名に使用する秘密鍵を設定
     "SIGNING_KEY": SECRET_KEY,
@@ -167,17 +179,65 @@ SIMPLE_JWT = {
     # トークンに含まれるユーザーIDのクレーム名を設定
     "USER_ID_CLAIM": "email",
     # 使用するトークンクラスを設定
-    "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "AUTH_TOKEN_CLASSES": ("climbing.signing.SignedAccessToken",),
     # トークンの種類(アクセストークン/リフレッシュトークン)を示すクレーム名を設定
     "TOKEN_TYPE_CLAIM": "token_type",
-    # トークンのユーザークラスを設定
-    "TOKEN_USER_CLASS": "climbing.models.MyCustomTokenUser",
+    # トークンのユーザークラスを設定(クレームから作成し、認証時にユーザー情報をDBから取得しない)
+    "TOKEN_USER_CLASS": "climbing.authentication.ClaimsTokenUser",
+    # クレームに含まれないユーザー情報をDBから取得した場合のキャッシュ有効期間(秒、0の場合はキャッシュしない)
+    "TOKEN_USER_CACHE_TIMEOUT": 30,
     # トークンの識別子（JTI: JWT ID）を示すクレーム名を設定
     "JTI_CLAIM": "jti",
     # トークンを設定するcookieに指定するドメイン
     "DOMAIN": vault_data.get("COOKIE_DOMAIN"),
 }
 
+# トークンの署名鍵(非対称鍵)の設定。KEYSが空の場合はSIMPLE_JWTのALGORITHM、SIGNING_KEYで署名する
+JWT_SIGNING_KEYS = {
+    # 署名アルゴリズム(RS256、EdDSA)
+    "ALGORITHM": vault_data.get("JWT_ALGORITHM", "RS256"),
+    # 署名に使用する鍵のkid
+    "ACTIVE_KID": vault_data.get("JWT_ACTIVE_KID"),
+    # kidとPEM形式の秘密鍵の辞書(ローテーション後も、旧鍵はリフレッシュトークンの有効期限まで残す)
+    "KEYS": vault_data.get("JWT_SIGNING_KEYS", {}),
+    # kidのないHS256のトークンを検証するかどうか(非対称鍵への移行中の発行済みトークン用)
+    "ACCEPT_HS256": vault_data.get("JWT_ACCEPT_HS256", True),
+    # 公開鍵(JWKS)のレスポンスのキャッシュ有効期間(秒)
+    "JWKS_MAX_AGE": 3600,
+    # 署名を検証済みのトークンを保持する件数(0の場合は保持しない)
+    "VERIFY_CACHE_SIZE": 10000,
+}
+
+# リフレッシュトークンのブラックリストを判定するワーカープロセス内のフィルタの設定
+# (登録・削除の通知にCACHESのキャッシュを使用するため、全てのワーカープロセスで共有するキャッシュが必要)
+TOKEN_BLACKLIST_FILTER = {
+    # Bloomフィルタの要素数の上限(超えた場合は有効期限内のJTIの2倍で作成し直す)
+    "CAPACITY": 100000,
+    # 要素数が上限の場合のBloomフィルタの偽陽性率
+    "FALSE_POSITIVE_RATE": 0.001,
+    # 直近に登録・確認したJTIを保持するLRUの件数
+    "LRU_SIZE": 10000,
+}
+
+# ログイン時のパスワードのハッシュ計算を行う、ワーカープロセス内のスレッドプールの設定
+PASSWORD_HASH_EXECUTOR = {
+    # ハッシュ計算の同時実行数の上限
+    "MAX_WORKERS": 2,
+    # 実行を待機できる件数の上限(超えた場合は待機せずに503を返す)
+    "QUEUE_SIZE": 8,
+    # 実行の開始を待機する時間(秒)(超えた場合は503を返す)
+    "QUEUE_TIMEOUT": 2.0,
+    # 503のレスポンスのRetry-Afterヘッダの秒数
+    "RETRY_AFTER": 1,
+    # 全てのワーカープロセスで実行中・待機中のハッシュ計算の件数の上限(超えた場合は待機せずに503を返す)。
+    # CACHESの共有キャッシュの実行枠のキーで制限するため、同期ワーカー(gunicornのsync)でも有効。
+    # 実行枠の取得にアトミックなaddが必要なため、Redis・Memcachedの場合のみ設定する
+    # (FileBasedCacheで設定した場合はシステムチェックのエラーとし、実行時は制限しない)。Noneの場合は制限しない
+    "SHARED_LIMIT": vault_data.get("PASSWORD_HASH_SHARED_LIMIT"),
+    # 全てのワーカープロセスの実行枠のキーの有効期間(秒)(解放せずに終了したプロセスの実行枠を空ける)
+    "SHARED_TIMEOUT": 60,
+}
+
 AUTHENTICATION_BACKENDS = (
     "climbing.auth_backends.EmailBackend",  # カスタムバックエンド
     "django.contrib.auth.backends.ModelBackend",  # デフォルトのバックエンド
@@ -195,6 +255,56 @@ DATABASES = {
     }
 }
 
+# キャッシュの設定
+# レスポンスデータのキャッシュ、ユーザー・活動毎のバージョン、マスタデータとトークンのブラックリストのバージョンを
+# 全てのワーカープロセスで共有するため、プロセス毎のLocMemCacheは使用できない。
+# 既定は単一サーバー用のファイルキャッシュとし、複数サーバーの場合はVaultでRedis/Memcachedを指定する
+# (例: django.core.cache.backends.redis.RedisCache、redisパッケージが必要)。
+# ファイルキャッシュの既定のMAX_ENTRIES(300)では、件数が上限に達する度に1/3の項目が削除され、
+# バージョンのキーも削除されてキャッシュが無効になるため、レスポンスとバージョンのキーが収まる件数を設定する。
+# ファイルキャッシュは書き込みの度にディレクトリ内のファイル数を数えるため、件数が多い場合はRedis/Memcachedを使用する
+CACHES = {
+    "default": {
+        "BACKEND": vault_data.get("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": vault_data.get("CACHE_LOCATION", os.path.join(BASE_DIR, "cache")),
+        # Redis/Memcachedの場合はクライアントのオプションとなるため、VaultのCACHE_OPTIONSで指定する
+        "OPTIONS": vault_data.get(
+            "CACHE_OPTIONS",
+            {
+                # 保持する件数の上限(ユーザー数 + 活動数 + キャッシュするレスポンス数の見込みより大きくする)
+                "MAX_ENTRIES": 100000,
+                # 上限に達した場合に削除する割合(1/CULL_FREQUENCY)
+                "CULL_FREQUENCY": 10,
+            },
+        ),
+    }
+}
+
+RESPONSE_CACHE = {
+    # シリアライズ済みのレスポンスデータのキャッシュ有効期間(秒)
+    "TIMEOUT": 60 * 60,
+}
+
+# マスタデータのレジストリの設定
+MASTER_REGISTRY = {
+    # マスタデータの更新を確認する間隔(秒)
+    "CHECK_INTERVAL": 5,
+}
+
+# 活動の地理データ(ルート、グラフ、休憩地点、チェックポイント、写真)の設定
+GEODATA = {
+    # 活動IDのディレクトリを含む地理データのディレクトリ
+    "SOURCE_DIR": vault_data.get(
+        "GEODATA_SOURCE_DIR", os.path.join(BASE_DIR.parent, "frontend", "public", "data", "activity")
+    ),
+    # build_geodata_manifestコマンドで作成するマニフェストと圧縮済みのバンドルの出力先
+    "BUNDLE_DIR": vault_data.get("GEODATA_BUNDLE_DIR", os.path.join(BASE_DIR, "geodata")),
+    # 地理データのファイルの公開URLの接頭辞
+    "PUBLIC_URL": "/data/activity",
+    # ルートを簡略化する詳細度毎の許容誤差(m)
+    "ROUTE_TOLERANCES": [3, 10, 30, 100],
+}
+
 # climbingのカスタムユーザモデルを適用
 AUTH_USER_MODEL = "climbing.User"
 